@@ -2,11 +2,13 @@ from datetime import datetime, time
 import json
 import logging
 import os
-from model import Oracle, Resolution
+from model import AGENT_RULES, Oracle, Resolution, ResolutionTiming
 from dataclasses import dataclass
 from time import perf_counter, sleep
 import numpy as np
 from tqdm import tqdm
+from stats.book_replay import MAX_STALENESS, OrderBookStore, ReplayEngine, SimulatedOrder
+from case_store import CaseStore, is_case_store
 import argparse
 import csv
 import json
@@ -14,6 +16,8 @@ import logging
 import numpy as np
 
 import bisect
+import concurrent.futures
+import tempfile
 
 # Note that the backtested results are just approximations. More frequent datapoints then 1 per minute would be needed for more accurate simulation.
 class LinearTimeSeries:
@@ -23,6 +27,14 @@ class LinearTimeSeries:
         self.timestamps = [t for t, _ in points]
         self.values = [v for _, v in points]
 
+    @classmethod
+    def from_arrays(cls, timestamps, values):
+        """Backed by existing arrays, e.g. the fields of a PriceLogReader.range() view."""
+        series = cls.__new__(cls)
+        series.timestamps = timestamps
+        series.values = values
+        return series
+
     def query(self, t):
         """Query the time series at time t with linear interpolation."""
         # handle boundaries explicitly
@@ -53,6 +65,51 @@ class LinearTimeSeries:
 
 
 
+def pack_price_series(series_list):
+    """
+    Packs a list of [(timestamp, price), ...] series into flat timestamp/price arrays.
+    Series i occupies [offsets[i], offsets[i + 1]) of the flat arrays.
+    """
+    lengths = np.array([len(s) for s in series_list], dtype=np.int64)
+    offsets = np.zeros(len(series_list) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+
+    flat = np.array([p for s in series_list for p in s], dtype=np.float64).reshape(-1, 2)
+    return flat[:, 0].copy(), flat[:, 1].copy(), offsets
+
+
+def interp_packed(timestamps, prices, offsets, case_idx, query_times):
+    """
+    Vectorized LinearTimeSeries.query over packed series.
+    query_times[k] is evaluated on series case_idx[k]; all series must be non-empty.
+    """
+    case_idx = np.asarray(case_idx, dtype=np.int64)
+    query_times = np.asarray(query_times, dtype=np.float64)
+
+    start = offsets[case_idx]
+    end = offsets[case_idx + 1]
+
+    # clamp into each series' own range, same boundary handling as LinearTimeSeries
+    t = np.clip(query_times, timestamps[start], timestamps[end - 1])
+
+    # one global searchsorted: shift every series into its own disjoint key range
+    point_case = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+    base = timestamps.min()
+    span = timestamps.max() - base + 1.0
+    keys = point_case * span + (timestamps - base)
+    query_keys = case_idx * span + (t - base)
+
+    i = np.searchsorted(keys, query_keys, side="right") - 1
+    i = np.clip(i, start, np.maximum(end - 2, start))
+    j = np.minimum(i + 1, end - 1)
+
+    t0, t1 = timestamps[i], timestamps[j]
+    v0, v1 = prices[i], prices[j]
+    dt = t1 - t0
+    w = np.divide(t - t0, dt, out=np.zeros_like(t), where=dt > 0)
+    return v0 + w * (v1 - v0)
+
+
 @dataclass
 class BacktestCase:
     sec_url: str
@@ -60,12 +117,16 @@ class BacktestCase:
     description: str = ""
     price_series: LinearTimeSeries | None = None
     resolution_time: float | None = None
+    slug: str = ""
+    book_store: OrderBookStore | None = None
 
 
 class Backtest:
-    def __init__(self, oracle: Oracle, data: list[BacktestCase]):
+    def __init__(self, oracle: Oracle, data: list[BacktestCase], order_size: float = 10.0, max_book_staleness: float = MAX_STALENESS):
         self.oracle = oracle
         self.data = data
+        self.order_size = order_size
+        self.max_book_staleness = max_book_staleness
         self.results = []
 
     def run(self):
@@ -87,8 +148,9 @@ class Backtest:
         pbar = tqdm(self.data, desc="Backtesting", unit="case")
 
         for case in pbar:
+            timing = ResolutionTiming()
             start = perf_counter()
-            oracle_result = self.oracle.resolve(case.sec_url, description=case.description)
+            oracle_result = self.oracle.resolve(case.sec_url, description=case.description, timing=timing)
             duration = perf_counter() - start
 
             is_correct = oracle_result == case.true_resolution
@@ -98,19 +160,36 @@ class Backtest:
             trade_price = None
             profit = None
             profit_pct = None
+            fill = None
 
             if case.price_series is not None and case.resolution_time is not None:
                 release_price = case.price_series.query(case.resolution_time)
                 trade_price = case.price_series.query(case.resolution_time + duration)
 
-                if not is_unknown:
+                # share of the order that filled, profit is per requested share
+                filled_ratio = 1.0
+                if case.book_store is not None and not is_unknown:
+                    # fill against the recorded ask ladder of the predicted outcome instead;
+                    # without a fresh snapshot the price series price is kept
+                    order = SimulatedOrder(case.resolution_time + duration, oracle_result.value.capitalize(), self.order_size)
+                    fill = ReplayEngine(case.book_store, self.max_book_staleness).run([order])[0]
+                    if fill.book_time is not None:
+                        trade_price = fill.vwap
+                        filled_ratio = fill.filled / fill.requested
+
+                if not is_unknown and filled_ratio == 0.0:
+                    # a live book with nothing to sell: no trade, no profit
+                    profit = 0.0
+                    profit_pct = 0.0
+                elif not is_unknown and trade_price is not None:
                     if is_correct:
-                        profit = (1.0 - trade_price)
+                        profit = filled_ratio * (1.0 - trade_price)
                     else:
-                        profit = -trade_price
+                        profit = -filled_ratio * trade_price
 
-                    profit_pct = profit / trade_price
+                    profit_pct = profit / (filled_ratio * trade_price)
 
+                if profit is not None:
                     profits.append(profit)
                     profits_pct.append(profit_pct)
 
@@ -136,6 +215,8 @@ class Backtest:
                     trade_price,
                     profit,
                     profit_pct,
+                    fill,
+                    timing,
                 )
             )
 
@@ -194,9 +275,167 @@ class Backtest:
             print(f"  Avg profit %     : {profits_pct.mean():.4%}")
             print(f"  Profitable trades: {(profits > 0).sum()}/{len(profits)}")
 
+        print_stage_percentiles([r[9] for r in self.results], durations)
+
+        book_orders = [r[8] for r in self.results if r[8] is not None]
+        fills = [f for f in book_orders if f.filled > 0]
+        if book_orders:
+            unfilled = sum(1 for f in book_orders if f.book_time is not None and f.filled == 0)
+            no_book = sum(1 for f in book_orders if f.book_time is None)
+            print("\nOrder book fills")
+            print(f"  Filled orders    : {len(fills)}")
+            print(f"  Unfilled (no ask): {unfilled}")
+            print(f"  No fresh book    : {no_book} (priced from the price series)")
+        if fills:
+            fill_ratio = np.array([f.filled / f.requested for f in fills])
+            slippage = np.array([f.slippage for f in fills])
+            print(f"  Avg fill ratio   : {fill_ratio.mean():.3f}")
+            print(f"  Avg slippage     : {slippage.mean():.4f}")
+            print(f"  Max slippage     : {slippage.max():.4f}")
+
         print("=" * 60)
 
 
+def print_stage_percentiles(timings: list[ResolutionTiming], durations):
+    """Percentile table of every oracle stage, total is the end-to-end oracle latency."""
+    stages = {name: [] for name in ResolutionTiming().stages()}
+    for timing in timings:
+        for name, value in timing.stages().items():
+            if value is not None:
+                stages[name].append(value)
+    stages["total"] = list(durations)
+
+    print("\nOracle stages (seconds)")
+    print(f"  {'STAGE':<20} | {'P50':>7} | {'P90':>7} | {'P99':>7} | {'MAX':>7}")
+    for name, values in stages.items():
+        if not values:
+            continue
+        p50, p90, p99 = np.percentile(values, [50, 90, 99])
+        print(f"  {name:<20} | {p50:>7.3f} | {p90:>7.3f} | {p99:>7.3f} | {max(values):>7.3f}")
+
+    download_bytes = np.array([t.download_bytes for t in timings])
+    if download_bytes.size:
+        print(f"  Avg downloaded     : {download_bytes.mean() / 1024:.1f} KiB in "
+              f"{np.mean([len(t.documents) for t in timings]):.1f} documents")
+
+
+def load_variants(path):
+    """
+    Reads oracle variants from a JSON list of
+    {"name", "model", "prompt_prefix", "input": "html" | "text" | "pdf", "prune": bool,
+     "documents": "all" | "press_release"}.
+    Only "name" is required, the rest defaults to the production oracle.
+    """
+    with open(path, "r") as f:
+        variants = json.load(f)
+    return {
+        v["name"]: {
+            "model_version": v.get("model", "gemini-2.5-flash"),
+            "prompt_prefix": v.get("prompt_prefix", AGENT_RULES),
+            "input_mode": v.get("input", "html"),
+            "prune": v.get("prune", False),
+            "documents": v.get("documents", "all"),
+        }
+        for v in variants
+    }
+
+
+class MatrixBacktest:
+    """Runs several oracle variants on the same cases, downloading each filing only once."""
+    def __init__(self, oracles: dict[str, Oracle], data: list[BacktestCase]):
+        self.oracles = oracles
+        self.data = data
+        self.results = {name: [] for name in oracles}
+
+    def run(self):
+        self.results = {name: [] for name in self.oracles}
+        fetcher = next(iter(self.oracles.values()))
+
+        pbar = tqdm(self.data, desc="Matrix backtest", unit="case")
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(self.oracles)) as ex:
+            for case in pbar:
+                with tempfile.TemporaryDirectory() as tmp:
+                    start = perf_counter()
+                    paths = fetcher.fetch_documents(case.sec_url, tmp)
+                    fetch_time = perf_counter() - start
+
+                    futures = {
+                        name: ex.submit(self._resolve_timed, oracle, paths, case)
+                        for name, oracle in self.oracles.items()
+                    }
+                    for name, fut in futures.items():
+                        oracle_result, duration = fut.result()
+                        self.results[name].append(
+                            (
+                                case,
+                                oracle_result,
+                                oracle_result == case.true_resolution,
+                                fetch_time + duration,
+                            )
+                        )
+
+    @staticmethod
+    def _resolve_timed(oracle, paths, case):
+        start = perf_counter()
+        oracle_result = oracle.resolve_documents(paths, case.description, case.sec_url)
+        return oracle_result, perf_counter() - start
+
+    def print_results(self):
+        print("\nOracle variant matrix")
+        header = (
+            f"{'VARIANT':<24} | {'N':>4} | {'ACC':>5} | {'ACC_RES':>7} | {'UNK':>5} | "
+            f"{'P50_S':>6} | {'P90_S':>6} | {'P99_S':>6} | {'MEAN_S':>6}"
+        )
+        print("=" * len(header))
+        print(header)
+        print("-" * len(header))
+
+        for name, results in self.results.items():
+            if not results:
+                continue
+            total = len(results)
+            correct = sum(r[2] for r in results)
+            unks = sum(1 for r in results if r[1] == Resolution.UNK)
+            resolved = total - unks
+            durations = np.array([r[3] for r in results])
+            p50, p90, p99 = np.percentile(durations, [50, 90, 99])
+
+            print(
+                f"{name:<24} | {total:>4d} | {correct / total:>5.3f} | "
+                f"{(correct / resolved if resolved else 0.0):>7.3f} | {unks / total:>5.3f} | "
+                f"{p50:>6.2f} | {p90:>6.2f} | {p99:>6.2f} | {durations.mean():>6.2f}"
+            )
+        print("=" * len(header))
+
+
+def write_matrix_csv(results, output_path):
+    fieldnames = [
+        "variant",
+        "sec_url",
+        "true_resolution",
+        "oracle_resolution",
+        "is_correct",
+        "is_unknown",
+        "oracle_latency_sec",
+    ]
+
+    with open(output_path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+
+        for name, rows in results.items():
+            for case, oracle_result, is_correct, duration in rows:
+                writer.writerow({
+                    "variant": name,
+                    "sec_url": case.sec_url,
+                    "true_resolution": case.true_resolution.value,
+                    "oracle_resolution": oracle_result.value,
+                    "is_correct": is_correct,
+                    "is_unknown": oracle_result == Resolution.UNK,
+                    "oracle_latency_sec": duration,
+                })
+
+
 def write_results_csv(results, output_path):
     fieldnames = [
         "sec_url",
@@ -210,6 +449,16 @@ def write_results_csv(results, output_path):
         "trade_price",
         "profit",
         "profit_pct",
+        "filled_size",
+        "fill_vwap",
+        "slippage",
+        "directory_fetch_sec",
+        "n_documents",
+        "download_bytes",
+        "download_sec",
+        "upload_sec",
+        "ttft_sec",
+        "inference_sec",
     ]
 
     with open(output_path, "w", newline="") as f:
@@ -225,6 +474,8 @@ def write_results_csv(results, output_path):
             trade_price,
             profit,
             profit_pct,
+            fill,
+            timing,
         ) in results:
             writer.writerow({
                 "sec_url": case.sec_url,
@@ -238,15 +489,105 @@ def write_results_csv(results, output_path):
                 "trade_price": trade_price,
                 "profit": profit,
                 "profit_pct": profit_pct,
+                "filled_size": fill.filled if fill else None,
+                "fill_vwap": fill.vwap if fill else None,
+                "slippage": fill.slippage if fill else None,
+                "directory_fetch_sec": timing.directory_fetch,
+                "n_documents": len(timing.documents),
+                "download_bytes": timing.download_bytes,
+                "download_sec": timing.download,
+                "upload_sec": timing.upload,
+                "ttft_sec": timing.time_to_first_token,
+                "inference_sec": timing.inference,
             })
 
 
+def load_recorded_decisions(results_path):
+    """Loads oracle decisions from a results CSV written by write_results_csv."""
+    with open(results_path, "r", newline="") as f:
+        return {row["sec_url"]: row for row in csv.DictReader(f)}
+
+
+def latency_sweep(source_rows, decisions, latencies):
+    """
+    Re-prices recorded oracle decisions at every latency of the grid without calling the oracle.
+    Profit follows Backtest.run: 1 - price when correct, -price when wrong, unknowns are skipped.
+    """
+    rows = [
+        row for row in source_rows
+        if row.get("price_series") and row["sec_link"] in decisions
+        and decisions[row["sec_link"]]["oracle_resolution"] != Resolution.UNK.value
+    ]
+    if not rows:
+        return []
+
+    timestamps, prices, offsets = pack_price_series([row["price_series"] for row in rows])
+    release = np.array([row["sec_time_stamp"] for row in rows], dtype=np.float64)
+    correct = np.array(
+        [decisions[row["sec_link"]]["is_correct"] == "True" for row in rows]
+    )
+
+    latencies = np.asarray(latencies, dtype=np.float64)
+    n_cases, n_grid = len(rows), len(latencies)
+
+    case_idx = np.repeat(np.arange(n_cases), n_grid)
+    query_times = (release[:, None] + latencies[None, :]).ravel()
+    entry = interp_packed(timestamps, prices, offsets, case_idx, query_times).reshape(n_cases, n_grid)
+
+    profit = np.where(correct[:, None], 1.0 - entry, -entry)
+    profit_pct = profit / entry
+
+    return [
+        {
+            "latency_sec": latencies[g],
+            "trades": n_cases,
+            "hit_rate": correct.mean(),
+            "avg_entry_price": entry[:, g].mean(),
+            "total_profit": profit[:, g].sum(),
+            "avg_profit": profit[:, g].mean(),
+            "avg_profit_pct": profit_pct[:, g].mean(),
+        }
+        for g in range(n_grid)
+    ]
+
+
+def print_sweep(sweep):
+    print("\nLatency sweep")
+    print("=" * 60)
+    print(f"{'LAT_S':>6} | {'TRADES':>6} | {'HIT':>5} | {'ENTRY':>6} | {'PNL':>8} | {'AVG_PNL':>8} | {'AVG_%':>7}")
+    print("-" * 60)
+    for row in sweep:
+        print(
+            f"{row['latency_sec']:>6.0f} | {row['trades']:>6d} | {row['hit_rate']:>5.3f} | "
+            f"{row['avg_entry_price']:>6.4f} | {row['total_profit']:>8.4f} | "
+            f"{row['avg_profit']:>8.4f} | {row['avg_profit_pct']:>7.2%}"
+        )
+    print("=" * 60)
+
+
+def write_sweep_csv(sweep, output_path):
+    fieldnames = [
+        "latency_sec",
+        "trades",
+        "hit_rate",
+        "avg_entry_price",
+        "total_profit",
+        "avg_profit",
+        "avg_profit_pct",
+    ]
+
+    with open(output_path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(sweep)
+
+
 def main():
     parser = argparse.ArgumentParser(description="Run oracle backtests.")
     parser.add_argument(
         "-s", "--source",
         default="backtest_data/cases/time_series_data.json",
-        help="Path to backtest source JSON file"
+        help="Path to backtest source JSON file or a converted .cases directory"
     )
     parser.add_argument(
         "-o", "--output",
@@ -266,6 +607,49 @@ def main():
         help="Random seed for sampling"
     )
 
+    parser.add_argument(
+        "--books",
+        default=None,
+        metavar="DIR",
+        help="Folder with polymarket_liquidity_<slug>.jsonl files to fill orders against recorded depth"
+    )
+    parser.add_argument(
+        "--order-size",
+        type=float,
+        default=10.0,
+        help="Shares per simulated order when filling against order books"
+    )
+    parser.add_argument(
+        "--max-book-staleness",
+        type=float,
+        default=MAX_STALENESS,
+        help="Seconds a recorded book may be older than the order time and still fill it"
+    )
+    parser.add_argument(
+        "--matrix",
+        default=None,
+        metavar="VARIANTS_JSON",
+        help="Run every oracle variant of the JSON file on the same downloaded filings"
+    )
+    parser.add_argument(
+        "--sweep",
+        default=None,
+        metavar="RESULTS_CSV",
+        help="Re-price recorded oracle decisions over a latency grid instead of running the oracle"
+    )
+    parser.add_argument(
+        "--latency-max",
+        type=float,
+        default=120.0,
+        help="Largest latency of the sweep grid in seconds"
+    )
+    parser.add_argument(
+        "--latency-step",
+        type=float,
+        default=5.0,
+        help="Step of the sweep grid in seconds"
+    )
+
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     args = parser.parse_args()
     output_dir = os.path.dirname(args.output)
@@ -279,12 +663,35 @@ def main():
         f"{base_name}_{timestamp}{ext}"
 )
 
-    with open(args.source, "r") as f:
-        data = json.load(f)
+    store = CaseStore(args.source) if is_case_store(args.source) else None
+    if store is None:
+        with open(args.source, "r") as f:
+            data = json.load(f)
+
+    if args.sweep is not None:
+        decisions = load_recorded_decisions(args.sweep)
+        if store is not None:
+            data = list(store.rows(np.flatnonzero(np.isin(store.sec_link, list(decisions)))))
+
+        latencies = np.arange(0.0, args.latency_max + args.latency_step / 2, args.latency_step)
+        sweep = latency_sweep(data, decisions, latencies)
+        if not sweep:
+            print("\nNo recorded decisions match cases with price series.")
+            return
+
+        sweep_output = os.path.join(output_dir, f"{base_name}_sweep_{timestamp}{ext}")
+        write_sweep_csv(sweep, sweep_output)
+        print_sweep(sweep)
+        print(f"\nSweep written to {sweep_output}")
+        return
 
     np.random.seed(args.seed)
 
-    if args.limit is not None:
+    if store is not None:
+        # only the sampled cases are read from the memory-mapped columns
+        indices = store.sample(args.limit) if args.limit is not None else None
+        data = list(store.rows(indices))
+    elif args.limit is not None:
         data = np.random.choice(data, size=args.limit, replace=False)
 
     backtest_data = [
@@ -294,14 +701,32 @@ def main():
             row.get("description", ""),
             LinearTimeSeries(row["price_series"]) if "price_series" in row else None,
             row.get("sec_time_stamp"),
+            row.get("slug", ""),
+            OrderBookStore.load_for_slug(args.books, row["slug"]) if args.books and "slug" in row else None,
         )
         for row in data
     ]
 
-    from edgar_api import EDGAR
-    oracle = Oracle(EDGAR())
-
-    backtest = Backtest(oracle, backtest_data)
+    from edgar_api import BACKGROUND, EDGAR
+
+    if args.matrix is not None:
+        edgar = EDGAR(min_priority=BACKGROUND)
+        oracles = {name: Oracle(edgar, **cfg) for name, cfg in load_variants(args.matrix).items()}
+        matrix = MatrixBacktest(oracles, backtest_data)
+        matrix_output = os.path.join(output_dir, f"{base_name}_matrix_{timestamp}{ext}")
+        try:
+            matrix.run()
+        except KeyboardInterrupt:
+            print("\nBacktest interrupted by user.")
+        finally:
+            write_matrix_csv(matrix.results, matrix_output)
+            matrix.print_results()
+            print(f"\nResults written to {matrix_output}")
+        return
+
+    oracle = Oracle(EDGAR(min_priority=BACKGROUND))
+
+    backtest = Backtest(oracle, backtest_data, order_size=args.order_size, max_book_staleness=args.max_book_staleness)
 
     try:
         backtest.run()
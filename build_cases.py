@@ -0,0 +1,295 @@
+import argparse
+import concurrent.futures
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlencode, urlparse
+
+import requests
+
+from edgar_api import BACKGROUND, EDGAR, default_scheduler
+from polymarket_api import DataFeed, Utils
+
+# Builds backtest cases (backtest_data/cases/*.json) from resolved Polymarket earnings slugs:
+#   Gamma market metadata -> ticker/CIK -> SEC submissions (earnings 8-K) -> CLOB price history.
+# Every raw response is cached under backtest_data/raw_cache, so re-runs only fetch what is new.
+
+logger = logging.getLogger(__name__)
+
+GAMMA_URL = os.getenv("GAMMA_API_URL", "https://gamma-api.polymarket.com") + "/markets/slug/"
+CLOB_URL = os.getenv("CLOB_API_URL", "https://clob.polymarket.com")
+
+# same identity EDGAR() sends, SEC rejects requests without a User-Agent
+SEC_HEADERS = {"User-Agent": "CTU Prague TAB team mathais.palme@seznam.cz"}
+
+DEFAULT_OUTPUT = "backtest_data/cases/time_series_data.json"
+DEFAULT_CACHE_DIR = "backtest_data/raw_cache"
+
+# requests per second per host group; sec.gov goes through the shared EDGAR request scheduler
+HOST_RATE_LIMITS = {
+    "gamma-api.polymarket.com": 10.0,
+    "clob.polymarket.com": 10.0,
+}
+
+EARNINGS_FORMS = ("8-K", "10-Q", "10-K")
+FILING_WINDOW_BEFORE = timedelta(days=3)
+FILING_WINDOW_AFTER = timedelta(days=45)  # markets resolve "No" after 45 days anyway
+
+SERIES_WINDOW_SECONDS = 300  # price_series covers [sec - 5 min, sec + 5 min]
+CONVERGENCE_WINDOW_SECONDS = 6 * 3600
+CONVERGENCE_PRICE = 0.99
+
+
+def host_group(url) -> str:
+    host = urlparse(url).netloc
+    return "sec.gov" if host.endswith("sec.gov") else host
+
+
+class HostRateLimiter:
+    """Spaces requests per host group; threads reserve a slot under the lock and sleep outside it."""
+
+    def __init__(self, limits: dict, default_rate: float = 5.0):
+        self.intervals = {host: 1.0 / rate for host, rate in limits.items()}
+        self.default_interval = 1.0 / default_rate
+        self.next_slot = {}
+        self.lock = threading.Lock()
+
+    def wait(self, url):
+        group = host_group(url)
+        if group == "sec.gov":
+            # SEC's allowance is shared with the sentinel and triggers, case building only gets what they leave
+            default_scheduler().acquire(BACKGROUND, flow="build_cases")
+            return
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot.get(group, 0.0))
+            self.next_slot[group] = slot + self.intervals.get(group, self.default_interval)
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+class RawCache:
+    """On-disk cache of raw JSON responses keyed by the full request URL."""
+
+    def __init__(self, cache_dir, limiter: HostRateLimiter, headers: dict | None = None):
+        self.cache_dir = cache_dir
+        self.limiter = limiter
+        self.headers = headers or {}
+        self.hits = 0
+        self.fetches = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def path_for(self, url):
+        group = host_group(url)
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, group, key + ".json")
+
+    def get_json(self, url, params=None, cache_if=None, refresh=False):
+        """
+        Returns the decoded JSON of url (+params) from the cache or the network.
+        cache_if(data) -> bool can veto caching, e.g. for markets that are not resolved yet.
+        refresh=True skips the cached copy and overwrites it.
+        """
+        if params:
+            url = f"{url}?{urlencode(params)}"
+
+        path = self.path_for(url)
+        if not refresh and os.path.exists(path):
+            self.hits += 1
+            with open(path, "r") as f:
+                return json.load(f)
+
+        self.limiter.wait(url)
+        self.fetches += 1
+        resp = requests.get(url, headers=self.headers, timeout=30)
+        resp.raise_for_status()
+        data = resp.json()
+
+        if cache_if is None or cache_if(data):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = path + ".tmp"
+            with open(tmp, "w") as f:
+                f.write(resp.text)
+            os.replace(tmp, path)
+        return data
+
+
+def resolved_outcome(slug_data) -> str | None:
+    prices = [float(p) for p in slug_data["outcome_prices"]]
+    if prices == [1.0, 0.0]:
+        return "Yes"
+    if prices == [0.0, 1.0]:
+        return "No"
+    return None
+
+
+def find_earnings_filing(submissions: dict, expected: datetime):
+    """Earliest earnings filing accepted in the window around the expected release date."""
+    recent = submissions["filings"]["recent"]
+    start = expected - FILING_WINDOW_BEFORE
+    end = expected + FILING_WINDOW_AFTER
+
+    candidates = []
+    for i, form in enumerate(recent["form"]):
+        if form not in EARNINGS_FORMS:
+            continue
+        accepted = EDGAR.parse_acceptance_datetime(recent["acceptanceDateTime"][i])
+        if not start <= accepted <= end:
+            continue
+        items = recent.get("items", [""] * len(recent["form"]))[i] or ""
+        # 8-K item 2.02 is "Results of Operations and Financial Condition"
+        rank = 0 if form == "8-K" and "2.02" in items else 1
+        candidates.append((rank, accepted, recent["accessionNumber"][i]))
+
+    if not candidates:
+        return None
+    _, accepted, accession = min(candidates)
+    return accepted, accession
+
+
+class CaseBuilder:
+    def __init__(self, cache: RawCache):
+        self.cache = cache
+        self._ciks = None
+        self._ciks_lock = threading.Lock()
+
+    def cik_for_ticker(self, ticker):
+        with self._ciks_lock:
+            if self._ciks is None:
+                tickers = self.cache.get_json(EDGAR.TICKERS_URL)
+                self._ciks = {v["ticker"]: v["cik_str"] for v in tickers.values()}
+        return self._ciks.get(ticker)
+
+    def price_history(self, token_id, start_ts, end_ts):
+        start_dt = datetime.fromtimestamp(start_ts, tz=timezone.utc)
+        end_dt = datetime.fromtimestamp(end_ts, tz=timezone.utc)
+        params = DataFeed.price_history_params(token_id, start_dt, end_dt, fidelity=1)
+        return DataFeed.parse_price_history(self.cache.get_json(f"{CLOB_URL}/prices-history", params))
+
+    def build(self, slug) -> dict:
+        slug_data = DataFeed.parse_slug_data(
+            self.cache.get_json(GAMMA_URL + slug, cache_if=lambda d: d.get("closed"))
+        )
+        target = resolved_outcome(slug_data)
+        if target is None:
+            raise ValueError("market is not resolved")
+
+        ticker = Utils.extract_ticker_from_slug(slug)
+        cik = self.cik_for_ticker(ticker)
+        if cik is None:
+            raise ValueError(f"no CIK for ticker {ticker}")
+
+        cik_str = "CIK" + str(cik).zfill(10)
+        submissions_url = EDGAR.SUBMISSIONS_URL + cik_str + ".json"
+        expected = Utils.extract_expected_release_date(slug)
+        filing = find_earnings_filing(self.cache.get_json(submissions_url), expected)
+        if filing is None:
+            # the cached submissions may predate this quarter's filing
+            filing = find_earnings_filing(self.cache.get_json(submissions_url, refresh=True), expected)
+        if filing is None:
+            raise ValueError("no earnings filing around the expected release date")
+        accepted, accession = filing
+
+        sec_time_stamp = int(accepted.timestamp())
+        token_id = slug_data["outcome_addresses"][target]
+
+        series = self.price_history(
+            token_id, sec_time_stamp - SERIES_WINDOW_SECONDS, sec_time_stamp + SERIES_WINDOW_SECONDS
+        )
+        if not series:
+            raise ValueError("empty price history")
+
+        history = self.price_history(
+            token_id,
+            sec_time_stamp - CONVERGENCE_WINDOW_SECONDS,
+            sec_time_stamp + CONVERGENCE_WINDOW_SECONDS,
+        )
+        convergence_timestamp = next(
+            (t for t, p in history if p >= CONVERGENCE_PRICE), int(history[-1][0]) if history else None
+        )
+        if convergence_timestamp is None:
+            raise ValueError("empty convergence history")
+
+        return {
+            "slug": slug,
+            "delta": int(convergence_timestamp) - sec_time_stamp,
+            "convergence_timestamp": int(convergence_timestamp),
+            "sec_time_stamp": sec_time_stamp,
+            "sec_link": f"{EDGAR.DATA_URL}{cik}/{accession.replace('-', '')}",
+            "target": target,
+            "description": slug_data["description"],
+            "price_series": [[int(t), p] for t, p in series],
+        }
+
+
+def load_cases(path) -> list:
+    if not os.path.exists(path):
+        return []
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def write_cases(cases, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(cases, f, indent=2)
+    os.replace(tmp, path)
+
+
+def build_cases(slugs, output_path, cache_dir=DEFAULT_CACHE_DIR, workers=8):
+    """Builds cases for slugs missing from output_path and merges them into it."""
+    cases = load_cases(output_path)
+    done = {c["slug"] for c in cases}
+    todo = list(dict.fromkeys(s for s in slugs if s not in done))
+
+    limiter = HostRateLimiter(HOST_RATE_LIMITS)
+    builder = CaseBuilder(RawCache(cache_dir, limiter, SEC_HEADERS))
+
+    failed = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as ex:
+        futures = {ex.submit(builder.build, slug): slug for slug in todo}
+        for fut in concurrent.futures.as_completed(futures):
+            slug = futures[fut]
+            try:
+                cases.append(fut.result())
+            except Exception as e:
+                failed[slug] = str(e)
+                logger.warning(f"Skipping {slug}: {e}")
+
+    if len(cases) > len(done):
+        write_cases(cases, output_path)
+
+    print(f"Cases: {len(done)} existing, {len(todo) - len(failed)} built, {len(failed)} failed")
+    print(f"Raw cache: {builder.cache.hits} hits, {builder.cache.fetches} fetches")
+    for slug, reason in failed.items():
+        print(f"  {slug}: {reason}")
+    return cases
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build backtest cases from resolved earnings slugs.")
+    parser.add_argument("slugs", nargs="*", help="Polymarket slugs or event URLs")
+    parser.add_argument("-f", "--file", default=None, help="File with one slug or URL per line")
+    parser.add_argument("-o", "--output", default=DEFAULT_OUTPUT, help="Case JSON file to update")
+    parser.add_argument("--cache", default=DEFAULT_CACHE_DIR, help="Raw response cache folder")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent slugs")
+
+    args = parser.parse_args()
+    slugs = list(args.slugs)
+    if args.file:
+        with open(args.file, "r") as f:
+            slugs += [line.strip() for line in f if line.strip()]
+    slugs = [Utils.extract_slug_from_url(s) for s in slugs]
+
+    build_cases(slugs, args.output, args.cache, args.workers)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,192 @@
+import argparse
+import json
+import os
+
+import numpy as np
+
+# Columnar on-disk layout for backtest cases (a directory, by convention "<name>.cases"):
+#   timestamps.npy / prices.npy   packed price series of all cases
+#   offsets.npy                   case i owns [offsets[i], offsets[i + 1]) of the packed arrays
+#   descriptions.bin              deduplicated UTF-8 descriptions, sliced by desc_offsets.npy
+#   desc_idx.npy                  description index per case
+#   slug.npy, sec_link.npy        fixed width strings
+#   sec_time_stamp.npy, convergence_timestamp.npy, delta.npy   float64, NaN when missing
+#   target.npy                    1 = Yes, 0 = No, -1 = anything else
+# Every array is opened with mmap, so only the selected cases are ever read from disk.
+
+CASE_STORE_VERSION = 1
+TARGET_CODES = {"yes": 1, "no": 0}
+TARGET_NAMES = {1: "Yes", 0: "No"}
+NUMERIC_COLUMNS = ["sec_time_stamp", "convergence_timestamp", "delta"]
+
+
+def is_case_store(path) -> bool:
+    return os.path.isfile(os.path.join(path, "meta.json"))
+
+
+def convert_cases(source_path, output_dir):
+    """Converts a backtest case JSON file into the columnar layout."""
+    with open(source_path, "r") as f:
+        rows = json.load(f)
+
+    os.makedirs(output_dir, exist_ok=True)
+
+    lengths = np.array([len(row.get("price_series") or []) for row in rows], dtype=np.int64)
+    offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+
+    series = np.array(
+        [p for row in rows for p in (row.get("price_series") or [])], dtype=np.float64
+    ).reshape(-1, 2)
+
+    descriptions = {}
+    desc_idx = np.array(
+        [descriptions.setdefault(row.get("description", ""), len(descriptions)) for row in rows],
+        dtype=np.int32,
+    )
+    blobs = [d.encode("utf-8") for d in descriptions]
+    desc_offsets = np.zeros(len(blobs) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in blobs], out=desc_offsets[1:])
+
+    columns = {
+        "timestamps": series[:, 0],
+        "prices": series[:, 1],
+        "offsets": offsets,
+        "desc_idx": desc_idx,
+        "desc_offsets": desc_offsets,
+        "slug": np.array([row.get("slug", "") for row in rows], dtype=str),
+        "sec_link": np.array([row["sec_link"] for row in rows], dtype=str),
+        "target": np.array(
+            [TARGET_CODES.get(str(row.get("target", "")).lower(), -1) for row in rows], dtype=np.int8
+        ),
+    }
+    for name in NUMERIC_COLUMNS:
+        columns[name] = np.array(
+            [row.get(name, np.nan) if row.get(name) is not None else np.nan for row in rows],
+            dtype=np.float64,
+        )
+
+    for name, values in columns.items():
+        np.save(os.path.join(output_dir, f"{name}.npy"), values)
+
+    with open(os.path.join(output_dir, "descriptions.bin"), "wb") as f:
+        for b in blobs:
+            f.write(b)
+
+    with open(os.path.join(output_dir, "meta.json"), "w") as f:
+        json.dump(
+            {
+                "version": CASE_STORE_VERSION,
+                "n_cases": len(rows),
+                "n_points": int(offsets[-1]),
+                "n_descriptions": len(blobs),
+                "source": os.path.basename(source_path),
+            },
+            f,
+        )
+
+    return len(rows)
+
+
+class CaseStore:
+    """Memory-mapped reader for the columnar case layout."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), "r") as f:
+            self.meta = json.load(f)
+        if self.meta.get("version") != CASE_STORE_VERSION:
+            raise ValueError(f"Unsupported case store version: {self.meta.get('version')}")
+
+        def load(name):
+            return np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+
+        self.timestamps = load("timestamps")
+        self.prices = load("prices")
+        self.offsets = load("offsets")
+        self.desc_idx = load("desc_idx")
+        self.desc_offsets = load("desc_offsets")
+        self.slug = load("slug")
+        self.sec_link = load("sec_link")
+        self.target = load("target")
+        self.columns = {name: load(name) for name in NUMERIC_COLUMNS}
+
+        desc_path = os.path.join(path, "descriptions.bin")
+        if os.path.getsize(desc_path) > 0:
+            self.descriptions = np.memmap(desc_path, dtype=np.uint8, mode="r")
+        else:
+            self.descriptions = np.zeros(0, dtype=np.uint8)
+
+    def __len__(self):
+        return int(self.meta["n_cases"])
+
+    def sample(self, size, seed=None):
+        """Random case indices without replacement (np.random.choice semantics)."""
+        if seed is not None:
+            np.random.seed(seed)
+        return np.random.choice(len(self), size=size, replace=False)
+
+    def filter(self, target=None, has_price_series=None, slug_prefix=None, indices=None):
+        """Case indices matching all given conditions, evaluated on the columns only."""
+        idx = np.arange(len(self)) if indices is None else np.asarray(indices)
+        mask = np.ones(len(idx), dtype=bool)
+
+        if target is not None:
+            mask &= self.target[idx] == TARGET_CODES.get(target.lower(), -1)
+        if has_price_series is not None:
+            has = self.offsets[idx + 1] > self.offsets[idx]
+            mask &= has if has_price_series else ~has
+        if slug_prefix is not None:
+            mask &= np.char.startswith(self.slug[idx], slug_prefix)
+
+        return idx[mask]
+
+    def description(self, i):
+        d = self.desc_idx[i]
+        start, end = self.desc_offsets[d], self.desc_offsets[d + 1]
+        return self.descriptions[start:end].tobytes().decode("utf-8")
+
+    def price_series(self, i):
+        """View of (timestamps, prices) for case i."""
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return self.timestamps[start:end], self.prices[start:end]
+
+    def row(self, i) -> dict:
+        """Case i in the same shape as a row of the source JSON."""
+        row = {
+            "slug": str(self.slug[i]),
+            "sec_link": str(self.sec_link[i]),
+            "target": TARGET_NAMES.get(int(self.target[i]), ""),
+            "description": self.description(i),
+        }
+        for name, values in self.columns.items():
+            v = values[i]
+            if not np.isnan(v):
+                row[name] = int(v) if float(v).is_integer() else float(v)
+
+        ts, prices = self.price_series(i)
+        if len(ts):
+            row["price_series"] = np.stack([ts, prices], axis=1).tolist()
+        return row
+
+    def rows(self, indices=None):
+        if indices is None:
+            indices = range(len(self))
+        for i in indices:
+            yield self.row(int(i))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert backtest case JSON to the columnar case store.")
+    parser.add_argument("source", help="Backtest case JSON file")
+    parser.add_argument(
+        "output",
+        nargs="?",
+        default=None,
+        help="Output directory, defaults to <source without .json>.cases",
+    )
+
+    args = parser.parse_args()
+    output = args.output or os.path.splitext(args.source)[0] + ".cases"
+    n = convert_cases(args.source, output)
+    print(f"Converted {n} cases into {output}")
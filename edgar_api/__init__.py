@@ -1 +1,3 @@
 from .edgar_api import EDGAR
+from .scheduler import BACKGROUND, HOT, TRIGGER, DeadlineExceeded, RequestScheduler, default_scheduler, set_default_scheduler
+from .filings import FilingDocument, FilingResolver, press_releases
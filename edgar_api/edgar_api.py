@@ -9,35 +9,71 @@ import os
 import pdfkit
 import pytz
 
+import metrics
+from .scheduler import BACKGROUND, HOT, TRIGGER, RequestScheduler, default_scheduler
+
+
+def filing_flow(url) -> str:
+    """Scheduler flow of a filing URL: its /Archives/edgar/data/<cik>/<accession> directory."""
+    return "/".join(urlparse(url).path.split("/")[:6])
+
+
+# base URLs can point at local stand-ins (standins/, replay.py)
+SEC_WWW_URL = os.getenv("SEC_WWW_URL", "https://www.sec.gov")
+SEC_DATA_URL = os.getenv("SEC_DATA_URL", "https://data.sec.gov")
+
+FEED_RESPONSES = metrics.counter("edgar_feed_responses_total", "EDGAR current-filings feed responses by HTTP status", ("status",))
+
+FEED_PATTERN = re.compile(
+    r"<entry>.*?"
+    r"<title>(?P<title>.*?)</title>.*?"
+    r'<link[^>]+?href="(?P<href>[^"]+)"[^>]*?>.*?'
+    r"<updated>(?P<updated>.*?)</updated>.*?"
+    r"</entry>",
+    re.DOTALL | re.IGNORECASE,
+)
+
 
 # 2 750 450
 # 4 850 539
 class EDGAR:
-    SUBMISSIONS_URL = "https://data.sec.gov/submissions/"
-    DATA_URL = "https://www.sec.gov/Archives/edgar/data/"  # 1722684/000143774924032171/0001437749-24-032171.txt
-    TICKERS_URL = "https://www.sec.gov/files/company_tickers.json"
+    SUBMISSIONS_URL = f"{SEC_DATA_URL}/submissions/"
+    DATA_URL = f"{SEC_WWW_URL}/Archives/edgar/data/"  # 1722684/000143774924032171/0001437749-24-032171.txt
+    TICKERS_URL = f"{SEC_WWW_URL}/files/company_tickers.json"
+    FEED_URL = f"{SEC_WWW_URL}/cgi-bin/browse-edgar?action=getcurrent&CIK=&type=&company=&dateb=&owner=include&start=0&count=40&output=atom"
 
     COMPANY_TICKERS_AND_CIKS = None
-    last_call_time = 0
-    min_call_time = 1 / 9  # seconds
 
     @staticmethod
-    def wait_for_it():
-        while time.perf_counter() - EDGAR.last_call_time <= EDGAR.min_call_time:
-            # time.sleep(time.perf_counter() - last_call_time)
-            pass
-        EDGAR.last_call_time = time.perf_counter()
+    def wait_for_it(priority=BACKGROUND):
+        """Waits for a slot of the shared SEC request budget."""
+        default_scheduler().acquire(priority)
 
-    def __init__(self):
+    def __init__(self, min_priority=TRIGGER, scheduler: RequestScheduler = None):
+        """
+        min_priority caps the class of every request this instance makes, e.g. backtests pass
+        BACKGROUND so their trigger-path calls never compete with live alerts.
+        """
         self.__SYSTEM_NAME__ = "CTU Prague TAB team"
         self.__email__ = "mathais.palme@seznam.cz"
         self.headers = {"User-Agent": f"{self.__SYSTEM_NAME__} {self.__email__}"}
+        self.min_priority = min_priority
+        self.scheduler = scheduler or default_scheduler()
+        self._feed_cache = (None, None, None)  # (ETag, Last-Modified, parsed entries)
+
+        # shared by every instance, later ones (e.g. the oracle's, created on the first trigger)
+        # must not queue a background request behind the sentinel's feed polling
+        if EDGAR.COMPANY_TICKERS_AND_CIKS is None:
+            EDGAR.COMPANY_TICKERS_AND_CIKS = self.get_tickers()
 
-        EDGAR.COMPANY_TICKERS_AND_CIKS = self.get_tickers()
+    def _get(self, url, priority=BACKGROUND, flow=None, deadline=None, **kwargs):
+        self.scheduler.acquire(max(priority, self.min_priority), flow, deadline)
+        kwargs.setdefault("headers", self.headers)
+        return requests.get(url, **kwargs)
 
     def ping(self):
         url = EDGAR.TICKERS_URL
-        response = requests.get(url, headers=self.headers)
+        response = self._get(url)
         return response
 
     def does_ticker_exit(self, ticker):
@@ -47,7 +83,7 @@ class EDGAR:
         return False
 
     def get_tickers(self):
-        response = requests.get(EDGAR.TICKERS_URL, headers=self.headers)
+        response = self._get(EDGAR.TICKERS_URL)
         return json.loads(response.text)
 
     def get_cik_by_ticker(self, ticker):
@@ -68,17 +104,17 @@ class EDGAR:
                 return EDGAR.COMPANY_TICKERS_AND_CIKS[i]["title"]
         return None
 
-    def custom_request(self, url):
-        response = requests.get(url, headers=self.headers)
+    def custom_request(self, url, priority=BACKGROUND, flow=None, deadline=None):
+        response = self._get(url, priority, flow, deadline)
         return response
 
-    def get_submission_search_by_cik(self, cik, deep=False) -> dict:
+    def get_submission_search_by_cik(self, cik, deep=False, priority=BACKGROUND) -> dict:
         """
         To get all historical submitions you must use deep = True otherwise only aproximitly first 1000 will be returned
         """
         cik_str = "CIK" + (10 - len(str(cik))) * "0" + str(cik)
         url = EDGAR.SUBMISSIONS_URL + cik_str + ".json"
-        result = requests.get(url, headers=self.headers)
+        result = self._get(url, priority, flow=cik)
         result_json = json.loads(result.text)
         # return url
         # print(url)
@@ -99,9 +135,7 @@ class EDGAR:
                 file_name = entry["name"]
                 file_names.append(file_name)
 
-                result = requests.get(
-                    EDGAR.SUBMISSIONS_URL + file_name, headers=self.headers
-                )
+                result = self._get(EDGAR.SUBMISSIONS_URL + file_name, priority, flow=cik)
                 result_json = json.loads(result.text)
                 accessionNumber += result_json["accessionNumber"]
                 core_type += result_json["core_type"]
@@ -110,17 +144,22 @@ class EDGAR:
                 primaryDocument += result_json["primaryDocument"]
 
         acceptanceDateTime = [
+            EDGAR.parse_acceptance_datetime(time_stamp) for time_stamp in acceptanceDateTime
+        ]
+        return accessionNumber, form, core_type, acceptanceDateTime, primaryDocument
+
+    @staticmethod
+    def parse_acceptance_datetime(time_stamp) -> datetime:
+        return (
             datetime.strptime(time_stamp, "%Y-%m-%dT%H:%M:%S.%fZ")
             .replace(tzinfo=ZoneInfo("America/New_York"))
             .astimezone(ZoneInfo("UTC"))
-            for time_stamp in acceptanceDateTime
-        ]
-        return accessionNumber, form, core_type, acceptanceDateTime, primaryDocument
+        )
 
-    def get_legecy_submissions_by_cik(self, cik, add_dashes=True):
+    def get_legecy_submissions_by_cik(self, cik, add_dashes=True, priority=BACKGROUND):
         request_url = EDGAR.DATA_URL + str(cik)
 
-        result = requests.get(request_url, headers=self.headers, timeout=None)
+        result = self._get(request_url, priority, flow=cik, timeout=None)
 
         pattern = r'alt="folder icon">(.*?)</a>'
         accessionNumber = re.findall(pattern, result.text)
@@ -137,46 +176,57 @@ class EDGAR:
 
         return accessionNumber
 
-    def get_number_of_submissions_by_cik(self, cik):
+    def get_number_of_submissions_by_cik(self, cik, priority=BACKGROUND):
         cik_str = "CIK" + (10 - len(str(cik))) * "0" + str(cik)
-        result = requests.get(
-            EDGAR.SUBMISSIONS_URL + cik_str + ".json", headers=self.headers
-        )
+        result = self._get(EDGAR.SUBMISSIONS_URL + cik_str + ".json", priority, flow=cik)
         result_json = json.loads(result.text)
 
         return len(result_json["filings"]["recent"]["accessionNumber"])
 
-    def get_submission_data(self, cik, accessionNumber):
+    def get_submission_data(self, cik, accessionNumber, priority=BACKGROUND):
         request_url = f"{EDGAR.DATA_URL}{str(cik)}/{str(accessionNumber).replace('-', '')}/{accessionNumber}.txt"
 
-        result = requests.get(request_url, headers=self.headers, timeout=None)
+        result = self._get(request_url, priority, flow=accessionNumber, timeout=None)
 
         return result.text
 
-    def get_rss_feed(self):
-        url = "https://www.sec.gov/cgi-bin/browse-edgar?action=getcurrent&CIK=&type=&company=&dateb=&owner=include&start=0&count=40&output=atom"
-        r = requests.get(url, headers=self.headers, timeout=None)
-        text = r.text
-
-        pattern = re.compile(
-            r"<entry>.*?"
-            r"<title>(?P<title>.*?)</title>.*?"
-            r'<link[^>]+?href="(?P<href>[^"]+)"[^>]*?>.*?'
-            r"<updated>(?P<updated>.*?)</updated>.*?"
-            r"</entry>",
-            re.DOTALL | re.IGNORECASE,
-        )
-
-        return [
+    def get_rss_feed(self, priority=HOT):
+        """
+        Conditional GET: the feed's ETag/Last-Modified are sent back, and on 304 Not Modified
+        the previously parsed entries are returned without downloading or parsing the feed.
+        """
+        url = EDGAR.FEED_URL
+        etag, last_modified, cached = self._feed_cache
+        headers = dict(self.headers)
+        if cached is not None:
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+        r = self._get(url, priority, flow="feed", headers=headers, timeout=None)
+        FEED_RESPONSES.inc(status=r.status_code)
+        if r.status_code == 304 and cached is not None:
+            return cached
+
+        entries = [
             (m.group("title"), m.group("href"), m.group("updated"))
-            for m in pattern.finditer(text)
+            for m in FEED_PATTERN.finditer(r.text)
         ]
+        if r.status_code == 200:
+            self._feed_cache = (r.headers.get("ETag"), r.headers.get("Last-Modified"), entries)
+        return entries
 
-    def extract_htm_urls(self, url):
+    def get_filing_index(self, filing_url, priority=TRIGGER, deadline=None) -> dict:
+        """index.json of a filing directory: {"directory": {"item": [{"name", "size", ...}]}}"""
+        response = self._get(filing_url.rstrip("/") + "/index.json", priority, filing_flow(filing_url), deadline, timeout=10)
+        response.raise_for_status()
+        return response.json()
+
+    def extract_htm_urls(self, url, priority=TRIGGER, deadline=None):
         """
         Excludes all R*.htm documents
         """
-        res = self.custom_request(url)
+        res = self.custom_request(url, priority, filing_flow(url), deadline)
         key_string = "Directory Listing"
 
         key_string_index = res.text.find(key_string)
@@ -188,24 +238,27 @@ class EDGAR:
             r'href="([^"]*?/(?!(R\d+))[^/"]*?\.htm)"', extracted_html_content
         )
         cleaned_urls = [url[0] for url in urls]
-        cleaned_urls = ["https://www.sec.gov" + u for u in cleaned_urls]
+        cleaned_urls = [SEC_WWW_URL + u for u in cleaned_urls]
 
         return cleaned_urls
 
-    def download_pdf_document(self, document_url, download_path, document_name):
+    def download_pdf_document(self, document_url, download_path, document_name, priority=TRIGGER, deadline=None):
         path = os.path.join(download_path, document_name + ".pdf")
+        self.scheduler.acquire(max(priority, self.min_priority), filing_flow(document_url), deadline)
         pdfkit.from_url(document_url, path)
         # HTML(document_url).write_pdf(path)
 
         return path
 
-    def download_document(self, document_url, download_path, document_name):
+    def download_document(self, document_url, download_path, document_name, priority=TRIGGER, deadline=None):
         headers = {
             "User-Agent": "tab_team3 polymarket_earnings_arbitrage tab_team3@example.com",
             "Accept-Encoding": "gzip, deflate",
-            "Host": "www.sec.gov"
+            "Host": urlparse(document_url).netloc
         }
-        response = requests.get(document_url, headers=headers, stream=True, timeout=30)
+        response = self._get(
+            document_url, priority, filing_flow(document_url), deadline, headers=headers, stream=True, timeout=30
+        )
         response.raise_for_status()
 
         # 1. Try to infer extension from URL
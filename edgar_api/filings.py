@@ -0,0 +1,128 @@
+import collections
+import logging
+import re
+import threading
+from dataclasses import dataclass
+from urllib.parse import urlparse
+
+from .scheduler import TRIGGER
+
+# Filing documents from the directory's index.json instead of scraping the HTML listing.
+# Exhibit types are inferred from the file names EDGAR filers use ("ex991.htm",
+# "ccl-20251219xex991.htm", "d123456dex991.htm", "ex99-1.htm", "exhibit991.htm", "ex_991.htm",
+# "a8-kexhibit991q32025.htm" -> EX-99.1), the main document
+# comes from the submissions API's primaryDocument when the caller has it.
+
+DOCUMENT_EXTENSIONS = (".htm", ".html")
+EXHIBIT_PATTERN = re.compile(r"ex(?:hibit)?[-_]?(\d{1,4})(?:[-_.](\d{1,2}))?(?=[^0-9]|$)")
+SKIPPED_DOCUMENT = re.compile(r"^(R\d+\.htm|.*-index(-headers)?\.html?|FilingSummary.*)$", re.IGNORECASE)
+PRIMARY = "PRIMARY"  # type of the main document when the form is unknown
+OTHER = "OTHER"  # further documents without an exhibit number
+CACHE_SIZE = 512  # filings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class FilingDocument:
+    name: str
+    url: str
+    type: str  # "EX-99.1", "EX-31.1", the form ("8-K") or PRIMARY for the main document
+    size: int | None  # bytes, as listed in index.json
+
+    @property
+    def is_press_release(self) -> bool:
+        return self.type.startswith("EX-99")
+
+
+def exhibit_type(name: str) -> str | None:
+    """ "ex991.htm" -> "EX-99.1", "ex-31_2.htm" -> "EX-31.2", None for a name without an exhibit number."""
+    matches = EXHIBIT_PATTERN.findall(name.lower().rsplit(".", 1)[0])
+    if not matches:
+        return None
+    number, minor = matches[-1]
+    if not minor and len(number) > 2:
+        number, minor = number[:2], number[2:]  # "991" -> 99.1, "1011" -> 10.11
+    return f"EX-{int(number)}.{minor}" if minor else f"EX-{int(number)}"
+
+
+def press_releases(documents: list) -> list:
+    """The press releases (EX-99 exhibits) among the documents, all of them if there is none."""
+    releases = [d for d in documents if d.is_press_release]
+    return releases or documents
+
+
+def document_order(document: FilingDocument):
+    """Press releases (EX-99.1 first), then the main document, then the remaining exhibits."""
+    if document.is_press_release:
+        return (0, document.type != "EX-99.1", document.type)
+    if not document.type.startswith("EX-"):
+        return (1, document.type == OTHER, "")
+    return (2, False, document.type)
+
+
+def filing_directory(url) -> str:
+    """https://www.sec.gov/Archives/edgar/data/<cik>/<accession> for any URL inside the filing."""
+    parsed = urlparse(url)
+    return f"{parsed.scheme or 'https'}://{parsed.netloc or 'www.sec.gov'}" + "/".join(parsed.path.split("/")[:6])
+
+
+class FilingResolver:
+    """
+    Typed document list of a filing from one index.json request, cached per accession.
+    Falls back to scraping the directory listing when index.json is unavailable.
+    """
+
+    def __init__(self, edgar, cache_size: int = CACHE_SIZE):
+        self.edgar = edgar
+        self.cache_size = cache_size
+        self.cache = collections.OrderedDict()  # {filing directory: [(name, size)]}
+        self.lock = threading.Lock()
+
+    def documents(self, filing_url, primary_document=None, form=None, priority=TRIGGER, deadline=None) -> list:
+        """
+        [FilingDocument] in document_order. primary_document is the submissions API's
+        primaryDocument of this filing, form its form type; both are optional hints.
+        """
+        directory = filing_directory(filing_url)
+        with self.lock:
+            cached = self.cache.get(directory)
+            if cached is not None:
+                self.cache.move_to_end(directory)
+        if cached is None:
+            cached = self._fetch(directory, priority, deadline)
+            with self.lock:
+                self.cache[directory] = cached
+                while len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+        return self._typed(directory, cached, primary_document, form)
+
+    def press_release(self, filing_url, **kwargs) -> FilingDocument | None:
+        documents = self.documents(filing_url, **kwargs)
+        return documents[0] if documents and documents[0].is_press_release else None
+
+    def _fetch(self, directory, priority, deadline) -> list:
+        """[(name, size)] of the filing's documents."""
+        try:
+            items = self.edgar.get_filing_index(directory, priority, deadline)["directory"]["item"]
+            return [
+                (item["name"], int(item["size"]) if str(item.get("size", "")).isdigit() else None)
+                for item in items
+                if item["name"].lower().endswith(DOCUMENT_EXTENSIONS) and not SKIPPED_DOCUMENT.match(item["name"])
+            ]
+        except Exception as e:
+            logger.warning(f"index.json of {directory} unavailable ({e}), scraping the directory listing")
+            urls = self.edgar.extract_htm_urls(directory, priority, deadline)
+            return [(u.rsplit("/", 1)[-1], None) for u in urls if not SKIPPED_DOCUMENT.match(u.rsplit("/", 1)[-1])]
+
+    @staticmethod
+    def _typed(directory, entries, primary_document, form) -> list:
+        documents = []
+        main_found = False
+        for name, size in entries:
+            doc_type = exhibit_type(name)
+            if name == primary_document or (doc_type is None and not main_found and primary_document is None):
+                doc_type = form or PRIMARY
+                main_found = True
+            documents.append(FilingDocument(name, f"{directory}/{name}", doc_type or OTHER, size))
+        return sorted(documents, key=document_order)
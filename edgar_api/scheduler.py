@@ -0,0 +1,322 @@
+import argparse
+import collections
+import logging
+import threading
+import time
+
+import numpy as np
+
+import metrics
+
+# One request budget for everything that talks to SEC (about 10 req/s across all of its hosts).
+# Callers acquire() a slot before each request; a dispatcher thread hands out slots so that no
+# sliding WINDOW holds more than `rate` grants, always to the most urgent class waiting:
+#   TRIGGER     filing directory and document downloads after an alert
+#   HOT         feed / submissions polling while markets are armed
+#   BACKGROUND  backtests, case building, ticker lists
+# Background work is preempted at request granularity: it is only granted a slot when nothing
+# else waits and no trigger request was granted in the last background_holdoff seconds, so the
+# follow-up requests of a trigger (directory, then documents) never queue behind it. Within a
+# class, flows (e.g. one per filing) are served round-robin so simultaneous triggers share the
+# budget instead of the first filing's documents blocking the second's directory listing.
+# HOT and BACKGROUND stop trigger_reserve grants short of the window's limit and are spaced
+# evenly over the window, so however busy feed polling is, the first trigger_reserve requests
+# of a trigger go out immediately and polling never bunches up at the start of a window.
+
+TRIGGER, HOT, BACKGROUND = 0, 1, 2
+CLASS_NAMES = ("trigger", "hot", "background")
+
+DEFAULT_RATE = 9  # requests per WINDOW, a little under SEC's limit
+WINDOW = 1.0  # seconds
+TRIGGER_RESERVE = 4  # slots per window HOT and BACKGROUND requests leave to triggers
+BACKGROUND_HOLDOFF = 2.0  # seconds
+WAIT_SAMPLES = 2048  # recent wait times kept per class for the percentiles
+STATS_LOG_INTERVAL = 60.0
+
+logger = logging.getLogger(__name__)
+
+WAIT_SECONDS = metrics.histogram("edgar_scheduler_wait_seconds", "Wait for an SEC request slot", ("priority",))
+EXPIRED = metrics.counter("edgar_scheduler_expired_total", "SEC requests that missed their deadline in the queue", ("priority",))
+QUEUE_DEPTH = metrics.gauge("edgar_scheduler_queued", "SEC requests waiting for a slot", ("priority",))
+
+
+class DeadlineExceeded(TimeoutError):
+    """The request was not granted a slot before its deadline."""
+
+
+class _Ticket:
+    __slots__ = ("priority", "flow", "enqueued", "event", "granted", "cancelled")
+
+    def __init__(self, priority, flow):
+        self.priority = priority
+        self.flow = flow
+        self.enqueued = time.monotonic()
+        self.event = threading.Event()
+        self.granted = False
+        self.cancelled = False
+
+
+class _ClassStats:
+    def __init__(self):
+        self.queued = 0
+        self.granted = 0
+        self.expired = 0
+        self.waits = collections.deque(maxlen=WAIT_SAMPLES)
+
+
+class RequestScheduler:
+    def __init__(
+        self,
+        rate: int = DEFAULT_RATE,
+        background_holdoff: float = BACKGROUND_HOLDOFF,
+        trigger_reserve: int = TRIGGER_RESERVE,
+    ):
+        if rate < 1 or trigger_reserve < 0:
+            raise ValueError(f"Need rate >= 1 and trigger_reserve >= 0, got {rate}, {trigger_reserve}")
+        self.rate = int(rate)
+        # HOT keeps at least one slot per window, e.g. with a small share of the budget
+        self.trigger_reserve = min(int(trigger_reserve), self.rate - 1)
+        self.background_holdoff = background_holdoff
+        # per class: {flow: deque of tickets}, the OrderedDict order is the round-robin order
+        self.queues = [collections.OrderedDict() for _ in CLASS_NAMES]
+        self.stats_by_class = [_ClassStats() for _ in CLASS_NAMES]
+        self.grants = collections.deque()  # monotonic times of the grants in the last WINDOW
+        self.paced_limit = self.rate - self.trigger_reserve  # HOT and BACKGROUND grants per window
+        self.last_paced = -float("inf")
+        self.last_trigger = -float("inf")
+        self.last_stats_log = time.monotonic()
+        self.cond = threading.Condition()
+        self.thread: threading.Thread = None
+        for priority, name in enumerate(CLASS_NAMES):
+            QUEUE_DEPTH.set_function(lambda p=priority: self.stats_by_class[p].queued, priority=name)
+
+    def acquire(self, priority: int = BACKGROUND, flow=None, deadline: float | None = None) -> float:
+        """
+        Blocks until a slot is granted, returns the wait in seconds. deadline is relative in
+        seconds; DeadlineExceeded is raised if no slot was granted by then.
+        """
+        ticket = _Ticket(priority, flow)
+        with self.cond:
+            self.queues[priority].setdefault(flow, collections.deque()).append(ticket)
+            self.stats_by_class[priority].queued += 1
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._dispatch, name="edgar-scheduler", daemon=True)
+                self.thread.start()
+            self.cond.notify()
+
+        if ticket.event.wait(deadline):
+            return self._granted(ticket)
+
+        with self.cond:
+            if ticket.granted:  # granted between the timeout and taking the lock
+                return self._granted(ticket)
+            ticket.cancelled = True
+            stats = self.stats_by_class[priority]
+            stats.queued -= 1
+            stats.expired += 1
+        EXPIRED.inc(priority=CLASS_NAMES[priority])
+        raise DeadlineExceeded(f"No {CLASS_NAMES[priority]} slot within {deadline:.2f}s")
+
+    @staticmethod
+    def _granted(ticket) -> float:
+        wait = time.monotonic() - ticket.enqueued
+        WAIT_SECONDS.observe(wait, priority=CLASS_NAMES[ticket.priority])
+        return wait
+
+    def _pop(self, priority):
+        """Next live ticket of a class, rotating its flows; drops cancelled tickets on the way."""
+        queues = self.queues[priority]
+        while queues:
+            flow, tickets = next(iter(queues.items()))
+            ticket = tickets.popleft()
+            if tickets:
+                queues.move_to_end(flow)
+            else:
+                del queues[flow]
+            if not ticket.cancelled:
+                return ticket
+        return None
+
+    def _has_waiting(self, priority) -> bool:
+        return self.stats_by_class[priority].queued > 0
+
+    def _window_wait(self, now, limit) -> float | None:
+        """None when fewer than `limit` grants are in the window ending now, else the seconds until that holds."""
+        while self.grants and self.grants[0] <= now - WINDOW:
+            self.grants.popleft()
+        if len(self.grants) < limit:
+            return None
+        return self.grants[len(self.grants) - limit] + WINDOW - now
+
+    def _paced_wait(self, now) -> float | None:
+        """_window_wait() for HOT and BACKGROUND, which also keep WINDOW / paced_limit apart."""
+        wait = max(self._window_wait(now, self.paced_limit) or 0.0, self.last_paced + WINDOW / self.paced_limit - now)
+        return wait if wait > 0 else None
+
+    def _next_ticket(self, now):
+        """(ticket, None) to grant now, or (None, seconds to wait, None if nothing is queued)."""
+        if self._has_waiting(TRIGGER):
+            wait = self._window_wait(now, self.rate)
+            return (self._pop(TRIGGER), None) if wait is None else (None, wait)
+        if self._has_waiting(HOT):
+            wait = self._paced_wait(now)
+            return (self._pop(HOT), None) if wait is None else (None, wait)
+        if self._has_waiting(BACKGROUND):
+            resume = self.last_trigger + self.background_holdoff
+            if now < resume:
+                return None, resume - now
+            wait = self._paced_wait(now)
+            return (self._pop(BACKGROUND), None) if wait is None else (None, wait)
+        return None, None
+
+    def _dispatch(self):
+        while True:
+            with self.cond:
+                now = time.monotonic()
+                # a request queued while waiting (e.g. a trigger) wakes the dispatcher to re-decide
+                ticket, retry = self._next_ticket(now)
+                if ticket is None:
+                    self.cond.wait(retry)
+                    self._maybe_log_stats()
+                    continue
+
+                self._grant(ticket, now)
+            self._maybe_log_stats()
+
+    def _grant(self, ticket, now):
+        stats = self.stats_by_class[ticket.priority]
+        stats.queued -= 1
+        stats.granted += 1
+        stats.waits.append(now - ticket.enqueued)
+        if ticket.priority == TRIGGER:
+            self.last_trigger = now
+        else:
+            self.last_paced = now
+        ticket.granted = True
+        ticket.event.set()
+        self.grants.append(now)
+
+    def _maybe_log_stats(self):
+        now = time.monotonic()
+        if now - self.last_stats_log < STATS_LOG_INTERVAL:
+            return
+        self.last_stats_log = now
+        logger.info(f"SEC request scheduler: {self.format_stats()}")
+
+    def stats(self) -> dict:
+        """{class name: queue depth, granted/expired counts and wait percentiles of recent requests}."""
+        with self.cond:
+            snapshot = [(s.queued, s.granted, s.expired, np.array(s.waits)) for s in self.stats_by_class]
+        result = {}
+        for name, (queued, granted, expired, waits) in zip(CLASS_NAMES, snapshot):
+            entry = {"queued": queued, "granted": granted, "expired": expired}
+            if len(waits):
+                p50, p95 = np.percentile(waits, [50, 95]) * 1000
+                entry.update(wait_p50_ms=round(float(p50), 1), wait_p95_ms=round(float(p95), 1), wait_max_ms=round(float(waits.max()) * 1000, 1))
+            result[name] = entry
+        return result
+
+    def format_stats(self) -> str:
+        parts = []
+        for name, s in self.stats().items():
+            waits = f", wait p50 {s['wait_p50_ms']} / p95 {s['wait_p95_ms']} ms" if "wait_p50_ms" in s else ""
+            parts.append(f"{name}: {s['queued']} queued, {s['granted']} granted, {s['expired']} expired{waits}")
+        return "; ".join(parts)
+
+
+_default_scheduler: RequestScheduler = None
+_default_scheduler_lock = threading.Lock()
+
+
+def default_scheduler() -> RequestScheduler:
+    """The process-wide scheduler every EDGAR instance and the case builder share."""
+    global _default_scheduler
+    with _default_scheduler_lock:
+        if _default_scheduler is None:
+            _default_scheduler = RequestScheduler()
+        return _default_scheduler
+
+
+def set_default_scheduler(scheduler: RequestScheduler) -> None:
+    """
+    Replaces the process-wide scheduler, e.g. with a share of the budget when several processes
+    talk to SEC. EDGAR instances keep the scheduler they were created with, so call it first.
+    """
+    global _default_scheduler
+    with _default_scheduler_lock:
+        _default_scheduler = scheduler
+
+
+def max_window_grants(times, window: float = WINDOW) -> int:
+    """Most grants that fall into any sliding window of `window` seconds."""
+    times = sorted(times)
+    most, start = 0, 0
+    for end, t in enumerate(times):
+        while times[start] <= t - window:
+            start += 1
+        most = max(most, end - start + 1)
+    return most
+
+
+class _RecordingScheduler(RequestScheduler):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.log = []  # (grant time, priority)
+
+    def _grant(self, ticket, now):
+        super()._grant(ticket, now)
+        self.log.append((now, ticket.priority))
+
+
+def check(seconds: float, burst: int, interval: float, pollers: int) -> int:
+    """
+    Polls HOT back to back from `pollers` threads and fires a trigger burst every `interval`
+    seconds (the first on the idle scheduler), returns the most grants in any sliding window.
+    """
+    scheduler = _RecordingScheduler()
+    stop = threading.Event()
+
+    def poll():
+        while not stop.is_set():
+            scheduler.acquire(HOT, flow="feed")
+
+    def trigger(n):
+        scheduler.acquire(TRIGGER, flow=f"filing-{n}")
+
+    threads = []
+    start = time.monotonic()
+    for n in range(burst):
+        threads.append(threading.Thread(target=trigger, args=(n,)))
+    for thread in threads:
+        thread.start()
+    for _ in range(pollers):
+        threading.Thread(target=poll, daemon=True).start()
+
+    n = burst
+    while time.monotonic() - start < seconds:
+        time.sleep(interval)
+        for _ in range(burst):
+            thread = threading.Thread(target=trigger, args=(n,))
+            thread.start()
+            threads.append(thread)
+            n += 1
+    for thread in threads:
+        thread.join()
+    stop.set()
+
+    times = [t for t, _ in scheduler.log]
+    trigger_waits = np.array(scheduler.stats_by_class[TRIGGER].waits) * 1000
+    print(f"{len(times)} grants in {times[-1] - times[0]:.1f}s, most in one {WINDOW}s window: {max_window_grants(times)} (limit {scheduler.rate})")
+    print(f"trigger wait p50 {np.percentile(trigger_waits, 50):.1f} ms, max {trigger_waits.max():.1f} ms; {scheduler.format_stats()}")
+    return max_window_grants(times)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Counts scheduler grants per sliding second under HOT polling and trigger bursts.")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--burst", type=int, default=8, help="Trigger requests per burst")
+    parser.add_argument("--interval", type=float, default=3.0, help="Seconds between trigger bursts")
+    parser.add_argument("--pollers", type=int, default=2, help="Threads polling HOT back to back")
+    args = parser.parse_args()
+    most = check(args.seconds, args.burst, args.interval, args.pollers)
+    raise SystemExit(0 if most <= DEFAULT_RATE else 1)
@@ -3,11 +3,14 @@ from time import gmtime, strftime
 from datetime import datetime
 import logging
 import os
+import time
 
 # from multiprocessing import Process, Event
 from threading import Thread, Event
 
+import metrics
 from edgar_api import EDGAR
+from tracing import default_tracer
 # from order import EarningsMarket
 
 LOG_DIR = "logs"
@@ -22,17 +25,34 @@ logging.basicConfig(
 )
 
 
+FEED_POLL_INTERVAL = 0.25  # seconds from one feed poll to the next, within the scheduler's HOT share
+
+FEED_POLL_SECONDS = metrics.histogram("edgar_feed_poll_seconds", "Duration of one feed poll, slot wait included")
+NEW_ENTRIES = metrics.counter("edgar_feed_new_entries_total", "Feed entries seen for the first time")
+ALERTS = metrics.counter("edgar_sentinel_alerts_total", "New filings of an armed CIK")
+SENTINEL_RUNNING = metrics.gauge("edgar_sentinel_running", "1 while the sentinel's feed loop runs")
+SENTINEL_RESTARTS = metrics.counter("edgar_sentinel_restarts_total", "Feed loop failures restarted by the watchdog")
+
+
 class EdgarSentinel:
-    def __init__(self):
+    def __init__(self, poll_interval: float = FEED_POLL_INTERVAL):
         self.edgar: EDGAR = EDGAR()
+        self.poll_interval: float = poll_interval
         self.logger: logging = logging.getLogger(__name__)
         self.thred: Thread = None
         self.running: bool = False
         self.cik_alerts: dict = {}  # {cik : Event}
+        self.listeners: list = []  # callables(cik, base_url, entry, trace) for every new feed entry
+        self.tracer = default_tracer()
+        self.stop_event: Event = Event()
 
     def set_alert(self, cik: str, earnings_market):
         self.cik_alerts.update({cik: earnings_market})
 
+    def add_listener(self, callback):
+        """callback(cik, base_url, entry, trace) runs on the sentinel thread for every new filing."""
+        self.listeners.append(callback)
+
     def get_process(self):
         return self.process
 
@@ -43,20 +63,38 @@ class EdgarSentinel:
         self.thread = Thread(target=self._watch)
         self.thread.start()
 
+    def stop(self, timeout: float | None = None):
+        """Ends the feed loop after the poll in flight."""
+        self.stop_event.set()
+        thread = getattr(self, "thread", None)
+        if thread is not None:
+            thread.join(timeout)
+
     def _watch(self):
-        while True:  # watch dog
+        while not self.stop_event.is_set():  # watch dog
             try:
                 self.running = True
+                SENTINEL_RUNNING.set(1)
                 old_feed = set(self.edgar.get_rss_feed())
                 # old_feed.pop()
                 # old_feed.pop()
 
-                while True:  # feed loop
+                while not self.stop_event.is_set():  # feed loop
+                    poll_start = time.perf_counter()
                     feed = self.edgar.get_rss_feed()
+                    FEED_POLL_SECONDS.observe(time.perf_counter() - poll_start)
                     for data in feed:
                         if data not in old_feed:
+                            NEW_ENTRIES.inc()
                             sec_url = data[1]
                             cik = str(sec_url.split("/")[6])
+                            base_url = "/".join(
+                                data[1].split("/")[:-1]
+                            )  # must remove the last part of url
+                            # exported only if the filing triggers a market
+                            trace = self.tracer.start(
+                                cik=cik, sec_url=base_url, title=data[0], sec_updated=data[2]
+                            )
                             data = list(data)
                             data.append(cik)
                             # print(self.cik_alerts)
@@ -64,14 +102,18 @@ class EdgarSentinel:
                                 f"cik: {cik}, self.cik_alerts: {self.cik_alerts}"
                             )
 
+                            for listener in self.listeners:
+                                try:
+                                    listener(cik, base_url, data, trace)
+                                except Exception as e:
+                                    self.logger.error(f"Sentinel listener failed: {e}")
+
                             # TODO: Add 8-K | 10-K | 10-Q in data[0] requirement!
                             if cik in self.cik_alerts:
-                                self.logger.info(f"Alert sent to {cik}")
-                                base_url = "/".join(
-                                    data[1].split("/")[:-1]
-                                )  # must remove the last part of url
+                                self.logger.info(f"Alert sent to {cik}, trace {trace.trace_id}")
+                                ALERTS.inc()
                                 self.cik_alerts[cik].set_sec_url(base_url)
-                                self.cik_alerts[cik].trigger_alert()
+                                self.cik_alerts[cik].trigger_alert(trace)
 
                             # for c in self.cik_alerts:
                             #     self.logger.info(f"Alert sent to {c}")
@@ -87,9 +129,14 @@ class EdgarSentinel:
 
                             self.logger.info(json.dumps(data))
                     old_feed = feed
+                    self.stop_event.wait(max(0.0, self.poll_interval - (time.perf_counter() - poll_start)))
             except Exception as e:
                 self.running = False
+                SENTINEL_RUNNING.set(0)
+                SENTINEL_RESTARTS.inc()
                 self.logger.error(f"Sentinel stopped with exception: {e}")
+        self.running = False
+        SENTINEL_RUNNING.set(0)
 
 
 if __name__ == "__main__":
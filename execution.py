@@ -0,0 +1,261 @@
+import logging
+import math
+import time
+from dataclasses import asdict, dataclass, field
+
+from py_clob_client.clob_types import OrderType
+
+from market_data import MarketDataService
+from order_book import ArrayOrderBook
+from polymarket_api import OrderStager, TradingClient
+from stats.liquidity_save import fetch_order_book
+
+logger = logging.getLogger(__name__)
+
+# order states the CLOB reports once an order can no longer fill
+TERMINAL_STATUSES = {"matched", "unmatched", "canceled", "cancelled", "expired"}
+MIN_ORDER_SIZE = 5.0  # Polymarket rejects orders below 5 shares
+
+
+@dataclass
+class ExecutionConfig:
+    """
+    worst_price - never pay more than this per share
+    min_edge    - required distance between fair value (1.0 once the oracle resolved) and the price
+    max_size / max_notional - caps in shares and USDC
+    order_type  - "FAK" (fill-and-kill, i.e. IOC), "FOK", or "GTC" for resting child slices
+    slices      - child orders; after each one the book is re-read and the rest re-planned
+    staged_size_step - sizes pre-signed at the limit grow by this factor from min_size to the caps
+    """
+
+    worst_price: float = 0.97
+    min_edge: float = 0.02
+    max_size: float = 1000.0
+    max_notional: float = 250.0
+    min_size: float = MIN_ORDER_SIZE
+    order_type: str = "FAK"
+    slices: int = 1
+    fill_timeout: float = 1.0  # seconds a child is tracked before its remainder is cancelled
+    poll_interval: float = 0.1
+    staged_size_step: float = 1.5
+
+
+@dataclass
+class ChildOrder:
+    price: float
+    size: float
+    order_type: str
+    order_id: str | None = None
+    status: str | None = None
+    filled: float = 0.0
+    cost: float = 0.0
+    cancelled: bool = False
+    post_latency_sec: float | None = None
+    error: str | None = None
+    presigned: bool = False
+
+
+@dataclass
+class ExecutionReport:
+    outcome: str
+    token_id: str
+    best_ask: float | None = None
+    limit_price: float | None = None
+    planned_size: float = 0.0
+    children: list = field(default_factory=list)
+    reason: str | None = None  # why nothing (more) was sent
+    elapsed_sec: float = 0.0
+
+    @property
+    def filled(self) -> float:
+        return sum(c.filled for c in self.children)
+
+    @property
+    def cost(self) -> float:
+        return sum(c.cost for c in self.children)
+
+    @property
+    def vwap(self) -> float | None:
+        return self.cost / self.filled if self.filled > 0 else None
+
+    def as_dict(self) -> dict:
+        data = asdict(self)
+        data.update(filled=self.filled, cost=self.cost, vwap=self.vwap)
+        return data
+
+
+class ExecutionEngine:
+    """
+    Sizes and sends BUY orders from the live book: the limit is the lower of worst_price and
+    fair value minus min_edge, the size is what the book offers up to that limit within the
+    caps. Children are sent as FAK/FOK (or GTC slices), fills are tracked via get_order and any
+    remainder still resting after fill_timeout is cancelled.
+
+    The limit does not depend on the book, so with a stager prestage() signs a ladder of sizes
+    at it while the market is armed and the trigger only posts the largest one the plan allows.
+    """
+
+    def __init__(
+        self,
+        trading_client: TradingClient,
+        config: ExecutionConfig | None = None,
+        market_data: MarketDataService | None = None,
+        stager: OrderStager | None = None,
+    ):
+        self.trading_client = trading_client
+        self.config = config or ExecutionConfig()
+        self.market_data = market_data
+        self.stager = stager
+        # shared with the stager, both are filled when the market is armed
+        self.tick_sizes: dict = stager.tick_sizes if stager is not None else {}
+
+    def _tick(self, token_id) -> float:
+        if token_id not in self.tick_sizes:
+            self.tick_sizes[token_id] = self.trading_client.get_tick_size(token_id)
+        return self.tick_sizes[token_id]
+
+    def read_book(self, token_id) -> ArrayOrderBook | None:
+        """Copy of the live WebSocket book, REST /book if there is none."""
+        if self.market_data is not None:
+            book = self.market_data.live_book(token_id)
+            if book is not None:
+                return book.copy()
+        data = fetch_order_book(token_id)
+        if not data:
+            return None
+        return ArrayOrderBook.from_levels(data.get("bids", []), data.get("asks", []))
+
+    def limit_price(self, token_id, fair_value: float = 1.0) -> float:
+        """min(worst_price, fair_value - min_edge) rounded down to the token's tick."""
+        cfg = self.config
+        tick = self._tick(token_id)
+        limit = min(cfg.worst_price, fair_value - cfg.min_edge)
+        limit = math.floor(limit / tick + 1e-9) * tick
+        return round(limit, max(0, -int(math.floor(math.log10(tick)))))
+
+    def staged_sizes(self, limit: float) -> list:
+        """min_size, min_size * step, ... up to the size the caps allow at `limit`."""
+        cfg = self.config
+        cap = math.floor(min(cfg.max_size, cfg.max_notional / limit) * 100) / 100
+        sizes, size = [], cfg.min_size
+        while size < cap:
+            sizes.append(size)
+            size = math.floor(size * cfg.staged_size_step * 100) / 100
+        return sizes + [cap] if cap >= cfg.min_size else sizes
+
+    def prestage(self, fair_value: float = 1.0) -> None:
+        """Signs staged_sizes() at the limit for every outcome of the stager's market."""
+        if self.stager is None:
+            return
+        for outcome, token_id in self.stager.outcome_addresses.items():
+            limit = self.limit_price(token_id, fair_value)
+            if limit > 0:
+                self.stager.stage_limit(outcome, limit, self.staged_sizes(limit))
+
+    def plan(self, book: ArrayOrderBook, token_id, fair_value: float = 1.0, filled: float = 0.0, spent: float = 0.0):
+        """(size, limit price) of the next child, size 0 when the book has nothing worth taking."""
+        cfg = self.config
+        limit = self.limit_price(token_id, fair_value)
+        if limit <= 0:
+            return 0.0, limit
+
+        available = book.max_buy_size(limit, budget=max(0.0, cfg.max_notional - spent))
+        size = min(available, cfg.max_size - filled)
+        size = math.floor(size * 100) / 100  # CLOB sizes have two decimals
+        return (size if size >= cfg.min_size else 0.0), limit
+
+    def execute(self, outcome: str, token_id: str, fair_value: float = 1.0) -> ExecutionReport:
+        start = time.perf_counter()
+        cfg = self.config
+        report = ExecutionReport(outcome, token_id)
+
+        for slice_no in range(max(1, cfg.slices)):
+            book = self.read_book(token_id)
+            if book is None:
+                report.reason = "no order book"
+                break
+            if slice_no == 0:
+                report.best_ask = book.best_ask
+
+            size, limit = self.plan(book, token_id, fair_value, report.filled, report.cost)
+            if slice_no == 0:
+                report.planned_size, report.limit_price = size, limit
+            if size <= 0:
+                report.reason = "no depth under the limit" if slice_no == 0 else "depth exhausted"
+                break
+
+            remaining_slices = cfg.slices - slice_no
+            child_size = size if remaining_slices <= 1 else max(cfg.min_size, math.floor(size / remaining_slices * 100) / 100)
+            child = self._send(outcome, token_id, limit, min(child_size, size))
+            report.children.append(child)
+            if child.error is not None:
+                report.reason = "order rejected"
+                break
+            self._track(child)
+
+        report.elapsed_sec = time.perf_counter() - start
+        logger.info(
+            f"Execution {outcome} {token_id}: filled {report.filled:.2f}/{report.planned_size:.2f} "
+            f"@ {report.vwap} (limit {report.limit_price}, best ask {report.best_ask}) "
+            f"in {report.elapsed_sec:.3f}s, {len(report.children)} child orders"
+            + (f", stopped: {report.reason}" if report.reason else "")
+        )
+        return report
+
+    def _send(self, outcome, token_id, price, size) -> ChildOrder:
+        # a pre-signed order within one ladder step below the planned size, else sign now
+        staged = None
+        if self.stager is not None:
+            staged = self.stager.take_limit(outcome, price, size, size / self.config.staged_size_step)
+        child = ChildOrder(price, staged.size if staged else size, self.config.order_type, presigned=staged is not None)
+        try:
+            if staged is not None:
+                signed = staged.signed_order
+            else:
+                signed = self.trading_client.create_signed_order(token_id, price, size, "BUY")
+            post_start = time.perf_counter()
+            resp = self.trading_client.post_signed_order(signed, getattr(OrderType, self.config.order_type))
+            child.post_latency_sec = time.perf_counter() - post_start
+        except Exception as e:
+            logger.warning(f"Child order {size}@{price} failed: {e}")
+            child.error = str(e)
+            return child
+
+        if not resp or not resp.get("success", True) or resp.get("errorMsg"):
+            child.error = (resp or {}).get("errorMsg") or "rejected"
+            return child
+
+        child.order_id = resp.get("orderID")
+        child.status = resp.get("status")
+        if child.status == "matched" and resp.get("takingAmount"):
+            # BUY: taking = shares received, making = USDC paid
+            child.filled = float(resp["takingAmount"])
+            child.cost = float(resp.get("makingAmount") or child.filled * price)
+        return child
+
+    def _track(self, child: ChildOrder):
+        """Polls the order until it is done or fill_timeout passes, then cancels what is left."""
+        if child.order_id is None or child.status == "matched":
+            return
+        deadline = time.perf_counter() + self.config.fill_timeout
+        while True:
+            try:
+                order = self.trading_client.get_order(child.order_id) or {}
+            except Exception as e:
+                logger.warning(f"get_order {child.order_id} failed: {e}")
+                order = {}
+            if order:
+                child.status = str(order.get("status", child.status)).lower()
+                child.filled = float(order.get("size_matched") or 0.0)
+                child.cost = child.filled * float(order.get("price") or child.price)
+            if child.status in TERMINAL_STATUSES or child.filled >= child.size:
+                return
+            if time.perf_counter() >= deadline:
+                break
+            time.sleep(self.config.poll_interval)
+
+        try:
+            self.trading_client.cancel_order(child.order_id)
+            child.cancelled = True
+        except Exception as e:
+            logger.warning(f"Cancel of {child.order_id} failed: {e}")
@@ -0,0 +1,237 @@
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+import websocket
+
+import metrics
+from order_book import ArrayOrderBook
+
+logger = logging.getLogger(__name__)
+
+CLOB_WS_URL = os.getenv("CLOB_WS_URL", "wss://ws-subscriptions-clob.polymarket.com/ws/market")
+
+WS_LAG_SECONDS = metrics.histogram("polymarket_ws_lag_seconds", "Receive time minus exchange timestamp of market data events")
+
+
+class LocalOrderBook:
+    """Live order book of one token, rebuilt from "book" events and patched by "price_change"."""
+
+    def __init__(self, token_id: str):
+        self.token_id = token_id
+        self.levels = ArrayOrderBook()
+        self.timestamp: float = None  # exchange time of the last event, unix seconds
+        self.received_at: float = None  # local time.time() of the last event
+        self.lock = threading.Lock()
+
+    def apply_snapshot(self, bids, asks, timestamp=None):
+        with self.lock:
+            self.levels.set_levels(bids, asks)
+            self._touch(timestamp)
+
+    def apply_change(self, side: str, price, size, timestamp=None):
+        with self.lock:
+            self.levels.apply_delta(side, price, size)
+            self._touch(timestamp)
+
+    def _touch(self, timestamp):
+        self.received_at = time.time()
+        self.timestamp = int(timestamp) / 1000.0 if timestamp else self.received_at
+
+    def best_bid(self):
+        return self.levels.best_bid
+
+    def best_ask(self):
+        return self.levels.best_ask
+
+    def cost_to_buy(self, size: float, limit_price: float | None = None):
+        """(filled shares, cost in USDC, worst price) of buying size shares against the asks."""
+        with self.lock:
+            return self.levels.cost_to_buy(size, limit_price)
+
+    def ask_ladder(self):
+        """[(price, size)] best ask first."""
+        with self.lock:
+            return self.levels.ask_ladder()
+
+    def bid_ladder(self):
+        with self.lock:
+            return self.levels.bid_ladder()
+
+    def copy(self) -> ArrayOrderBook:
+        with self.lock:
+            return self.levels.copy()
+
+    def to_snapshot(self) -> dict:
+        """Same shape as the CLOB /book response, string prices and sizes."""
+        with self.lock:
+            bids, asks = self.levels.to_levels()
+            return {
+                "asset_id": self.token_id,
+                "timestamp": str(int(self.timestamp * 1000)) if self.timestamp else None,
+                "bids": bids,
+                "asks": asks,
+            }
+
+
+class MarketDataService:
+    """
+    One WebSocket subscription to the CLOB market channel for every registered token, keeping
+    a LocalOrderBook per token. Trackers, loggers and the trade path read the books instead of
+    polling /price and /book. url can point at a local stand-in (standins/clob_ws.py), and every
+    raw message can be recorded to a JSONL file for later replay.
+    """
+
+    def __init__(self, url: str = CLOB_WS_URL, record_path: str | None = None, reconnect_delay: float = 1.0):
+        self.url = url
+        self.record_path = record_path
+        self.reconnect_delay = reconnect_delay
+
+        self.books: dict = {}  # {token_id: LocalOrderBook}
+        self.lock = threading.Lock()
+        self.subscribers = []  # callables(token_id, book)
+
+        self.ws: websocket.WebSocketApp = None
+        self.thread: threading.Thread = None
+        self.running = False
+        self.connected = threading.Event()
+        self._record_file = None
+
+    def register(self, token_ids):
+        new = []
+        with self.lock:
+            for token_id in token_ids:
+                if token_id not in self.books:
+                    self.books[token_id] = LocalOrderBook(token_id)
+                    new.append(token_id)
+            # tokens added before _on_open took its copy are part of the initial subscription
+            subscribe_now = self.connected.is_set()
+
+        if not self.running:
+            self.start()
+        elif new and subscribe_now:
+            self._send({"assets_ids": new, "operation": "subscribe"})
+
+    def subscribe(self, callback):
+        self.subscribers.append(callback)
+
+    def book(self, token_id) -> LocalOrderBook | None:
+        """The token's book, None until its first snapshot arrived."""
+        book = self.books.get(token_id)
+        if book is None or book.timestamp is None:
+            return None
+        return book
+
+    def best_ask(self, token_id):
+        """Best ask of a live book, None when the book is missing or the feed is disconnected."""
+        book = self.book(token_id)
+        if book is None or not self.connected.is_set():
+            return None
+        return book.best_ask()
+
+    def live_book(self, token_id) -> LocalOrderBook | None:
+        if not self.connected.is_set():
+            return None
+        return self.book(token_id)
+
+    def wait_ready(self, token_ids, timeout: float = 10.0) -> bool:
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if all(self.book(t) is not None for t in token_ids):
+                return True
+            time.sleep(0.05)
+        return False
+
+    def start(self):
+        self.running = True
+        if self.record_path:
+            self._record_file = open(self.record_path, "a")
+        self.thread = threading.Thread(target=self._run, name="market-data", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.ws is not None:
+            self.ws.close()
+        if self._record_file is not None:
+            self._record_file.close()
+            self._record_file = None
+
+    def _run(self):
+        while self.running:
+            self.ws = websocket.WebSocketApp(
+                self.url,
+                on_open=self._on_open,
+                on_message=self._on_message,
+                on_error=lambda ws, e: logger.warning(f"Market data websocket error: {e}"),
+                on_close=lambda ws, code, msg: self.connected.clear(),
+            )
+            self.ws.run_forever(ping_interval=10, ping_timeout=5)
+            self.connected.clear()
+            if self.running:
+                time.sleep(self.reconnect_delay)
+
+    def _send(self, payload):
+        try:
+            self.ws.send(json.dumps(payload))
+        except Exception as e:
+            logger.warning(f"Market data subscribe failed: {e}")
+
+    def _on_open(self, ws):
+        with self.lock:
+            token_ids = list(self.books)
+            self.connected.set()
+        ws.send(json.dumps({"assets_ids": token_ids, "type": "market"}))
+        logger.info(f"Market data subscribed to {len(token_ids)} tokens")
+
+    def _on_message(self, ws, message):
+        if self._record_file is not None:
+            self._record_file.write(json.dumps({"received_at": datetime.now().isoformat(), "message": message}) + "\n")
+
+        try:
+            events = json.loads(message)
+        except json.JSONDecodeError:
+            return  # e.g. PONG
+        if isinstance(events, dict):
+            events = [events]
+
+        for event in events:
+            try:
+                self._apply(event)
+            except (KeyError, TypeError, ValueError) as e:
+                logger.warning(f"Malformed market data event {event}: {e}")
+
+    def _apply(self, event):
+        event_type = event.get("event_type")
+        timestamp = event.get("timestamp")
+        touched = set()
+        if timestamp:
+            WS_LAG_SECONDS.observe(max(0.0, time.time() - int(timestamp) / 1000.0))
+
+        if event_type == "book":
+            book = self.books.get(event["asset_id"])
+            if book is not None:
+                book.apply_snapshot(
+                    event.get("bids", event.get("buys", [])),
+                    event.get("asks", event.get("sells", [])),
+                    timestamp,
+                )
+                touched.add(event["asset_id"])
+
+        elif event_type == "price_change":
+            # current format has per-change asset ids, the older one a single asset_id + "changes"
+            changes = event.get("price_changes") or [
+                {**c, "asset_id": event["asset_id"]} for c in event.get("changes", [])
+            ]
+            for change in changes:
+                book = self.books.get(change["asset_id"])
+                if book is not None:
+                    book.apply_change(change["side"], change["price"], change["size"], timestamp)
+                    touched.add(change["asset_id"])
+
+        for token_id in touched:
+            for callback in self.subscribers:
+                callback(token_id, self.books[token_id])
@@ -0,0 +1,199 @@
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from market_data import MarketDataService
+from price_poller import PricePoller
+from stats.book_store import BookStoreWriter, store_path_for_slug
+from stats.liquidity_save import DEFAULT_INTERVAL_SECONDS, save_book
+
+logger = logging.getLogger(__name__)
+
+
+class MarketManager:
+    """
+    Runs all armed EarningsMarkets from a single asyncio loop thread instead of three threads
+    per market. Price samples and liquidity snapshots of every market are scheduled by the loop
+    and their blocking HTTP calls share one bounded I/O pool; triggers run on a bounded trade
+    pool. The thread count is loop + io_workers + trade_workers, whatever the market count.
+    Prices of all markets come from one PricePoller batch per interval, books not covered by
+    the WebSocket feed from one batched /books request.
+    """
+
+    def __init__(
+        self,
+        price_interval: float = 1.0,
+        liquidity_interval: float = DEFAULT_INTERVAL_SECONDS,
+        io_workers: int = 8,
+        trade_workers: int = 4,
+        market_data: MarketDataService | None = None,
+        book_format: str = "jsonl",
+    ):
+        self.price_interval = price_interval
+        self.market_data = market_data
+        self.poller = PricePoller(price_interval, market_data=market_data)
+        self.liquidity_interval = liquidity_interval
+
+        self.markets: dict = {}  # {slug: EarningsMarket}
+        self.liquidity_targets: dict = {}  # {slug: [{"label", "id"}]}
+        self.book_format = book_format  # "jsonl" or "store" (stats/book_store.py)
+        self.book_writers: dict = {}  # {slug: BookStoreWriter}
+        self.lock = threading.Lock()
+
+        self.io_pool = ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix="market-io")
+        self.trade_pool = ThreadPoolExecutor(max_workers=trade_workers, thread_name_prefix="market-trade")
+
+        self.loop: asyncio.AbstractEventLoop = None
+        self.thread: threading.Thread = None
+        self.running = False
+
+        self.trigger_to_oracle: list = []  # seconds, one per trigger
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run_loop, name="market-manager", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        self.io_pool.shutdown(wait=False)
+        self.trade_pool.shutdown(wait=True)
+        for writer in self.book_writers.values():
+            writer.close()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.create_task(self._every(self.price_interval, self._sample_prices))
+        self.loop.create_task(self._every(self.liquidity_interval, self._log_liquidity))
+        self.loop.run_forever()
+
+    def register(self, market):
+        with self.lock:
+            self.markets[market.slug] = market
+        if self.market_data is not None:
+            self.market_data.register(list(market.outcome_addresses.values()))
+        self.start()
+
+    def unregister(self, market):
+        with self.lock:
+            self.markets.pop(market.slug, None)
+            self.liquidity_targets.pop(market.slug, None)
+
+    def dispatch(self, market):
+        """Called from the sentinel thread when a filing for the market's CIK appears."""
+        market.triggered_at = time.perf_counter()
+        if market.trace is not None:
+            market.trace.mark("dispatched")
+        self.trade_pool.submit(self._trade, market)
+
+    def _trade(self, market):
+        # the market stays registered so prices and books keep being logged after the filing
+        try:
+            market.trade()
+        except Exception:
+            logger.exception(f"Trade failed for slug {market.slug}")
+            if market.trace is not None:
+                market.trace.finish("failed")
+
+    def record_oracle_start(self, market):
+        """Called by EarningsMarket.trade right before the oracle starts."""
+        latency = time.perf_counter() - market.triggered_at
+        self.trigger_to_oracle.append(latency)
+        logger.info(f"Trigger to oracle start for {market.slug}: {latency:.4f}s")
+        return latency
+
+    def latency_summary(self) -> dict:
+        if not self.trigger_to_oracle:
+            return {}
+        values = np.array(self.trigger_to_oracle)
+        p50, p90, p99 = np.percentile(values, [50, 90, 99])
+        return {"count": len(values), "p50": p50, "p90": p90, "p99": p99, "max": values.max()}
+
+    async def _every(self, interval, job):
+        while self.running:
+            started = self.loop.time()
+            try:
+                await job()
+            except Exception:
+                logger.exception(f"Market manager job {job.__name__} failed")
+            await asyncio.sleep(max(0.0, interval - (self.loop.time() - started)))
+
+    def _snapshot(self):
+        with self.lock:
+            return list(self.markets.values())
+
+    async def _sample_prices(self):
+        # trackers are poller subscribers, one batched request covers every market
+        await self.loop.run_in_executor(self.io_pool, self.poller.poll)
+
+    async def _log_liquidity(self):
+        # live books are stamped with the sampling time: their own timestamp is the last exchange
+        # event, which stands still on a quiet book and would make it look stale to readers
+        sampled_at = time.time()
+        rest_targets = []
+        for market in self._snapshot():
+            targets = self.liquidity_targets.get(market.slug)
+            if targets is None:
+                targets = [{"label": label, "id": token_id} for label, token_id in market.outcome_addresses.items()]
+                self.liquidity_targets[market.slug] = targets
+            output_path = Path(f"polymarket_liquidity_{market.slug}.jsonl")
+            writer = self._book_writer(market.slug)
+
+            books = [self.market_data.live_book(t["id"]) for t in targets] if self.market_data else [None]
+            if all(book is not None for book in books):
+                # local books from the WebSocket feed, no REST call needed
+                for target, book in zip(targets, books):
+                    if writer is not None:
+                        levels = book.copy()
+                        writer.add_arrays(target["label"], sampled_at, levels.bid_sizes, levels.ask_sizes)
+                    else:
+                        snapshot = book.to_snapshot()
+                        snapshot["exchange_timestamp"] = snapshot["timestamp"]
+                        snapshot["timestamp"] = str(int(sampled_at * 1000))
+                        self._save_book(snapshot, market.slug, target, output_path, None)
+            else:
+                rest_targets += [(market.slug, target, output_path) for target in targets]
+
+        if not rest_targets:
+            return
+        books = await self.loop.run_in_executor(
+            self.io_pool, self.poller.fetch_books, [t["id"] for _, t, _ in rest_targets]
+        )
+        for slug, target, output_path in rest_targets:
+            if target["id"] in books:
+                self._save_book(dict(books[target["id"]]), slug, target, output_path, self._book_writer(slug))
+
+    def _book_writer(self, slug) -> BookStoreWriter | None:
+        if self.book_format != "store":
+            return None
+        if slug not in self.book_writers:
+            self.book_writers[slug] = BookStoreWriter(store_path_for_slug(".", slug))
+        return self.book_writers[slug]
+
+    @staticmethod
+    def _save_book(book_data, slug, target, output_path, writer):
+        book_data["outcome_side"] = target["label"]
+        book_data["token_id"] = target["id"]
+        book_data["slug"] = slug
+        save_book(book_data, output_path, writer)
+
+_default_manager: MarketManager = None
+_default_manager_lock = threading.Lock()
+
+
+def default_manager() -> MarketManager:
+    global _default_manager
+    with _default_manager_lock:
+        if _default_manager is None:
+            _default_manager = MarketManager(market_data=MarketDataService())
+        return _default_manager
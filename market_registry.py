@@ -0,0 +1,193 @@
+import argparse
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+
+import requests
+
+from edgar_api import EDGAR
+from polymarket_api import DataFeed, Utils
+
+logger = logging.getLogger(__name__)
+
+GAMMA_MARKETS_URL = os.getenv("GAMMA_API_URL", "https://gamma-api.polymarket.com") + "/markets"
+PAGE_SIZE = 500
+SLUGS_PER_REQUEST = 50  # repeated ?slug= parameters per batch lookup
+EARNINGS_SLUG_MARKER = "-quarterly-earnings-"
+DEFAULT_TTL = 300.0  # seconds
+
+
+def parse_strike(part: str) -> float | None:
+    """ "1pt31" -> 1.31, "neg0pt05" / "m0pt05" -> -0.05 """
+    sign = 1.0
+    for prefix in ("neg", "m"):
+        if part.startswith(prefix):
+            sign, part = -1.0, part[len(prefix):]
+    try:
+        return sign * float(part.replace("pt", "."))
+    except ValueError:
+        return None
+
+
+@dataclass
+class MarketRecord:
+    """One earnings market, parsed once from its Gamma entry."""
+
+    slug: str
+    ticker: str
+    cik: str | None
+    metric: str  # e.g. "gaap-eps", "nongaap-eps"
+    strike: float | None
+    token_ids: dict  # {"Yes": token_id, "No": token_id}
+    release_date: datetime
+    description: str = ""
+    closed: bool = False
+    outcome_prices: list = field(default_factory=list)
+
+    @classmethod
+    def from_gamma(cls, data: dict, ciks: dict):
+        slug = data["slug"]
+        parsed = DataFeed.parse_slug_data(data)
+        parts = slug.split("-")
+        ticker = Utils.extract_ticker_from_slug(slug)
+        cik = ciks.get(ticker)
+        return cls(
+            slug=slug,
+            ticker=ticker,
+            cik=str(cik) if cik is not None else None,
+            metric="-".join(parts[3:5]),
+            strike=parse_strike(parts[-1]),
+            token_ids=parsed["outcome_addresses"],
+            release_date=Utils.extract_expected_release_date(slug),
+            description=parsed["description"],
+            closed=bool(parsed["closed"]),
+            outcome_prices=parsed["outcome_prices"],
+        )
+
+
+class MarketRegistry:
+    """
+    Earnings market metadata for every component that needs it. Records come from paginated
+    or slug-batched Gamma /markets queries and are cached for ttl seconds, so arming many
+    markets costs a handful of requests instead of several per market.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_TTL, session: requests.Session | None = None):
+        self.ttl = ttl
+        self.session = session or requests.Session()
+        self.records: dict = {}  # {slug: (fetched_at, MarketRecord)}
+        self.lock = threading.Lock()
+        self._ciks: dict = None
+
+    def ciks(self) -> dict:
+        """{ticker: cik} from the SEC ticker file, loaded once."""
+        if self._ciks is None:
+            tickers = EDGAR.COMPANY_TICKERS_AND_CIKS or EDGAR().COMPANY_TICKERS_AND_CIKS
+            self._ciks = {v["ticker"]: v["cik_str"] for v in tickers.values()}
+        return self._ciks
+
+    def _fetch(self, params) -> list:
+        resp = self.session.get(GAMMA_MARKETS_URL, params=params, timeout=30)
+        resp.raise_for_status()
+        return resp.json()
+
+    def _store(self, entries) -> list:
+        now = time.monotonic()
+        ciks = self.ciks()
+        records = []
+        for data in entries:
+            if EARNINGS_SLUG_MARKER not in data.get("slug", ""):
+                continue
+            try:
+                record = MarketRecord.from_gamma(data, ciks)
+            except (KeyError, ValueError, IndexError) as e:
+                logger.warning(f"Skipping Gamma market {data.get('slug')}: {e}")
+                continue
+            records.append(record)
+        with self.lock:
+            for record in records:
+                self.records[record.slug] = (now, record)
+        return records
+
+    def discover(self, closed: bool = False, **filters) -> list:
+        """
+        All (open by default) earnings markets, one request per PAGE_SIZE markets.
+        filters are passed to Gamma as is, e.g. end_date_min="2025-12-18".
+        """
+        records = []
+        offset = 0
+        while True:
+            page = self._fetch({"closed": str(closed).lower(), "limit": PAGE_SIZE, "offset": offset, **filters})
+            records += self._store(page)
+            if len(page) < PAGE_SIZE:
+                break
+            offset += PAGE_SIZE
+        logger.info(f"Discovered {len(records)} earnings markets in {offset // PAGE_SIZE + 1} requests")
+        return records
+
+    def _fresh(self, slug):
+        entry = self.records.get(slug)
+        if entry is None or time.monotonic() - entry[0] > self.ttl:
+            return None
+        return entry[1]
+
+    def get_many(self, slugs) -> dict:
+        """{slug: MarketRecord}, fetching the stale or unknown ones in batches."""
+        result = {}
+        missing = []
+        for slug in dict.fromkeys(slugs):
+            record = self._fresh(slug)
+            if record is None:
+                missing.append(slug)
+            else:
+                result[slug] = record
+        for i in range(0, len(missing), SLUGS_PER_REQUEST):
+            batch = missing[i:i + SLUGS_PER_REQUEST]
+            for record in self._store(self._fetch([("slug", s) for s in batch])):
+                result[record.slug] = record
+        return result
+
+    def get(self, slug) -> MarketRecord:
+        record = self.get_many([slug]).get(slug)
+        if record is None:
+            raise KeyError(f"Unknown earnings market {slug}")
+        return record
+
+    def upcoming(self, days: int = 1, now: datetime | None = None) -> list:
+        """Open markets whose expected release date is within the next days (today included)."""
+        today = (now or datetime.now(timezone.utc)).replace(hour=0, minute=0, second=0, microsecond=0)
+        end = today + timedelta(days=days)
+        return sorted(
+            (
+                r for r in self.discover(end_date_min=today.date().isoformat())
+                if not r.closed and today <= r.release_date <= end
+            ),
+            key=lambda r: (r.release_date, r.slug),
+        )
+
+
+_default_registry: MarketRegistry = None
+_default_registry_lock = threading.Lock()
+
+
+def default_registry() -> MarketRegistry:
+    global _default_registry
+    with _default_registry_lock:
+        if _default_registry is None:
+            _default_registry = MarketRegistry()
+        return _default_registry
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="List open Polymarket earnings markets.")
+    parser.add_argument("--days", type=int, default=None, help="Only markets releasing within this many days")
+    args = parser.parse_args()
+
+    registry = default_registry()
+    records = registry.upcoming(args.days) if args.days is not None else registry.discover()
+    for r in records:
+        print(f"{r.release_date.date()} {r.slug:<60} {r.ticker:<6} CIK {r.cik} {r.metric} {r.strike}")
+    print(f"{len(records)} markets")
@@ -1,5 +1,5 @@
 from ast import List, Tuple
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
 import logging
 import os
@@ -9,8 +9,14 @@ from time import perf_counter
 from edgar_api import EDGAR
 from google import genai
 import json
+import re
+from html.parser import HTMLParser
+
+import pdfkit
 
 from edgar_api.edgar_api import EDGAR
+from edgar_api.filings import FilingResolver, press_releases
+import metrics
 
 class Resolution(Enum):
     YES = "yes"
@@ -21,6 +27,87 @@ class Resolution(Enum):
 AGENT_RULES = """You are a block chain oracle for polymarket, and you will be provided with rules to resolve stock earnings prediction market and evident in a form of SEC 8-K or 10-K or 10-Q documents. Your task is to return in json format market resolution {"resolution" : "yes"/"no"/"unk", "reasoning" : "explanation for the result"}. You cannot connect to the internet, your decision must be made solely based on the provided documents. Return ONLY valid JSON. Do not include explanations, markdown, or code fences. Rules"""
 
 
+@dataclass
+class DocumentTiming:
+    url: str
+    bytes: int
+    seconds: float
+
+
+@dataclass
+class ResolutionTiming:
+    """Wall time of every stage of one Oracle resolution, in seconds."""
+    directory_fetch: float = 0.0
+    documents: list[DocumentTiming] = field(default_factory=list)
+    upload: float = 0.0  # pdf conversion + upload, or text extraction in text mode
+    time_to_first_token: float | None = None
+    inference: float = 0.0
+
+    @property
+    def download(self) -> float:
+        return sum(d.seconds for d in self.documents)
+
+    @property
+    def download_bytes(self) -> int:
+        return sum(d.bytes for d in self.documents)
+
+    def stages(self) -> dict:
+        return {
+            "directory_fetch": self.directory_fetch,
+            "download": self.download,
+            "upload": self.upload,
+            "time_to_first_token": self.time_to_first_token,
+            "inference": self.inference,
+        }
+
+
+MODEL_ERRORS = metrics.counter("oracle_model_errors_total", "Oracle calls whose model request failed", ("oracle",))
+
+INPUT_MODES = ("html", "text", "pdf")
+DOCUMENT_SCOPES = ("all", "press_release")
+PRUNE_KEYWORDS = ("per share", "eps", "earnings")
+
+
+class _TextExtractor(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.parts = []
+        self._skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ("script", "style", "ix:header"):
+            self._skip += 1
+
+    def handle_endtag(self, tag):
+        if tag in ("script", "style", "ix:header") and self._skip:
+            self._skip -= 1
+
+    def handle_data(self, data):
+        if not self._skip:
+            self.parts.append(data)
+
+
+def html_to_text(path: str) -> str:
+    """Visible text of an HTML filing document with whitespace collapsed."""
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        raw = f.read()
+    parser = _TextExtractor()
+    parser.feed(raw)
+    return re.sub(r"\s+", " ", " ".join(parser.parts)).strip()
+
+
+def press_release_paths(paths: list[str]) -> list[str]:
+    """Downloaded EX-99 documents (file names carry the document type), all paths if there are none."""
+    kept = [p for p in paths if "-EX-99" in os.path.basename(p)]
+    return kept or paths
+
+
+def prune_documents(paths: list[str]) -> list[str]:
+    """Keeps documents that mention earnings figures, falls back to all of them if none does."""
+    kept = [p for p in paths if any(k in html_to_text(p).lower() for k in PRUNE_KEYWORDS)]
+    return kept or paths
+
+
 class Oracle:
     """Oracle that uses Gemini API to resolve SEC filings based on provided rules."""
     def __init__(
@@ -28,8 +115,22 @@ class Oracle:
             edgar_instance: EDGAR,
             model_version: str = "gemini-2.5-flash",
             prompt_prefix: str = AGENT_RULES,
+            input_mode: str = "html",
+            prune: bool = False,
+            documents: str = "all",
             ):
+        """
+        input_mode - "html" uploads the filing documents as downloaded, "pdf" converts them first
+                     (needs wkhtmltopdf), "text" sends their extracted text inline without uploads
+        prune      - drop documents that do not mention earnings figures before inference
+        documents  - "press_release" only downloads and sends the EX-99 exhibits when the filing has any
+        """
+        if input_mode not in INPUT_MODES:
+            raise ValueError(f"Unknown input_mode {input_mode}, expected one of {INPUT_MODES}")
+        if documents not in DOCUMENT_SCOPES:
+            raise ValueError(f"Unknown documents {documents}, expected one of {DOCUMENT_SCOPES}")
         self.edgar = edgar_instance
+        self.filings = FilingResolver(edgar_instance)
 
         # Get API key from environment variable
         api_key = os.environ.get("GEMINI_API_KEY")
@@ -42,48 +143,117 @@ class Oracle:
 
         self.model_version = model_version
         self.prompt_prefix = prompt_prefix
+        self.input_mode = input_mode
+        self.prune = prune
+        self.documents = documents
 
-    def resolve(self, sec_link: str, description: str = "") -> Resolution:
-        logging.info(f"Resolving SEC link: {sec_link}")
-        uploaded_files = []
+    def fetch_documents(
+            self,
+            sec_link: str,
+            download_path: str,
+            timing: ResolutionTiming | None = None,
+            ) -> list[str]:
+        """
+        Downloads the documents of the filing into download_path, press release first, and returns
+        the local paths. Files are named <i>-<type>, e.g. 0-EX-99.1.htm.
+        """
+        timing = timing or ResolutionTiming()
+
+        start = perf_counter()
         try:
+            documents = self.filings.documents(sec_link)
+        except Exception as e:
+            logging.warning(f"Failed to list documents of {sec_link}: {e}")
+            return []
+        finally:
+            timing.directory_fetch = perf_counter() - start
+
+        if self.documents == "press_release":
+            documents = press_releases(documents)
+
+        paths = []
+        for i, document in enumerate(documents):
+            start = perf_counter()
             try:
-                urls = self.edgar.extract_htm_urls(sec_link)
+                path = self.edgar.download_document(document.url, download_path, f"{i}-{document.type}")
             except Exception as e:
-                logging.warning(f"Failed to extract URLs from {sec_link}: {e}")
+                logging.warning(f"Failed to download {document.url}: {e}")
+                return []
+            timing.documents.append(DocumentTiming(document.url, os.path.getsize(path), perf_counter() - start))
+            paths.append(path)
+        return paths
+
+    def resolve(
+            self,
+            sec_link: str,
+            description: str = "",
+            timing: ResolutionTiming | None = None,
+            ) -> Resolution:
+        """Pass a ResolutionTiming to get the per-stage timings of this resolution filled in."""
+        logging.info(f"Resolving SEC link: {sec_link}")
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = self.fetch_documents(sec_link, tmp, timing)
+            return self.resolve_documents(paths, description, sec_link, timing)
+
+    def resolve_documents(
+            self,
+            paths: list[str],
+            description: str = "",
+            sec_link: str = "",
+            timing: ResolutionTiming | None = None,
+            ) -> Resolution:
+        """Resolves already downloaded filing documents, the paths are only read."""
+        timing = timing or ResolutionTiming()
+        uploaded_files = []
+        try:
+            if not paths:
+                logging.warning(f"No documents downloaded from {sec_link}")
                 return Resolution.UNK
 
+            if self.documents == "press_release":
+                paths = press_release_paths(paths)
+            if self.prune:
+                paths = prune_documents(paths)
+
+            contents = [self.prompt_prefix, description]
+
+            start = perf_counter()
             with tempfile.TemporaryDirectory() as tmp:
-                paths = [
-                    self.edgar.download_document(u, tmp, str(i))
-                    for i, u in enumerate(urls)
-                    if u
-                ]
-
-                if not paths:
-                    logging.warning(f"No documents downloaded from {sec_link}")
-                    return Resolution.UNK
-
-                contents = [self.prompt_prefix, description]
-
-                for path in paths:
-                    try:
-                        f = self.client.files.upload(file=path)
-                        uploaded_files.append(f)
-                        contents.append(f)
-                    except Exception as e:
-                        logging.warning(f"Failed to upload document {path}: {e}")
-
-                if not uploaded_files:
-                    logging.warning(f"No documents uploaded for {sec_link}")
-                    return Resolution.UNK
-
-            response = self.client.models.generate_content(
+                if self.input_mode == "text":
+                    contents += [html_to_text(path) for path in paths]
+                else:
+                    for i, path in enumerate(paths):
+                        try:
+                            if self.input_mode == "pdf":
+                                pdf_path = os.path.join(tmp, f"{i}.pdf")
+                                pdfkit.from_file(path, pdf_path)
+                                path = pdf_path
+                            f = self.client.files.upload(file=path)
+                            uploaded_files.append(f)
+                            contents.append(f)
+                        except Exception as e:
+                            logging.warning(f"Failed to upload document {path}: {e}")
+
+                    if not uploaded_files:
+                        logging.warning(f"No documents uploaded for {sec_link}")
+                        return Resolution.UNK
+            timing.upload = perf_counter() - start
+
+            # streamed so the time to the first token can be told apart from generation
+            start = perf_counter()
+            chunks = []
+            for chunk in self.client.models.generate_content_stream(
                 model=self.model_version,
                 contents=contents,
-            )
+            ):
+                if timing.time_to_first_token is None:
+                    timing.time_to_first_token = perf_counter() - start
+                if chunk.text:
+                    chunks.append(chunk.text)
+            timing.inference = perf_counter() - start
+            response_text = "".join(chunks)
 
-            data = json.loads(response.text)
+            data = json.loads(response_text)
             res = data.get("resolution", "").lower()
 
             if res == "yes":
@@ -91,11 +261,12 @@ class Oracle:
             if res == "no":
                 return Resolution.NO
 
-            logging.info(f"{sec_link} resolved into unknown resolution response: {response.text}")
+            logging.info(f"{sec_link} resolved into unknown resolution response: {response_text}")
             return Resolution.UNK
 
         except Exception as e:
             logging.exception(f"Error during resolution of {sec_link}: {e}")
+            MODEL_ERRORS.inc(oracle="structured")
             return Resolution.UNK
 
         finally:
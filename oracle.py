@@ -3,6 +3,7 @@ import os
 import tempfile
 import json
 import concurrent.futures
+import threading
 
 from typing import Optional, List
 from dotenv import load_dotenv
@@ -11,7 +12,8 @@ from google.genai import types
 
 load_dotenv()
 
-from edgar_api import EDGAR
+import metrics
+from edgar_api import EDGAR, FilingResolver, press_releases
 import logging
 import json
 import time
@@ -28,8 +30,48 @@ import time
 # )
 logger = logging.getLogger(__name__)
 
+ORACLE_STAGE_SECONDS = metrics.histogram("oracle_stage_seconds", "Duration of each oracle stage", ("stage",))
+MODEL_ERRORS = metrics.counter("oracle_model_errors_total", "Oracle calls whose model request failed", ("oracle",))
 
-edgar = EDGAR()
+# "pdf" converts every document with wkhtmltopdf as before, "html" uploads them as downloaded
+DOCUMENT_FORMAT = os.getenv("ORACLE_DOCUMENT_FORMAT", "pdf")
+# "all" sends every document, "press_release" only the EX-99 exhibits when the filing has any
+DOCUMENTS = os.getenv("ORACLE_DOCUMENTS", "all")
+
+# created on first use, importing this module makes no requests
+_edgar: EDGAR = None
+_filings: FilingResolver = None
+_edgar_lock = threading.Lock()
+_model_client_factory = None
+
+
+def get_edgar() -> EDGAR:
+    global _edgar, _filings
+    with _edgar_lock:
+        if _edgar is None:
+            _edgar = EDGAR()
+            _filings = FilingResolver(_edgar)
+        return _edgar
+
+
+def get_filings() -> FilingResolver:
+    get_edgar()
+    return _filings
+
+
+def set_model_client_factory(factory):
+    """factory() -> a client with the genai.Client files/models interface, None restores Gemini."""
+    global _model_client_factory
+    _model_client_factory = factory
+
+
+def model_client():
+    if _model_client_factory is not None:
+        return _model_client_factory()
+    api_key = os.environ.get("GEMINI_API_KEY")
+    if not api_key:
+        raise ValueError("GEMINI_API_KEY environment variable not found.")
+    return genai.Client(api_key=api_key)
 # prompt_prefix = """You are a block chain oracle for polymarket, and you will be provided with rules to resolve stock earnings prediction market and evident in a form of SEC 8-K or 10-K or 10-Q documents. Your task is to return in json format market resolution {"resolution" : "yes"/"no"/"not enough informations"}. Return ONLY valid JSON. Do not include explanations, markdown, or code fences. Rules"""
 prompt_prefix = """You are a block chain oracle for polymarket, and you will be provided with rules to resolve stock earnings prediction market and evident in a form of SEC 8-K or 10-K or 10-Q documents. Your task is to return in json format market resolution {"resolution" : "yes"/"no"/"not enough informations", "reasoning" : "explanation for the result"}. Return ONLY valid JSON. Do not include explanations, markdown, or code fences. Rules"""
 
@@ -45,12 +87,8 @@ def send_prompt_with_pdfs(prompt: str, file_paths: Optional[List[str]] = None) -
     Returns:
         The generated text content as a string, or an error message.
     """
-    api_key = os.environ.get("GEMINI_API_KEY")
-    if not api_key:
-        return "Error: GEMINI_API_KEY environment variable not found."
-
     try:
-        client = genai.Client(api_key=api_key)
+        client = model_client()
     except Exception as e:
         return f"Error initializing genai.Client: {e}"
 
@@ -126,20 +164,40 @@ def send_prompt_with_pdfs(prompt: str, file_paths: Optional[List[str]] = None) -
 #     return res
 
 
-def get_resolution(desc: str, sec_url: str):
-    urls = edgar.extract_htm_urls(sec_url)
+def get_resolution(desc: str, sec_url: str, trace=None, documents: str | None = None):
+    # press release (EX-99.1) first, typed from the filing's index.json
+    stage_start = time.perf_counter()
+    edgar = get_edgar()
+    listed = get_filings().documents(sec_url)
+    if (documents or DOCUMENTS) == "press_release":
+        listed = press_releases(listed)
+    urls = [d.url for d in listed]
+    ORACLE_STAGE_SECONDS.observe(time.perf_counter() - stage_start, stage="directory")
+    if trace is not None:
+        trace.mark("documents_listed", documents=len(urls))
 
     with tempfile.TemporaryDirectory() as tmp:
         tmp_files = []
         start_time = time.perf_counter()
         for i, u in enumerate(urls):
             # print(u)
-            edgar.download_pdf_document(u, tmp, f"{i}")
+            if DOCUMENT_FORMAT == "pdf":
+                tmp_files.append(edgar.download_pdf_document(u, tmp, f"{i}"))
+            else:
+                tmp_files.append(edgar.download_document(u, tmp, f"{i}"))
             logger.info(f"Downloading file - {u}")
-            tmp_files.append(os.path.join(tmp, f"{i}.pdf"))
         logger.info(f"files download time: {time.perf_counter() - start_time} ")
+        ORACLE_STAGE_SECONDS.observe(time.perf_counter() - start_time, stage="download")
+        if trace is not None:
+            trace.mark("documents_downloaded")
 
+        stage_start = time.perf_counter()
         res = send_prompt_with_pdfs(prompt_prefix + desc, tmp_files)
+        ORACLE_STAGE_SECONDS.observe(time.perf_counter() - stage_start, stage="model")
+        if res.startswith("Error"):
+            MODEL_ERRORS.inc(oracle="live")
+        if trace is not None:
+            trace.mark("model_done")
         # res = json.loads(res)
         logger.info(f"Source = {sec_url}")
         logger.info(f"Num files = {len(tmp_files)}")
@@ -164,10 +222,6 @@ Note: For the purposes of this market, GAAP EPS refers to diluted GAAP EPS, unle
 Note: All figures are expressed in USD, unless otherwise indicated.
 """
 
-    from edgar_api import EDGAR
-
-    edgar = EDGAR()
-
     # urls = edgar.extract_htm_urls("http://sec.gov/Archives/edgar/data/315189/000110465925116130")
     # for i, u in enumerate(urls):
     #     print(u)
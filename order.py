@@ -1,21 +1,24 @@
 # from multiprocessing import Process, Event
-from threading import Thread, Event, Lock
+from threading import Event
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Dict
 import time
 import json
 
 import polymarket_api
-from polymarket_api import TradingClient
+from polymarket_api import OrderStager, TradingClient
 
 from edgar_sentinel import EdgarSentinel
-from edgar_api import EDGAR
-from stats.liquidity_save import run_liquidity_logger
 from price_tracker import PriceTracker
+from market_manager import MarketManager, default_manager
+from market_registry import MarketRecord, MarketRegistry, default_registry
+from execution import ExecutionEngine
 
 from oracle import get_resolution
 
-from telegram_bot import TelegramBot
+from telegram_bot import NotificationDispatcher, TelegramBot
+from tracing import Trace, default_tracer
+import metrics
 import logging
 
 logger = logging.getLogger(__name__)
@@ -29,38 +32,72 @@ load_dotenv()
 TOKEN = os.environ.get("TELEGRAM_TOKEN")
 CHAT_ID = os.environ.get("CHAT_ID")
 telegram_bot = TelegramBot(TOKEN, CHAT_ID)
+# Telegram calls happen on the dispatcher's thread, trade() only enqueues
+notifier = NotificationDispatcher(telegram_bot)
 
+# API credentials are derived once here, not on the trigger path
+trading_client = TradingClient() if os.getenv("ENABLE_TRADING") == "true" else None
 
-class EarningsMarket:
-    _liquidity_logger_threads: Dict[str, Thread] = {}
-    _liquidity_logger_lock: Lock = Lock()
 
-    def __init__(self, url: str, edgar_sentinel: EdgarSentinel, init_run=True):
+# trigger sub-steps (three per trigger), separate from the manager's trade pool so they never wait on it
+CRITICAL_PATH_POOL = ThreadPoolExecutor(max_workers=16, thread_name_prefix="critical-path")
+PRICE_CACHE_MAX_AGE = 5.0  # seconds
+
+ORDERS = metrics.counter("orders_posted_total", "Trigger orders by outcome and result", ("outcome", "result"))
+TRIGGER_TO_ORDER_SECONDS = metrics.histogram("trigger_to_order_seconds", "Sentinel detection to order posted")
+
+
+def order_result(trade_resp) -> str:
+    """Metric label of an order response: execution reports, CLOB responses and dry runs."""
+    if not isinstance(trade_resp, dict) or trade_resp.get("error"):
+        return "error"
+    if "children" in trade_resp:  # ExecutionReport.as_dict()
+        if not trade_resp["children"]:
+            return "skipped"
+        return "filled" if trade_resp["filled"] > 0 else "unfilled"
+    return str(trade_resp.get("status") or "posted")
+
+
+class EarningsMarket:
+    def __init__(
+        self,
+        url: str,
+        edgar_sentinel: EdgarSentinel,
+        init_run=True,
+        manager: MarketManager | None = None,
+        registry: MarketRegistry | None = None,
+    ):
         self.url: str = url
         self.slug: str = polymarket_api.Utils.extract_slug_from_url(url)
-        self.ticker: str = polymarket_api.Utils.extract_ticker_from_slug(self.slug)
-        self.cik: str = str(EDGAR().get_cik_by_ticker(self.ticker))
+        # one cached Gamma record instead of a request per field
+        self.record: MarketRecord = (registry or default_registry()).get(self.slug)
+        if self.record.cik is None:
+            # the sentinel matches filings by CIK, without one the market could never trigger
+            raise ValueError(f"No CIK for {self.slug} (ticker {self.record.ticker} is not in SEC's ticker file)")
+        self.ticker: str = self.record.ticker
+        self.cik: str = str(self.record.cik)
         print(f"Registered ticker: {self.ticker}")
-        self.description = polymarket_api.DataFeed.get_slug_description(self.slug)
-        self.outcome_addresses: dict = (
-            polymarket_api.DataFeed.get_slug_outcome_addresses(self.slug)
-        )
+        self.description = self.record.description
+        self.outcome_addresses: dict = dict(self.record.token_ids)
         # print(self.outcome_addresses)
 
-        self.expected_release_date: datetime = (
-            polymarket_api.Utils.extract_expected_release_date(self.slug)
-        )
+        self.expected_release_date: datetime = self.record.release_date
         self.sec_url: str = None
 
         self.edgar_sentinel: EdgarSentinel = edgar_sentinel
         
         self.price_tracker:PriceTracker = None
+        self.order_stager: OrderStager = None
+        self.executor: ExecutionEngine = None
         
         # if not edgar_sentinel.running:
         #     raise "ERROR: Edgar sentinel is not running!"
 
-        self.thread: Thread = None
+        # price tracking, liquidity logging and the trigger all run on the shared manager
+        self.manager: MarketManager = manager or default_manager()
         self.alert: Event = Event()
+        self.triggered_at: float = None
+        self.trace: Trace = None
 
         self.resolution: str = None
         self.oracle_time = None
@@ -68,151 +105,209 @@ class EarningsMarket:
         if init_run:
             self.run()
 
-    @classmethod
-    def start_liquidity_logger(cls, slug: str):
-        with cls._liquidity_logger_lock:
-            existing = cls._liquidity_logger_threads.get(slug)
-            if existing and existing.is_alive():
-                return
-
-            def _run_liquidity_logger():
-                # Runs the order book logger without blocking the main process.
-                try:
-                    run_liquidity_logger(slug)
-                except Exception:
-                    logger.exception(
-                        "Liquidity logger exited unexpectedly for slug %s", slug
-                    )
-
-            logger.info("Starting liquidity logger for slug %s", slug)
-            th = Thread(target=_run_liquidity_logger, daemon=True)
-            cls._liquidity_logger_threads[slug] = th
-            th.start()
-
     def set_sec_url(self, url):
         self.sec_url = url
 
-    def trigger_alert(self):
+    def trigger_alert(self, trace: Trace | None = None):
+        if self.alert.is_set():
+            return  # one trade per market
         self.alert.set()
+        # manual triggers get a trace of their own, starting here
+        self.trace = trace or default_tracer().start(cik=self.cik, sec_url=self.sec_url)
+        self.trace.mark("alerted", slug=self.slug, ticker=self.ticker)
+        self.manager.dispatch(self)
 
     def run(self):
         self.edgar_sentinel.set_alert(self.cik, self)
-        self.thread = Thread(target=self.trade)
-        self.thread.start()
-        self.start_liquidity_logger(self.slug)
-        self.price_tracker:PriceTracker = PriceTracker(self.slug)
-
-
-    def trade(self):
-        # while True:
-        # self.alert.clear()
-        self.alert.wait()
-        print("ALERT TRIGGERED!!!!")
-        logger.info(f"Trigger sent to slug: {self.slug}")
 
-        # get prices before oracle
+        on_sample = None
+        if trading_client is not None:
+            # keep signed orders for both outcomes in step with the tracked prices
+            self.order_stager = OrderStager(trading_client, self.outcome_addresses)
+            on_sample = self.order_stager.refresh_from_sample
+            self.executor = ExecutionEngine(trading_client, market_data=self.manager.market_data, stager=self.order_stager)
+            # tick sizes and the signed orders at the engine's limit are ready before any trigger
+            self.order_stager.worker.submit((id(self), "prestage"), self.executor.prestage)
+        self.price_tracker:PriceTracker = PriceTracker(
+            self.slug,
+            on_sample=on_sample,
+            market_data=self.manager.market_data,
+            poller=self.manager.poller,
+            token_addresses=self.outcome_addresses,
+        )
+        self.manager.register(self)
+
+    def _price_snapshot(self):
+        """Snapshot of both outcome prices taken right at the trigger, live books first."""
+        market_data = self.manager.market_data
+        if market_data is not None:
+            price_yes = market_data.best_ask(self.outcome_addresses["Yes"])
+            price_no = market_data.best_ask(self.outcome_addresses["No"])
+            if price_yes is not None and price_no is not None:
+                return price_yes, price_no
         price_yes = polymarket_api.DataFeed.get_market_price_for_token(self.outcome_addresses["Yes"])
         price_no = polymarket_api.DataFeed.get_market_price_for_token(self.outcome_addresses["No"])
-        logger.info(f"Price after trigger - slug: {self.slug}, ticker: {self.ticker}, price_yes {price_yes}, price_no: {price_no}")
+        return price_yes, price_no
 
+    def _resolve(self):
+        self.manager.record_oracle_start(self)
+        self.trace.mark("oracle_start")
         timer_start = time.perf_counter()
-        resolution = get_resolution(self.description, self.sec_url)
+        resolution = get_resolution(self.description, self.sec_url, self.trace)
         self.oracle_time = time.perf_counter() - timer_start
+        return resolution
+
+    def _prepare_order(self):
+        """Makes sure signed orders for both outcomes are staged at the latest cached prices."""
+        if self.order_stager is None:
+            return
+        latest = self.price_tracker.latest() if self.price_tracker else None
+        if latest is not None:
+            _, price_yes, price_no = latest
+            self.order_stager.refresh({"Yes": price_yes, "No": price_no})
+
+    def _cached_price(self, outcome):
+        """Post-decision price from the live book or tracker cache, REST only if both are unavailable."""
+        if self.manager.market_data is not None:
+            best_ask = self.manager.market_data.best_ask(self.outcome_addresses[outcome])
+            if best_ask is not None:
+                return best_ask
+        latest = self.price_tracker.latest(max_age=PRICE_CACHE_MAX_AGE) if self.price_tracker else None
+        if latest is not None:
+            return latest[1] if outcome == "Yes" else latest[2]
+        price_str = polymarket_api.DataFeed.get_market_price_for_token(self.outcome_addresses[outcome])
+        try:
+            return float(json.loads(price_str)["price"])
+        except (TypeError, ValueError, KeyError):
+            return None
+
+    def _place_order(self, resolution, address, market_price):
+        try:
+            if self.executor is not None:
+                # size and limit come from the book depth under the worst price / edge limits
+                report = self.executor.execute(resolution, address)
+                if report.reason != "no order book":
+                    return report.as_dict()
+
+            # no book to size against: fall back to a fixed-size order at the last price
+            max_price = market_price
+            size = 10.0
+            staged = None
+            if self.order_stager is not None:
+                staged = self.order_stager.select(resolution, market_price, size)
+
+            if staged is not None:
+                trade_resp = self.order_stager.post(staged)
+            elif os.getenv("ENABLE_TRADING") == "true":
+                trade_resp = trading_client.place_limit_order(
+                    token_id=address,
+                    price=max_price,
+                    size=size,
+                    side="BUY",  # the resolved outcome's token is bought, as in OrderStager
+                )
+            else:
+                trade_resp = {"status": "dry_run"}
+        except Exception as e:
+            logger.exception(f"Error placing order for {self.slug}: {e}")
+            trade_resp = {"error": str(e)}
+        ORDERS.inc(outcome=resolution, result=order_result(trade_resp))
+        return trade_resp
 
-        resolution = json.loads(resolution)
-        resolution = resolution["resolution"]
+    def trade(self):
+        """
+        Trigger path: the price snapshot, the oracle and order preparation start together,
+        the order is posted as soon as the oracle answers, logging and Telegram come last.
+        """
+        trace = self.trace
+        trace.mark("trade_start")
+
+        f_prices = CRITICAL_PATH_POOL.submit(self._price_snapshot)
+        f_oracle = CRITICAL_PATH_POOL.submit(self._resolve)
+        f_prepare = CRITICAL_PATH_POOL.submit(self._prepare_order)
+
+        resolution = json.loads(f_oracle.result())["resolution"]
+        trace.mark("oracle_done", resolution=resolution)
+
+        trade_resp = None
+        market_price = None
         if resolution != "not enough informations":
             resolution = resolution[0].upper() + resolution[1:].lower()
             address = self.outcome_addresses[resolution]
+            market_price = self._cached_price(resolution)
+            trace.mark("price_ready", price=market_price)
 
-            price_str = polymarket_api.DataFeed.get_market_price_for_token(address)
             try:
-                market_price = float(price_str)
-            except (TypeError, ValueError):
-                market_price = None
-
-            msg_base = f"slug: {self.slug}, ticker: {self.ticker}, resolution: {resolution}, price: {price_str}, oracle time: {self.oracle_time}"
+                f_prepare.result()
+            except Exception as e:
+                logger.warning(f"Order preparation failed for {self.slug}: {e}")
+            trace.mark("order_prepared")
 
-            trade_resp = None
             if market_price is not None:
-                try:
-                    max_price = market_price
-                    size = 10.0               # TODO: set sizing by your own
-                    if os.getenv("ENABLE_TRADING") == "true":
-                        trade_resp = trade_resp = trading_client.place_limit_order(
-                            token_id=address,
-                            price=max_price,
-                            size=size,
-                            side="BUY" if resolution == "Yes" else "SELL",
-                        )
-                    else:
-                        trade_resp = {"status": "dry_run"}
-                    
-                    logger.info(f"Trade response for {self.slug}: {trade_resp}")
-                except Exception as e:
-                    logger.exception(f"Error placing order for {self.slug}: {e}")
-                    trade_resp = {"error": str(e)}
+                trade_resp = self._place_order(resolution, address, market_price)
+                trace.mark("order_posted")
+                TRIGGER_TO_ORDER_SECONDS.observe(trace.offsets()["order_posted"])
+
+        # everything below is off the critical path
+        try:
+            price_yes, price_no = f_prices.result()
+        except Exception as e:
+            price_yes, price_no = None, None
+            logger.warning(f"Trigger price snapshot failed for {self.slug}: {e}")
+        logger.info(f"Price after trigger - slug: {self.slug}, ticker: {self.ticker}, price_yes {price_yes}, price_no: {price_no}")
 
+        if resolution != "not enough informations":
+            msg_base = f"slug: {self.slug}, ticker: {self.ticker}, resolution: {resolution}, price: {market_price}, oracle time: {self.oracle_time}"
+            logger.info(f"Trade response for {self.slug}: {trade_resp}")
             full_msg = msg_base + f", trade_resp: {trade_resp}"
-            telegram_bot.send_message(full_msg)
-            logger.info(full_msg)
         else:
-            price_yes = polymarket_api.DataFeed.get_market_price_for_token(
-                self.outcome_addresses["Yes"]
-            )
-            price_no = polymarket_api.DataFeed.get_market_price_for_token(
-                self.outcome_addresses["No"]
-            )
-            logger.info(
-                f"slug: {self.slug}, ticker: {self.ticker}, resolution: {resolution}, price_yes {price_yes}, price_no: {price_no}, oracle time: {self.oracle_time}"
-            )
-            telegram_bot.send_message(
-                f"slug: {self.slug}, ticker: {self.ticker}, resolution: {resolution}, price_yes {price_yes}, price_no: {price_no}, oracle time: {self.oracle_time}"
-            )
-
-        # self.thred.join()
+            latest = self.price_tracker.latest() if self.price_tracker else None
+            cached_yes, cached_no = (latest[1], latest[2]) if latest else (None, None)
+            full_msg = f"slug: {self.slug}, ticker: {self.ticker}, resolution: {resolution}, price_yes {cached_yes}, price_no: {cached_no}, oracle time: {self.oracle_time}"
+
+        trace.mark("notification_queued")
+        logger.info(f"Trigger trace {trace}")
+        notifier.notify(full_msg, trace)
+        logger.info(full_msg)
 
     def __str__(self) -> str:
         return self.cik
 
 
 if __name__ == "__main__":
-    edgar_sentinel = EdgarSentinel()
-    time.sleep(1)
-
-    # kfy_url = "https://polymarket.com/event/kfy-quarterly-earnings-nongaap-eps-12-04-2025-1pt31"
-    # kfy_em = EarningsMarket(kfy_url, edgar_sentinel)
-
-    # len_url = "https://polymarket.com/event/len-quarterly-earnings-gaap-eps-12-16-2025-2pt22"
-    # len_em = EarningsMarket(len_url, edgar_sentinel)
-
-    # gis_url = "https://polymarket.com/event/gis-quarterly-earnings-nongaap-eps-12-17-2025-1pt02"
-    # gis_em = EarningsMarket(gis_url, edgar_sentinel)
+    import argparse
 
+    parser = argparse.ArgumentParser(description="Arm earnings markets and run the EDGAR sentinel.")
+    parser.add_argument("markets", nargs="*", help="Market URLs or slugs, default: every open market releasing soon")
+    parser.add_argument("--days", type=int, default=1, help="Arm markets releasing within this many days")
+    args = parser.parse_args()
 
+    edgar_sentinel = EdgarSentinel()
+    time.sleep(1)
 
-    payx_url = "https://polymarket.com/event/payx-quarterly-earnings-nongaap-eps-12-18-2025-1pt23"
-    nke_url = "https://polymarket.com/event/nke-quarterly-earnings-gaap-eps-12-18-2025-0pt37"
-    kbh_url = "https://polymarket.com/event/kbh-quarterly-earnings-gaap-eps-12-18-2025-1pt79"
-    edx_url = "https://polymarket.com/event/fdx-quarterly-earnings-nongaap-eps-12-18-2025-4pt03"
-
-    payx_em = EarningsMarket(payx_url, edgar_sentinel)
-    nke_em = EarningsMarket(nke_url, edgar_sentinel)
-    kbh_em = EarningsMarket(kbh_url, edgar_sentinel)
-    edx_url = EarningsMarket(edx_url, edgar_sentinel)
-
-    ccl_url = "https://polymarket.com/event/ccl-quarterly-earnings-nongaap-eps-12-19-2025-0pt25"
-    lw_url = "https://polymarket.com/event/lw-quarterly-earnings-nongaap-eps-12-19-2025-0pt63"
-    cag_url = "https://polymarket.com/event/cag-quarterly-earnings-nongaap-eps-12-19-2025-0pt44"
-
-    ccl_em = EarningsMarket(ccl_url, edgar_sentinel)
-    lw_em = EarningsMarket(lw_url, edgar_sentinel)
-    cag_em = EarningsMarket(cag_url, edgar_sentinel)
-
-
-    print("Market is runnning...")
+    registry = default_registry()
+    if args.markets:
+        slugs = [polymarket_api.Utils.extract_slug_from_url(m) for m in args.markets]
+        registry.get_many(slugs)  # one batched Gamma request
+    else:
+        slugs = []
+        for record in registry.upcoming(args.days):
+            if record.cik is None:
+                logger.warning(f"No CIK for {record.slug}, not armed")
+                continue
+            slugs.append(record.slug)
+
+    markets = []
+    for slug in slugs:
+        try:
+            markets.append(EarningsMarket(slug, edgar_sentinel, registry=registry))
+        except Exception as e:
+            logger.warning(f"Could not arm {slug}: {e}")
+
+    print(f"Market is runnning... ({len(markets)} armed)")
+    try:
+        metrics.serve()
+    except OSError as e:
+        logger.warning(f"Metrics endpoint not started: {e}")
     
     edgar_sentinel.run()
     print("Sentinel is running...")
-
-    # pass
@@ -0,0 +1,184 @@
+import numpy as np
+
+# Polymarket prices live on a 0.001 grid in [0, 1] (markets with a 0.01 tick are a subset),
+# so a side of the book is a fixed array of 1001 sizes indexed by price / TICK.
+TICK = 0.001
+N_LEVELS = 1001
+PRICES = np.round(np.arange(N_LEVELS) * TICK, 3)
+
+
+def price_to_index(price) -> int:
+    return int(round(float(price) / TICK))
+
+
+def levels_to_arrays(levels):
+    """CLOB [{"price": "0.5", "size": "10"}] -> (index array, size array)."""
+    if not levels:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64)
+    prices = np.array([float(x["price"]) for x in levels], dtype=np.float64)
+    sizes = np.array([float(x["size"]) for x in levels], dtype=np.float64)
+    return np.rint(prices / TICK).astype(np.int64), sizes
+
+
+class ArrayOrderBook:
+    """
+    Order book on the fixed price grid. Deltas are O(1) except when the best level empties,
+    best bid/ask and total depth are kept up to date so reading them is O(1), and the cost of
+    buying N shares is one cumulative sum over the ask levels from the best ask up.
+    """
+
+    def __init__(self):
+        self.bid_sizes = np.zeros(N_LEVELS, dtype=np.float64)
+        self.ask_sizes = np.zeros(N_LEVELS, dtype=np.float64)
+        self.best_bid_idx = -1  # -1 = no bids
+        self.best_ask_idx = N_LEVELS  # N_LEVELS = no asks
+        self.bid_shares = 0.0
+        self.ask_shares = 0.0
+        self.bid_usdc = 0.0
+        self.ask_usdc = 0.0
+
+    @classmethod
+    def from_levels(cls, bids, asks):
+        book = cls()
+        book.set_levels(bids, asks)
+        return book
+
+    @classmethod
+    def from_arrays(cls, bid_idx, bid_sizes, ask_idx, ask_sizes):
+        book = cls()
+        book.set_arrays(bid_idx, bid_sizes, ask_idx, ask_sizes)
+        return book
+
+    def set_levels(self, bids, asks):
+        """Replaces the whole book with CLOB string-priced levels."""
+        self.set_arrays(*levels_to_arrays(bids), *levels_to_arrays(asks))
+
+    def set_arrays(self, bid_idx, bid_sizes, ask_idx, ask_sizes):
+        self.bid_sizes[:] = 0.0
+        self.ask_sizes[:] = 0.0
+        self.bid_sizes[bid_idx] = bid_sizes
+        self.ask_sizes[ask_idx] = ask_sizes
+        self._recompute()
+
+    def _recompute(self):
+        bid_nz = np.flatnonzero(self.bid_sizes)
+        ask_nz = np.flatnonzero(self.ask_sizes)
+        self.best_bid_idx = int(bid_nz[-1]) if bid_nz.size else -1
+        self.best_ask_idx = int(ask_nz[0]) if ask_nz.size else N_LEVELS
+        self.bid_shares = float(self.bid_sizes.sum())
+        self.ask_shares = float(self.ask_sizes.sum())
+        self.bid_usdc = float(self.bid_sizes @ PRICES)
+        self.ask_usdc = float(self.ask_sizes @ PRICES)
+
+    def apply_delta(self, side: str, price, size):
+        """Sets the size of one level, side is "BUY" (bids) or "SELL" (asks), size 0 removes it."""
+        i = price_to_index(price)
+        size = float(size)
+        p = PRICES[i]
+
+        if side.upper() == "BUY":
+            old = self.bid_sizes[i]
+            self.bid_sizes[i] = size
+            self.bid_shares += size - old
+            self.bid_usdc += (size - old) * p
+            if size > 0 and i > self.best_bid_idx:
+                self.best_bid_idx = i
+            elif size == 0 and i == self.best_bid_idx:
+                nz = np.flatnonzero(self.bid_sizes[:i])
+                self.best_bid_idx = int(nz[-1]) if nz.size else -1
+        else:
+            old = self.ask_sizes[i]
+            self.ask_sizes[i] = size
+            self.ask_shares += size - old
+            self.ask_usdc += (size - old) * p
+            if size > 0 and i < self.best_ask_idx:
+                self.best_ask_idx = i
+            elif size == 0 and i == self.best_ask_idx:
+                nz = np.flatnonzero(self.ask_sizes[i + 1:])
+                self.best_ask_idx = i + 1 + int(nz[0]) if nz.size else N_LEVELS
+
+    @property
+    def best_bid(self):
+        return float(PRICES[self.best_bid_idx]) if self.best_bid_idx >= 0 else None
+
+    @property
+    def best_ask(self):
+        return float(PRICES[self.best_ask_idx]) if self.best_ask_idx < N_LEVELS else None
+
+    @property
+    def spread(self):
+        if self.best_bid is None or self.best_ask is None:
+            return None
+        return self.best_ask - self.best_bid
+
+    def cost_to_buy(self, size: float, limit_price: float | None = None):
+        """
+        Walks the asks from the best one, never above limit_price.
+        Returns (filled shares, cost in USDC, worst price touched or None).
+        """
+        if self.best_ask_idx >= N_LEVELS or size <= 0:
+            return 0.0, 0.0, None
+        end = N_LEVELS if limit_price is None else min(N_LEVELS, price_to_index(limit_price) + 1)
+        if end <= self.best_ask_idx:
+            return 0.0, 0.0, None
+
+        sizes = self.ask_sizes[self.best_ask_idx:end]
+        prices = PRICES[self.best_ask_idx:end]
+        depth = np.cumsum(sizes)
+
+        k = int(np.searchsorted(depth, size))  # first level where cumulative depth reaches size
+        if k >= len(depth):
+            filled = float(depth[-1])
+            cost = float(sizes @ prices)
+            nz = np.flatnonzero(sizes)
+            return filled, cost, float(prices[nz[-1]]) if nz.size else None
+
+        before = depth[k - 1] if k > 0 else 0.0
+        cost = float(sizes[:k] @ prices[:k] + (size - before) * prices[k])
+        return float(size), cost, float(prices[k])
+
+    def max_buy_size(self, limit_price: float, budget: float | None = None) -> float:
+        """Most shares buyable at or below limit_price, spending at most budget USDC."""
+        end = min(N_LEVELS, price_to_index(limit_price) + 1)
+        if end <= self.best_ask_idx:
+            return 0.0
+        sizes = self.ask_sizes[self.best_ask_idx:end]
+        if budget is None:
+            return float(sizes.sum())
+
+        prices = PRICES[self.best_ask_idx:end]
+        spend = np.cumsum(sizes * prices)
+        k = int(np.searchsorted(spend, budget))
+        if k >= len(spend):
+            return float(sizes.sum())
+        before = spend[k - 1] if k > 0 else 0.0
+        return float(sizes[:k].sum() + (budget - before) / prices[k])
+
+    def depth_below(self, limit_price: float):
+        """(shares, USDC) offered at or below limit_price."""
+        end = min(N_LEVELS, price_to_index(limit_price) + 1)
+        sizes = self.ask_sizes[:end]
+        return float(sizes.sum()), float(sizes @ PRICES[:end])
+
+    def ask_ladder(self):
+        """[(price, size)] best ask first."""
+        nz = np.flatnonzero(self.ask_sizes)
+        return [(float(PRICES[i]), float(self.ask_sizes[i])) for i in nz]
+
+    def bid_ladder(self):
+        """[(price, size)] best bid first."""
+        nz = np.flatnonzero(self.bid_sizes)[::-1]
+        return [(float(PRICES[i]), float(self.bid_sizes[i])) for i in nz]
+
+    def copy(self):
+        book = ArrayOrderBook.__new__(ArrayOrderBook)
+        book.__dict__.update(self.__dict__)
+        book.bid_sizes = self.bid_sizes.copy()
+        book.ask_sizes = self.ask_sizes.copy()
+        return book
+
+    def to_levels(self):
+        """(bids, asks) as CLOB /book levels: string prices, bids ascending, asks descending."""
+        bids = [{"price": f"{p:.3f}".rstrip("0").rstrip("."), "size": str(s)} for p, s in reversed(self.bid_ladder())]
+        asks = [{"price": f"{p:.3f}".rstrip("0").rstrip("."), "size": str(s)} for p, s in reversed(self.ask_ladder())]
+        return bids, asks
@@ -3,6 +3,10 @@ import time
 import datetime
 import json
 import numpy as np
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 
 # --- TRADING PART -------------------------------------------------
@@ -10,9 +14,14 @@ from datetime import datetime, timedelta, timezone
 import os
 from py_clob_client.client import ClobClient
 from py_clob_client.constants import POLYGON
-from py_clob_client.clob_types import OrderArgs
+from py_clob_client.clob_types import OrderArgs, OrderType
 from py_clob_client.order_builder.constants import BUY, SELL
 
+logger = logging.getLogger(__name__)
+
+GAMMA_URL = os.getenv("GAMMA_API_URL", "https://gamma-api.polymarket.com")
+CLOB_URL = os.getenv("CLOB_API_URL", "https://clob.polymarket.com")
+
 
 class TradingClient:
     """
@@ -25,7 +34,7 @@ class TradingClient:
     def __init__(
         self,
         private_key: str | None = None,
-        host: str = "https://clob.polymarket.com",
+        host: str = CLOB_URL,
         chain_id: int = POLYGON,
         funder: str | None = None,
     ) -> None:
@@ -76,6 +85,223 @@ class TradingClient:
         resp = self.client.create_and_post_order(order_args)
         return resp
 
+    def create_signed_order(
+        self,
+        token_id: str,
+        price: float,
+        size: float,
+        side: str = "BUY",
+    ):
+        """
+        Postaví a EIP-712 podepíše order bez odeslání, odeslat jde později přes post_signed_order.
+        """
+        side_const = BUY if side.upper() == "BUY" else SELL
+        return self.client.create_order(
+            OrderArgs(price=price, size=size, side=side_const, token_id=token_id)
+        )
+
+    def post_signed_order(self, signed_order, order_type=OrderType.GTC) -> dict:
+        return self.client.post_order(signed_order, order_type)
+
+    def get_tick_size(self, token_id: str) -> float:
+        return float(self.client.get_tick_size(token_id))
+
+    def get_order(self, order_id: str) -> dict:
+        """Stav orderu, hlavně "status" a "size_matched"."""
+        return self.client.get_order(order_id)
+
+    def cancel_order(self, order_id: str) -> dict:
+        return self.client.cancel(order_id)
+
+
+@dataclass
+class StagedOrder:
+    outcome: str
+    token_id: str
+    price: float
+    size: float
+    signed_order: object
+    signed_at: float  # time.perf_counter() at signing
+
+
+class StagingWorker:
+    """
+    One background thread that does the signing for every OrderStager, so neither the price
+    poller nor arming waits on EIP-712 signatures or tick-size lookups. Jobs are coalesced per
+    key: a job submitted while an older one for the same key is still queued replaces it.
+    """
+
+    def __init__(self):
+        self.pending: OrderedDict = OrderedDict()  # {key: job}, oldest first
+        self.cond = threading.Condition()
+        self.thread: threading.Thread = None
+
+    def submit(self, key, job) -> None:
+        with self.cond:
+            self.pending[key] = job
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="order-staging", daemon=True)
+                self.thread.start()
+            self.cond.notify()
+
+    def queued(self) -> int:
+        with self.cond:
+            return len(self.pending)
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while not self.pending:
+                    self.cond.wait()
+                key, job = self.pending.popitem(last=False)
+            try:
+                job()
+            except Exception as e:
+                logger.warning(f"Order staging job {key} failed: {e}")
+
+
+_default_staging_worker: StagingWorker = None
+_default_staging_worker_lock = threading.Lock()
+
+
+def default_staging_worker() -> StagingWorker:
+    """The process-wide worker every OrderStager signs on."""
+    global _default_staging_worker
+    with _default_staging_worker_lock:
+        if _default_staging_worker is None:
+            _default_staging_worker = StagingWorker()
+        return _default_staging_worker
+
+
+class OrderStager:
+    """
+    Keeps pre-built, pre-signed BUY orders for both outcomes of one market at a few limit
+    prices around the current price, so the trigger path only has to pick one and post it.
+    Signing (and the tick size / fee lookups create_order does) happens in refresh(), which
+    refresh_from_sample() runs on the staging worker as fresh prices come in.
+    """
+
+    def __init__(
+        self,
+        trading_client: TradingClient,
+        outcome_addresses: dict,
+        price_offsets: tuple = (0.0, 0.01, 0.02, 0.05),
+        sizes: tuple = (10.0,),
+        drift: float = 0.005,
+        worker: StagingWorker | None = None,
+    ) -> None:
+        self.trading_client = trading_client
+        self.worker = worker or default_staging_worker()
+        self.outcome_addresses = outcome_addresses
+        self.price_offsets = price_offsets
+        self.sizes = sizes
+        self.drift = drift
+
+        self.tick_sizes: dict = {}
+        self.reference_prices: dict = {}
+        self.staged: dict = {outcome: [] for outcome in outcome_addresses}
+        self.limit_orders: dict = {outcome: [] for outcome in outcome_addresses}  # see stage_limit()
+        self.lock = threading.Lock()
+
+    def _tick(self, token_id) -> float:
+        if token_id not in self.tick_sizes:
+            self.tick_sizes[token_id] = self.trading_client.get_tick_size(token_id)
+        return self.tick_sizes[token_id]
+
+    def refresh(self, prices: dict) -> None:
+        """prices: {outcome: current price}; re-signs the ladder of outcomes that drifted."""
+        for outcome, price in prices.items():
+            if not self._drifted(outcome, price):
+                continue
+
+            token_id = self.outcome_addresses[outcome]
+            tick = self._tick(token_id)
+            digits = max(0, -int(np.floor(np.log10(tick))))
+
+            ladder = []
+            for limit in sorted({round(min(max(price + off, tick), 1 - tick), digits) for off in self.price_offsets}):
+                for size in self.sizes:
+                    signed = self.trading_client.create_signed_order(token_id, limit, size, "BUY")
+                    ladder.append(StagedOrder(outcome, token_id, limit, size, signed, time.perf_counter()))
+
+            with self.lock:
+                self.staged[outcome] = ladder
+                self.reference_prices[outcome] = price
+
+    def stage_limit(self, outcome: str, limit: float, sizes) -> None:
+        """
+        Pre-signs BUY orders of the given sizes at one fixed limit, e.g. the ExecutionEngine's,
+        which does not move with the price and so is signed once per armed market.
+        """
+        token_id = self.outcome_addresses[outcome]
+        orders = [
+            StagedOrder(outcome, token_id, limit, size, self.trading_client.create_signed_order(token_id, limit, size, "BUY"), time.perf_counter())
+            for size in sizes
+        ]
+        with self.lock:
+            self.limit_orders[outcome] = orders
+
+    def take_limit(self, outcome: str, limit: float, max_size: float, min_size: float = 0.0):
+        """Largest order staged at `limit` with min_size <= size <= max_size, removed from the stage."""
+        with self.lock:
+            candidates = [
+                o for o in self.limit_orders.get(outcome, [])
+                if abs(o.price - limit) < 1e-9 and min_size <= o.size <= max_size
+            ]
+            if not candidates:
+                return None
+            order = max(candidates, key=lambda o: o.size)
+            self.limit_orders[outcome].remove(order)
+            return order
+
+    def refresh_from_sample(self, time_stamp, price_yes, price_no) -> None:
+        """PriceTracker callback, runs on the poller thread: only queues the re-signing."""
+        prices = {"Yes": price_yes, "No": price_no}
+        if not any(self._drifted(outcome, price) for outcome, price in prices.items()):
+            return
+        self.worker.submit((id(self), "refresh"), lambda: self.refresh(prices))
+
+    def _drifted(self, outcome, price) -> bool:
+        if price is None or outcome not in self.outcome_addresses:
+            return False
+        reference = self.reference_prices.get(outcome)
+        return reference is None or abs(price - reference) >= self.drift or not self.staged[outcome]
+
+    def select(self, outcome: str, market_price: float | None = None, size: float | None = None):
+        """
+        Cheapest staged order of the outcome whose limit still crosses market_price,
+        removed from the stage since a signed order can be posted only once.
+        """
+        with self.lock:
+            candidates = [
+                o for o in self.staged.get(outcome, [])
+                if (market_price is None or o.price >= market_price)
+                and (size is None or o.size <= size)
+            ]
+            if not candidates:
+                return None
+            order = min(candidates, key=lambda o: (o.price, -o.size))
+            self.staged[outcome].remove(order)
+            self.reference_prices.pop(outcome, None)  # restage on the next refresh
+            return order
+
+    def post(self, order: StagedOrder) -> dict:
+        post_start = time.perf_counter()
+        resp = self.trading_client.post_signed_order(order.signed_order)
+        post_end = time.perf_counter()
+
+        timings = {
+            "signed_age_sec": post_start - order.signed_at,
+            "post_latency_sec": post_end - post_start,
+        }
+        logger.info(
+            f"Posted staged {order.outcome} order {order.size}@{order.price}: "
+            f"post latency {timings['post_latency_sec']:.4f}s, signed {timings['signed_age_sec']:.1f}s before"
+        )
+        if isinstance(resp, dict):
+            resp = {**resp, **timings}
+        return resp
+
 class Utils:
     @staticmethod
     def extract_ticker_from_slug(slug) -> str:
@@ -104,7 +330,7 @@ class Utils:
 class DataFeed:
     @staticmethod
     def get_slug_description(slug):
-        url = "https://gamma-api.polymarket.com/markets/slug/" + slug
+        url = f"{GAMMA_URL}/markets/slug/" + slug
         resp = requests.get(url)
         resp.raise_for_status()
         resp_json = json.loads(resp.text)
@@ -113,7 +339,7 @@ class DataFeed:
 
     @staticmethod
     def get_slug_outcome_addresses(slug) -> dict:
-        url = "https://gamma-api.polymarket.com/markets/slug/" + slug
+        url = f"{GAMMA_URL}/markets/slug/" + slug
         resp = requests.get(url)
         resp.raise_for_status()
         resp_json = json.loads(resp.text)
@@ -131,11 +357,14 @@ class DataFeed:
 
     @staticmethod
     def get_slug_data(slug) -> dict:
-        url = "https://gamma-api.polymarket.com/markets/slug/" + slug
+        url = f"{GAMMA_URL}/markets/slug/" + slug
         resp = requests.get(url)
         resp.raise_for_status()
         resp_json = json.loads(resp.text)
+        return DataFeed.parse_slug_data(resp_json)
 
+    @staticmethod
+    def parse_slug_data(resp_json) -> dict:
         description = resp_json["description"]
         outcomes = json.loads(resp_json["outcomes"])
         outcome_prices = json.loads(resp_json["outcomePrices"])
@@ -155,23 +384,30 @@ class DataFeed:
         }
 
     @staticmethod
-    def get_price_history_for_token(token_id, start_dt, end_dt) -> list:
-        HOST = "https://clob.polymarket.com"
-
-        start_ts = int(start_dt.timestamp())
-        end_ts = int(end_dt.timestamp())
+    def get_price_history_for_token(token_id, start_dt, end_dt, fidelity=None) -> list:
+        HOST = CLOB_URL
 
         resp = requests.get(
             f"{HOST}/prices-history",
-            params={
-                "market": token_id,
-                "startTs": start_ts,
-                "endTs": end_ts,
-            },
+            params=DataFeed.price_history_params(token_id, start_dt, end_dt, fidelity),
         )
 
         resp.raise_for_status()
-        data = resp.json()
+        return DataFeed.parse_price_history(resp.json())
+
+    @staticmethod
+    def price_history_params(token_id, start_dt, end_dt, fidelity=None) -> dict:
+        params = {
+            "market": token_id,
+            "startTs": int(start_dt.timestamp()),
+            "endTs": int(end_dt.timestamp()),
+        }
+        if fidelity is not None:
+            params["fidelity"] = fidelity  # resolution in minutes
+        return params
+
+    @staticmethod
+    def parse_price_history(data) -> list:
         history = data.get("history", [])
 
         prices = []
@@ -182,7 +418,7 @@ class DataFeed:
 
     @staticmethod
     def get_market_price_for_token(token_id):
-        HOST = "https://clob.polymarket.com/"
+        HOST = CLOB_URL
         resp = requests.get(
             f"{HOST}/price", params={"token_id": token_id, "side": "SELL"}
         )
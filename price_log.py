@@ -0,0 +1,250 @@
+import argparse
+import atexit
+import bisect
+import logging
+import os
+import threading
+import time
+import weakref
+
+import numpy as np
+
+# Binary price log: fixed 16-byte records (float64 ts, float32 yes, float32 no) appended to
+# rotating segment files <dir>/seg-000000.bin, ... plus a sparse index <dir>/index.bin with one
+# (ts, segment, record) entry per INDEX_STRIDE records and at every segment start. Timestamps
+# are expected to be non-decreasing, which is what the trackers produce.
+
+RECORD_DTYPE = np.dtype([("ts", "<f8"), ("yes", "<f4"), ("no", "<f4")])
+INDEX_DTYPE = np.dtype([("ts", "<f8"), ("segment", "<i8"), ("record", "<i8")])
+
+SEGMENT_RECORDS = 1 << 20  # 16 MiB, ~12 days at one sample per second
+INDEX_STRIDE = 4096
+DEFAULT_FLUSH_INTERVAL = 5.0  # seconds
+DEFAULT_BUFFER_RECORDS = 1024
+
+logger = logging.getLogger(__name__)
+
+
+def segment_path(path, segment: int) -> str:
+    return os.path.join(path, f"seg-{segment:06d}.bin")
+
+
+def list_segments(path) -> list:
+    if not os.path.isdir(path):
+        return []
+    return sorted(
+        int(name[4:10]) for name in os.listdir(path) if name.startswith("seg-") and name.endswith(".bin")
+    )
+
+
+class PriceLogWriter:
+    """
+    Buffers records in memory and appends them to the current segment once the buffer is full,
+    every flush_interval seconds (from a shared background thread) and at interpreter exit.
+    """
+
+    def __init__(
+        self,
+        path,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        buffer_records: int = DEFAULT_BUFFER_RECORDS,
+        segment_records: int = SEGMENT_RECORDS,
+    ):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.segment_records = segment_records
+        self.buffer = np.empty(buffer_records, dtype=RECORD_DTYPE)
+        self.pending = 0
+        self.pending_index = []
+        self.lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+
+        segments = list_segments(path)
+        self.segment = segments[-1] if segments else 0
+        self.segment_count = self._recover(self.segment) if segments else 0
+        self.file = None
+        self.last_flush = time.monotonic()
+        _register_writer(self)
+
+    def _recover(self, segment) -> int:
+        """Record count of an existing segment, dropping a torn trailing record."""
+        seg_path = segment_path(self.path, segment)
+        size = os.path.getsize(seg_path)
+        if size % RECORD_DTYPE.itemsize:
+            with open(seg_path, "r+b") as f:
+                f.truncate(size - size % RECORD_DTYPE.itemsize)
+        return size // RECORD_DTYPE.itemsize
+
+    def append(self, time_stamp, price_yes, price_no):
+        with self.lock:
+            if self.segment_count >= self.segment_records:
+                self._flush_locked()
+                self._close_locked()
+                self.segment += 1
+                self.segment_count = 0
+            if self.segment_count % INDEX_STRIDE == 0:
+                self.pending_index.append((time_stamp, self.segment, self.segment_count))
+
+            self.buffer[self.pending] = (time_stamp, price_yes, price_no)
+            self.pending += 1
+            self.segment_count += 1
+
+            # rotation and a full buffer both force a write
+            if self.pending == len(self.buffer) or self.segment_count >= self.segment_records:
+                self._flush_locked()
+
+    def flush(self):
+        with self.lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        self.last_flush = time.monotonic()
+        if self.pending == 0:
+            return
+        if self.file is None:
+            self.file = open(segment_path(self.path, self.segment), "ab")
+        self.file.write(self.buffer[: self.pending].tobytes())
+        self.file.flush()
+        self.pending = 0
+
+        # index after data, so a reader never sees an index entry past the end of a segment
+        if self.pending_index:
+            with open(os.path.join(self.path, "index.bin"), "ab") as f:
+                f.write(np.array(self.pending_index, dtype=INDEX_DTYPE).tobytes())
+            self.pending_index = []
+
+    def _close_locked(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def close(self):
+        with self.lock:
+            self._flush_locked()
+            self._close_locked()
+
+
+_writers = weakref.WeakSet()
+_writers_lock = threading.Lock()
+_flusher: threading.Thread = None
+
+
+def _register_writer(writer: PriceLogWriter):
+    global _flusher
+    with _writers_lock:
+        _writers.add(writer)
+        if _flusher is None:
+            _flusher = threading.Thread(target=_flush_loop, name="price-log-flush", daemon=True)
+            _flusher.start()
+
+
+def _flush_loop():
+    while True:
+        time.sleep(1.0)
+        now = time.monotonic()
+        for writer in list(_writers):
+            if now - writer.last_flush >= writer.flush_interval:
+                try:
+                    writer.flush()
+                except OSError as e:
+                    logger.warning(f"Price log flush of {writer.path} failed: {e}")
+
+
+@atexit.register
+def flush_all():
+    for writer in list(_writers):
+        try:
+            writer.close()
+        except OSError:
+            pass
+
+
+class PriceLogReader:
+    """
+    Reads a price log directory through memory maps. range(t0, t1) finds the first segment and
+    record block in the sparse index and bisects inside the mapped segment, so a lookup is
+    O(log n) and a range within one segment is a view of the file, not a copy.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._maps: dict = {}  # {segment: (size, memmap)}
+
+    def index(self) -> np.ndarray:
+        index_path = os.path.join(self.path, "index.bin")
+        if not os.path.exists(index_path):
+            return np.zeros(0, dtype=INDEX_DTYPE)
+        return np.fromfile(index_path, dtype=INDEX_DTYPE)
+
+    def segment(self, segment: int) -> np.ndarray:
+        """Memory-mapped records of one segment, re-mapped when the writer has appended since."""
+        seg_path = segment_path(self.path, segment)
+        size = os.path.getsize(seg_path) if os.path.exists(seg_path) else 0
+        size -= size % RECORD_DTYPE.itemsize
+        cached = self._maps.get(segment)
+        if cached is not None and cached[0] == size:
+            return cached[1]
+        records = (
+            np.memmap(seg_path, dtype=RECORD_DTYPE, mode="r", shape=(size // RECORD_DTYPE.itemsize,))
+            if size
+            else np.zeros(0, dtype=RECORD_DTYPE)
+        )
+        self._maps[segment] = (size, records)
+        return records
+
+    def range(self, t0: float, t1: float) -> np.ndarray:
+        """Records with t0 <= ts <= t1, a memmap view when they sit in a single segment."""
+        index = self.index()
+        if len(index) == 0:
+            return np.zeros(0, dtype=RECORD_DTYPE)
+
+        i = max(0, bisect.bisect_right(index["ts"], t0) - 1)
+        segment, lo = int(index["segment"][i]), int(index["record"][i])
+        last_segment = int(index["segment"][-1])
+
+        parts = []
+        while segment <= last_segment:
+            records = self.segment(segment)
+            ts = records["ts"]
+            start = bisect.bisect_left(ts, t0, lo, len(records))
+            end = bisect.bisect_right(ts, t1, start, len(records))
+            if end > start:
+                parts.append(records[start:end])
+            if end < len(records):
+                break  # the range ends inside this segment
+            segment += 1
+            lo = 0
+
+        if not parts:
+            return np.zeros(0, dtype=RECORD_DTYPE)
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def all(self) -> np.ndarray:
+        return self.range(-np.inf, np.inf)
+
+
+def convert_text_log(text_path, out_path):
+    """Converts a legacy "ts yes no" text price file into a binary price log."""
+    data = np.loadtxt(text_path, ndmin=2)
+    writer = PriceLogWriter(out_path)
+    for ts, yes, no in data:
+        writer.append(ts, yes, no)
+    writer.close()
+    return len(data)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert or inspect binary price logs.")
+    parser.add_argument("path", help="Price log directory, or a legacy text price file with --convert")
+    parser.add_argument("--convert", default=None, help="Write the text file at path into this log directory")
+    parser.add_argument("--t0", type=float, default=-np.inf)
+    parser.add_argument("--t1", type=float, default=np.inf)
+
+    args = parser.parse_args()
+    if args.convert:
+        print(f"Converted {convert_text_log(args.path, args.convert)} records into {args.convert}")
+    else:
+        records = PriceLogReader(args.path).range(args.t0, args.t1)
+        print(f"{len(records)} records")
+        for ts, yes, no in records[:10]:
+            print(f"{ts:.3f} {yes:.4f} {no:.4f}")
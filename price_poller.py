@@ -0,0 +1,139 @@
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+import requests
+
+logger = logging.getLogger(__name__)
+
+CLOB_URL = os.getenv("CLOB_API_URL", "https://clob.polymarket.com")
+MAX_BATCH = 500  # tokens per POST /prices or /books request
+
+
+class PricePoller:
+    """
+    One price stream for every registered token: each poll is a single POST /prices (chunked
+    by MAX_BATCH) stamped with one time.time(), the results land in a flat array slot per token
+    and are published to subscribers as (time_stamp, {token_id: price}). Tokens with a live
+    MarketDataService book take its best ask instead and are left out of the HTTP batch.
+    """
+
+    def __init__(self, interval: float = 1.0, market_data=None, session: requests.Session | None = None):
+        self.interval = interval
+        self.market_data = market_data
+        self.session = session or requests.Session()
+
+        self.slots: dict = {}  # {token_id: index into prices}
+        self.token_ids: list = []
+        self.prices = np.full(0, np.nan)
+        self.time_stamp: float = None
+        self.lock = threading.Lock()
+        self.subscribers = []  # callables(time_stamp, {token_id: price})
+
+        self.thread: threading.Thread = None
+        self.running = False
+
+    def register(self, token_ids):
+        with self.lock:
+            new = [t for t in token_ids if t not in self.slots]
+            for token_id in new:
+                self.slots[token_id] = len(self.token_ids)
+                self.token_ids.append(token_id)
+            if new:
+                self.prices = np.concatenate([self.prices, np.full(len(new), np.nan)])
+
+    def subscribe(self, callback):
+        self.subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self.subscribers:
+            self.subscribers.remove(callback)
+
+    def latest(self, token_id):
+        """(time_stamp, price) of the last poll, price is None if the token had no quote."""
+        i = self.slots.get(token_id)
+        if i is None or self.time_stamp is None:
+            return None
+        price = self.prices[i]
+        return self.time_stamp, None if np.isnan(price) else float(price)
+
+    def _post(self, path, body):
+        resp = self.session.post(f"{CLOB_URL}{path}", json=body, timeout=5)
+        resp.raise_for_status()
+        return resp.json()
+
+    def fetch_prices(self, token_ids, side: str = "SELL") -> dict:
+        """{token_id: price} for all token_ids, one request per MAX_BATCH tokens."""
+        prices = {}
+        for i in range(0, len(token_ids), MAX_BATCH):
+            body = [{"token_id": t, "side": side} for t in token_ids[i:i + MAX_BATCH]]
+            for token_id, quote in self._post("/prices", body).items():
+                if quote and quote.get(side) is not None:
+                    prices[token_id] = float(quote[side])
+        return prices
+
+    def fetch_books(self, token_ids) -> dict:
+        """{token_id: /book response} for all token_ids, one request per MAX_BATCH tokens."""
+        books = {}
+        for i in range(0, len(token_ids), MAX_BATCH):
+            body = [{"token_id": t} for t in token_ids[i:i + MAX_BATCH]]
+            for book in self._post("/books", body):
+                books[book["asset_id"]] = book
+        return books
+
+    def poll(self):
+        """Polls every registered token once and publishes the batch."""
+        with self.lock:
+            token_ids = list(self.token_ids)
+            slots = dict(self.slots)
+        if not token_ids:
+            return
+
+        time_stamp = time.time()
+        values = np.full(len(token_ids), np.nan)
+
+        missing = []
+        for token_id in token_ids:
+            best_ask = self.market_data.best_ask(token_id) if self.market_data is not None else None
+            if best_ask is None:
+                missing.append(token_id)
+            else:
+                values[slots[token_id]] = best_ask
+
+        if missing:
+            try:
+                for token_id, price in self.fetch_prices(missing).items():
+                    if token_id in slots:
+                        values[slots[token_id]] = price
+            except (requests.RequestException, ValueError) as e:
+                logger.warning(f"Batched price poll of {len(missing)} tokens failed: {e}")
+
+        with self.lock:
+            # tokens registered during the poll keep their NaN slot until the next one
+            self.prices[: len(values)] = values
+            self.time_stamp = time_stamp
+
+        batch = {t: float(values[i]) for t, i in slots.items() if not np.isnan(values[i])}
+        for callback in self.subscribers:
+            try:
+                callback(time_stamp, batch)
+            except Exception:
+                logger.exception("Price poller subscriber failed")
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="price-poller", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+
+    def _run(self):
+        while self.running:
+            started = time.monotonic()
+            self.poll()
+            time.sleep(max(0.0, self.interval - (time.monotonic() - started)))
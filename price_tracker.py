@@ -5,24 +5,40 @@ from threading import Thread
 import os
 import json
 
+from market_registry import default_registry
+from price_log import PriceLogWriter
+
 PRICE_DATA_PATH = "price_data"
 
 class PriceTracker:
     """
         This class creates a thred which track market prices for a market on polymarket.
-        The ouput file structure is unix_time_stamp price_yes price_no separated by space
-        and each entry is a new line.
+        Samples go to the binary price log price_data/<slug>.plog (see price_log.py), which
+        buffers them and flushes periodically and at exit.
+        on_sample(time_stamp, price_yes, price_no) is called with float prices after every sample.
+        With a MarketDataService the prices are the live best asks, /price is only the fallback.
+        With a PricePoller the tracker makes no requests of its own, it records the poller's
+        batches (start is ignored).
     """
-    def __init__(self, slug:str):
+    def __init__(self, slug:str, on_sample=None, start:bool=True, market_data=None, poller=None, interval:float=1.0, token_addresses:dict=None):
         self.slug:str = slug
-        self.token_addresses:dict = polymarket_api.DataFeed.get_slug_outcome_addresses(slug)
+        self.on_sample = on_sample
+        self.market_data = market_data
+        self.poller = poller
+        self.interval = interval
+        self.token_addresses:dict = token_addresses or default_registry().get(slug).token_ids
 
         self.thread = None
         self.thread_running = False
+        self.last_sample = None  # (time_stamp, price_yes, price_no)
 
-        self.price_file_name = slug
+        self.price_log = PriceLogWriter(os.path.join(PRICE_DATA_PATH, slug + ".plog"))
 
-        self.run() # start thread
+        if poller is not None:
+            poller.register([self.token_addresses["Yes"], self.token_addresses["No"]])
+            poller.subscribe(self.on_batch)
+        elif start:
+            self.run()
 
     def run(self):
         self.thread = Thread(target=self.track_price)
@@ -31,28 +47,57 @@ class PriceTracker:
     
     def stop(self):
         self.thread_running = False
+        if self.poller is not None:
+            self.poller.unsubscribe(self.on_batch)
         
     def track_price(self):
-        if not os.path.isdir(PRICE_DATA_PATH):
-            os.mkdir(PRICE_DATA_PATH)
-
-        open(os.path.join(PRICE_DATA_PATH, self.price_file_name), 'a').close() # create an empty file
         while self.thread_running:
-            tokken_address_yes = self.token_addresses["Yes"]
-            tokken_address_no = self.token_addresses["No"]
+            started = time.monotonic()
+            self.sample()
+            time.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def on_batch(self, time_stamp, prices:dict):
+        """PricePoller callback, prices is {token_id: price} of the whole batch."""
+        price_yes = prices.get(self.token_addresses["Yes"])
+        price_no = prices.get(self.token_addresses["No"])
+        if price_yes is not None and price_no is not None:
+            self.record(time_stamp, price_yes, price_no)
+
+    def sample(self):
+        """Fetches one YES/NO price pair and appends it to the price log."""
+        tokken_address_yes = self.token_addresses["Yes"]
+        tokken_address_no = self.token_addresses["No"]
 
-            time_stamp = time.time()
+        time_stamp = time.time()
+        price_yes = price_no = None
+        if self.market_data is not None:
+            price_yes = self.market_data.best_ask(tokken_address_yes)
+            price_no = self.market_data.best_ask(tokken_address_no)
+        if price_yes is None or price_no is None:
             price_yes = json.loads(polymarket_api.DataFeed.get_market_price_for_token(tokken_address_yes))["price"]
             price_no = json.loads(polymarket_api.DataFeed.get_market_price_for_token(tokken_address_no))["price"]
-            with open(os.path.join(PRICE_DATA_PATH, self.price_file_name), "a") as f:
-                f.write(f"{time_stamp} {price_yes} {price_no}\n")
+        self.record(time_stamp, price_yes, price_no)
+
+    def record(self, time_stamp, price_yes, price_no):
+        self.price_log.append(time_stamp, float(price_yes), float(price_no))
+        self.last_sample = (time_stamp, float(price_yes), float(price_no))
+        if self.on_sample is not None:
+            self.on_sample(*self.last_sample)
+
+    def latest(self, max_age: float | None = None):
+        """Last (time_stamp, price_yes, price_no) sample, None if missing or older than max_age."""
+        sample = self.last_sample
+        if sample is None or (max_age is not None and time.time() - sample[0] > max_age):
+            return None
+        return sample
+
 
 
 
 if __name__ == "__main__":
 
     slug = "len-quarterly-earnings-gaap-eps-12-16-2025-2pt22"
-    addresses = polymarket_api.DataFeed.get_slug_outcome_addresses(slug)
+    addresses = default_registry().get(slug).token_ids
     print(addresses)
     price_tracker = PriceTracker(slug)
 
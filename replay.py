@@ -0,0 +1,249 @@
+import argparse
+import hashlib
+import logging
+import os
+import sys
+import tempfile
+import time
+from urllib.parse import urlparse
+
+import numpy as np
+
+from standins.clob_ws import ClobWsReplayServer
+from standins.edgar import EdgarStandin, Filing, parse_sentinel_log
+from standins.model import FakeModelClient
+from standins.polymarket import ClobRestStandin, GammaStandin, TelegramStandin, clob_book, gamma_market
+
+# Offline end-to-end replay: local stand-ins for the EDGAR feed and archives, Gamma, the CLOB
+# REST and WebSocket APIs, Telegram and the model, fed from backtest cases (and optionally the
+# sentinel log and recorded books). order.py's real code paths run against them: the sentinel
+# polls the stand-in feed, EarningsMarkets arm from the stand-in Gamma, every released filing
+# goes through dispatch, the oracle and a dry-run order, and the traces give the latencies.
+# The service URLs are passed through the environment, so the bot's modules are imported only
+# after the stand-ins are up.
+
+DEFAULT_CASES = "backtest_data/data.json"
+DEFAULT_SENTINEL_LOG = "logs/sec_sentinel.log"
+
+
+def token_id(slug, outcome) -> str:
+    """Deterministic CLOB-style numeric token id."""
+    return str(int(hashlib.sha1(f"{slug}:{outcome}".encode()).hexdigest()[:30], 16))
+
+
+def select_cases(cases, limit) -> list:
+    """Resolved cases with an SEC link, at most one per CIK (the sentinel keeps one market per CIK)."""
+    selected, ciks = [], set()
+    for case in cases:
+        link = case.get("sec_link")
+        if not link or case.get("target") not in ("Yes", "No") or not case.get("slug"):
+            continue
+        cik = urlparse(link).path.split("/")[4]
+        if cik in ciks:
+            continue
+        ciks.add(cik)
+        selected.append(case)
+        if len(selected) == limit:
+            break
+    return selected
+
+
+def synthetic_book(token, winning: bool):
+    """A book that leaves room for a buy: asks from 0.55 (winner) / 0.45 (loser) up."""
+    base = 0.55 if winning else 0.45
+    asks = [(round(base + 0.01 * i, 2), 100.0 * (i + 1)) for i in range(5)]
+    bids = [(round(base - 0.02 - 0.01 * i, 2), 100.0 * (i + 1)) for i in range(5)]
+    return clob_book(token, bids, asks)
+
+
+def recorded_book(books_dir, case, outcome, token):
+    """The outcome's book at the case's SEC time from a liquidity log, None if there is none."""
+    from stats.book_replay import OrderBookStore
+
+    store = OrderBookStore.load_for_slug(books_dir, case["slug"])
+    found = store.book_at(outcome, float(case["sec_time_stamp"])) if store is not None else None
+    if found is None:
+        return None
+    _, book = found
+    return clob_book(token, book.bid_ladder(), book.ask_ladder())
+
+
+def build_fixtures(cases, books_dir=None, sentinel_log=None):
+    """(companies, markets, books, filings) for the stand-ins."""
+    recorded_titles = {}
+    if sentinel_log and os.path.exists(sentinel_log):
+        for title, href, _, cik in parse_sentinel_log(sentinel_log):
+            recorded_titles[str(cik)] = title
+
+    companies, markets, books, filings = {}, [], {}, []
+    for case in cases:
+        slug = case["slug"]
+        parts = urlparse(case["sec_link"]).path.split("/")
+        cik, accession = parts[4], parts[5]
+        ticker = slug.split("-")[0].upper()
+        title = recorded_titles.get(cik, "")
+        company = title.split(" - ", 1)[1].split(" (")[0] if " - " in title else f"{ticker} INC"
+        form = title.split(" - ", 1)[0] if " - " in title else "8-K"
+        companies[cik] = (ticker, company)
+
+        tokens = {"Yes": token_id(slug, "Yes"), "No": token_id(slug, "No")}
+        release_date = "-".join(slug.split("-")[5:8])
+        markets.append(gamma_market(slug, case.get("description", ""), tokens, end_date=release_date))
+        for outcome, token in tokens.items():
+            book = recorded_book(books_dir, case, outcome, token) if books_dir else None
+            books[token] = book or synthetic_book(token, outcome == case["target"])
+
+        press_release = f"<html><body><p>{company} reports results for the quarter.</p><p>{case.get('description', '')[:500]}</p></body></html>"
+        filings.append(Filing(
+            cik=cik,
+            accession=accession,
+            form=form,
+            company=company,
+            documents={
+                f"{ticker.lower()}-8k.htm": f"<html><body><p>Form {form}, Item 2.02 Results of Operations.</p></body></html>",
+                f"{ticker.lower()}-ex991.htm": press_release,
+            },
+        ))
+    return companies, markets, books, filings
+
+
+def wait_for(predicate, timeout, interval=0.05) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(interval)
+    return predicate()
+
+
+def report(traces, released: dict):
+    """Prints detection-to-order latency per filing and the per-stage histograms."""
+    import tracing
+
+    print(f"\n{'SLUG':<60} | {'RELEASE->DETECT':>15} | {'DETECT->ORACLE':>14} | {'DETECT->ORDER':>13}")
+    to_order, to_detect = [], []
+    for trace in traces:
+        offsets = trace.offsets()
+        released_at = released.get(trace.attrs.get("cik"))
+        detect = trace.marks[0]["wall"] - released_at if released_at else None
+        order = offsets.get("order_posted")
+        if detect is not None:
+            to_detect.append(detect)
+        if order is not None:
+            to_order.append(order)
+        fmt = lambda v, w: f"{v:>{w}.3f}" if v is not None else f"{'-':>{w}}"
+        print(f"{trace.attrs.get('slug', ''):<60} | {fmt(detect, 15)} | {fmt(offsets.get('oracle_done'), 14)} | {fmt(order, 13)}")
+
+    for name, values in (("Release to detection", to_detect), ("Detection to order", to_order)):
+        if values:
+            p50, p90 = np.percentile(values, [50, 90])
+            print(f"{name}: p50 {p50:.3f}s, p90 {p90:.3f}s, max {max(values):.3f}s (n={len(values)})")
+    print()
+    tracing.print_summary(traces)
+
+
+def run(args):
+    from stats.event_liquidity import load_cases
+
+    cases = select_cases(load_cases(args.cases), args.limit)
+    if not cases:
+        print("No usable cases")
+        return
+    books_dir = os.path.abspath(args.books) if args.books else None
+    companies, markets, books, filings = build_fixtures(cases, books_dir, args.sentinel_log)
+
+    latency = {"latency": args.network_latency}
+    edgar = EdgarStandin(companies, **latency).start()
+    gamma = GammaStandin(markets, **latency).start()
+    clob = ClobRestStandin(books, **latency).start()
+    telegram = TelegramStandin(**latency).start()
+    ws = ClobWsReplayServer([(0.0, {"event_type": "book", **book}) for book in books.values()], speed=None).start()
+
+    workdir = os.path.abspath(args.workdir or tempfile.mkdtemp(prefix="replay-"))
+    os.makedirs(workdir, exist_ok=True)
+    trace_path = os.path.join(workdir, "traces.jsonl")
+    os.environ.update({
+        "SEC_WWW_URL": edgar.url,
+        "SEC_DATA_URL": edgar.url,
+        "GAMMA_API_URL": gamma.url,
+        "CLOB_API_URL": clob.url,
+        "CLOB_WS_URL": ws.url,
+        "TELEGRAM_API_URL": telegram.url,
+        "TELEGRAM_TOKEN": "replay",
+        "CHAT_ID": "replay",
+        "ORACLE_DOCUMENT_FORMAT": "html",  # no wkhtmltopdf needed, the stand-in model takes any file
+        "TRACE_LOG": trace_path,
+    })
+    os.environ.pop("ENABLE_TRADING", None)  # orders stop at the dry-run post
+    os.chdir(workdir)  # logs/, price_data/ and liquidity logs of the run stay here
+
+    import oracle
+    import tracing
+    from edgar_sentinel import EdgarSentinel
+    from market_registry import default_registry
+    from order import EarningsMarket
+
+    answers = {case.get("description", ""): case["target"] for case in cases}
+    oracle.set_model_client_factory(lambda: FakeModelClient(answers, args.model_latency, args.upload_latency))
+
+    sentinel = EdgarSentinel()
+    registry = default_registry()
+    registry.get_many([case["slug"] for case in cases])
+    armed = [EarningsMarket(case["slug"], sentinel, registry=registry) for case in cases]
+    sentinel.run()
+    if not wait_for(lambda: sentinel.running, 10):
+        print("Sentinel did not start")
+    time.sleep(args.warmup)
+    print(f"Armed {len(armed)} markets, stand-ins in {workdir}")
+
+    noise = parse_sentinel_log(args.sentinel_log) if args.sentinel_log and os.path.exists(args.sentinel_log) else []
+    released = {}
+    for i, filing in enumerate(filings):
+        for title, href, updated, _ in noise[i * args.noise: (i + 1) * args.noise]:
+            edgar.add_feed_entry(title, href, updated)
+        edgar.release(filing)
+        released[filing.cik] = filing.released_at
+        print(f"Released {filing.form} of CIK {filing.cik} ({filing.accession_dashed})")
+        if args.interval and i < len(filings) - 1:
+            time.sleep(args.interval)
+
+    def finished():
+        if not os.path.exists(trace_path):
+            return False
+        with open(trace_path) as f:
+            return sum(1 for _ in f) >= len(filings)
+
+    if not wait_for(finished, args.timeout):
+        print(f"Timed out waiting for traces after {args.timeout}s")
+
+    sentinel.stop(5)
+    traces = tracing.load_traces(trace_path) if os.path.exists(trace_path) else []
+    report(traces, released)
+    print(f"\nSEC stand-in requests: {edgar.requests}, Gamma: {gamma.requests}, CLOB: {clob.requests}, Telegram messages: {len(telegram.messages)}")
+
+    for server in (edgar, gamma, clob, telegram, ws):
+        server.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay filings through the bot against local stand-ins and report detection-to-order latency.")
+    parser.add_argument("--cases", default=DEFAULT_CASES, help="Backtest case JSON file or .cases directory")
+    parser.add_argument("--limit", type=int, default=10, help="Filings to replay, one market per CIK")
+    parser.add_argument("--books", default=None, help="Folder with liquidity logs, books at sec_time_stamp are served")
+    parser.add_argument("--sentinel-log", default=DEFAULT_SENTINEL_LOG, help="Recorded feed entries for titles and background traffic")
+    parser.add_argument("--noise", type=int, default=0, help="Recorded feed entries added before each filing")
+    parser.add_argument("--interval", type=float, default=2.0, help="Seconds between filings, 0 releases them together")
+    parser.add_argument("--network-latency", type=float, default=0.02, help="Seconds added to every stand-in HTTP response")
+    parser.add_argument("--model-latency", type=float, default=2.0, help="Seconds the stand-in model takes to answer")
+    parser.add_argument("--upload-latency", type=float, default=0.1, help="Seconds per stand-in file upload")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Seconds between arming and the first filing")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Seconds to wait for every trace to finish")
+    parser.add_argument("--workdir", default=None, help="Working directory for logs and traces, default a temp dir")
+
+    args = parser.parse_args()
+    args.cases = os.path.abspath(args.cases)
+    if args.sentinel_log:
+        args.sentinel_log = os.path.abspath(args.sentinel_log)
+    logging.basicConfig(level=logging.WARNING, stream=sys.stderr)
+    run(args)
+    os._exit(0)  # the bot's pools and trackers run on non-daemon threads
@@ -0,0 +1,229 @@
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import zlib
+
+import numpy as np
+import zmq
+
+import metrics
+import polymarket_api
+from edgar_api import RequestScheduler, set_default_scheduler
+from edgar_api.scheduler import DEFAULT_RATE
+from market_registry import default_registry
+from tracing import Trace, default_tracer
+
+# Sharded mode: one process runs the EDGAR sentinel and publishes every new filing over a
+# ZeroMQ PUB socket, N worker processes each own the markets whose CIK hashes to their shard
+# and subscribe to that shard's topic only. Parsing, downloads and oracle calls of different
+# shards then run on different cores instead of sharing one GIL.
+# Every process has its own SEC request scheduler, so SEC's budget is split between them:
+# shard_rates() gives each an equal whole number of requests per second, the remainder going
+# to the sentinel, whose feed polling is the only SEC traffic that runs all the time.
+
+FILING_ENDPOINT = os.getenv("FILING_ENDPOINT", "ipc:///tmp/polymarket-filings")
+LATENCY_LOG_EVERY = 50  # events between fan-out latency summaries
+
+logger = logging.getLogger(__name__)
+
+
+def shard_for_cik(cik, n_shards: int) -> int:
+    """Stable across processes (hash() of a str is salted per process)."""
+    return zlib.crc32(str(int(cik)).encode()) % n_shards
+
+
+def shard_rates(n_workers: int, total: int = DEFAULT_RATE) -> tuple:
+    """(sentinel's, each worker's) SEC requests per second, together at most `total`."""
+    per_process = total // (n_workers + 1)
+    if per_process < 1:
+        raise ValueError(f"{n_workers} workers and the sentinel cannot share {total} SEC requests per second, use at most {total - 1} workers")
+    return total - n_workers * per_process, per_process
+
+
+def shard_topic(shard: int) -> bytes:
+    return f"shard-{shard:03d}".encode()
+
+
+class FilingPublisher:
+    """EdgarSentinel listener that publishes each new filing to the shard owning its CIK."""
+
+    def __init__(self, n_shards: int, endpoint: str = FILING_ENDPOINT):
+        self.n_shards = n_shards
+        self.context = zmq.Context.instance()
+        self.socket = self.context.socket(zmq.PUB)
+        self.socket.setsockopt(zmq.SNDHWM, 10000)
+        self.socket.bind(endpoint)
+
+    def publish(self, cik, base_url, entry, trace=None):
+        payload = {
+            "cik": str(cik),
+            "sec_url": base_url,
+            "entry": list(entry),
+            "published_at": time.time(),
+        }
+        if trace is not None:
+            trace.mark("published")
+            payload["trace"] = trace.as_dict()
+        self.socket.send_multipart([shard_topic(shard_for_cik(cik, self.n_shards)), json.dumps(payload).encode()])
+
+    def close(self):
+        self.socket.close(linger=0)
+
+
+class RemoteSentinel:
+    """
+    Worker-side stand-in for EdgarSentinel: EarningsMarkets register with set_alert() as usual,
+    alerts arrive from the publisher instead of the RSS feed. Fan-out latency (publish to
+    receive, both wall clock on the same host) is recorded for every event.
+    """
+
+    def __init__(self, shard: int, endpoint: str = FILING_ENDPOINT):
+        self.shard = shard
+        self.endpoint = endpoint
+        self.cik_alerts: dict = {}
+        self.latencies: list = []
+        self.thread: threading.Thread = None
+        self.running = False
+
+    def set_alert(self, cik: str, earnings_market):
+        self.cik_alerts[str(cik)] = earnings_market
+
+    def run(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._listen, name=f"shard-{self.shard}-sub", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+
+    def _listen(self):
+        socket = zmq.Context.instance().socket(zmq.SUB)
+        socket.setsockopt(zmq.SUBSCRIBE, shard_topic(self.shard))
+        socket.setsockopt(zmq.RCVTIMEO, 500)
+        socket.connect(self.endpoint)
+        while self.running:
+            try:
+                _, message = socket.recv_multipart()
+            except zmq.Again:
+                continue
+            received_at = time.time()
+            event = json.loads(message)
+            self.handle(event, received_at - event["published_at"])
+        socket.close(linger=0)
+
+    def handle(self, event, latency):
+        self.latencies.append(latency)
+        market = self.cik_alerts.get(event["cik"])
+        if market is not None:
+            logger.info(f"Shard {self.shard}: alert for {event['cik']} after {latency * 1000:.2f} ms fan-out")
+            trace = None
+            if "trace" in event:
+                trace = Trace.from_dict(event["trace"], default_tracer())
+                trace.mark("received", shard=self.shard)
+            market.set_sec_url(event["sec_url"])
+            market.trigger_alert(trace)
+        if len(self.latencies) % LATENCY_LOG_EVERY == 0:
+            logger.info(f"Shard {self.shard} fan-out latency {self.latency_summary()}")
+
+    def latency_summary(self) -> dict:
+        if not self.latencies:
+            return {}
+        values = np.array(self.latencies) * 1000
+        p50, p90, p99 = np.percentile(values, [50, 90, 99])
+        return {
+            "count": len(values),
+            "p50_ms": round(float(p50), 3),
+            "p90_ms": round(float(p90), 3),
+            "p99_ms": round(float(p99), 3),
+            "max_ms": round(float(values.max()), 3),
+        }
+
+
+def worker_main(shard: int, slugs: list, endpoint: str = FILING_ENDPOINT, sec_rate: int = DEFAULT_RATE):
+    """Arms this shard's markets in a fresh process and waits for filings, at most sec_rate SEC requests per second."""
+    set_default_scheduler(RequestScheduler(rate=sec_rate))  # before anything creates an EDGAR
+    from order import EarningsMarket  # module-level clients are created per process
+
+    logging.basicConfig(level=logging.INFO, format=f"%(asctime)s - shard {shard} - %(name)s - %(message)s")
+    sentinel = RemoteSentinel(shard, endpoint)
+    registry = default_registry()
+    registry.get_many(slugs)
+
+    markets = []
+    for slug in slugs:
+        try:
+            markets.append(EarningsMarket(slug, sentinel, registry=registry))
+        except Exception as e:
+            logger.warning(f"Shard {shard} could not arm {slug}: {e}")
+    sentinel.run()
+    logger.info(f"Shard {shard} armed {len(markets)} markets")
+    try:
+        metrics.serve(metrics.METRICS_PORT + 1 + shard)
+    except OSError as e:
+        logger.warning(f"Shard {shard} metrics endpoint not started: {e}")
+
+    while True:
+        time.sleep(60)
+
+
+def assign_shards(records, n_shards: int) -> list:
+    """[[slug, ...] per shard] by CIK hash, markets without a CIK are skipped."""
+    shards = [[] for _ in range(n_shards)]
+    for record in records:
+        if record.cik is None:
+            logger.warning(f"No CIK for {record.slug}, not armed")
+            continue
+        shards[shard_for_cik(record.cik, n_shards)].append(record.slug)
+    return shards
+
+
+def run_sharded(n_workers: int, slugs=None, days: int = 1, endpoint: str = FILING_ENDPOINT):
+    from edgar_sentinel import FEED_POLL_INTERVAL, EdgarSentinel
+
+    sentinel_rate, worker_rate = shard_rates(n_workers)
+    # triggers are handled by the workers, the sentinel's share is all feed polling
+    set_default_scheduler(RequestScheduler(rate=sentinel_rate, trigger_reserve=0))
+    registry = default_registry()
+    if slugs:
+        records = list(registry.get_many(slugs).values())
+    else:
+        records = registry.upcoming(days)
+    shards = assign_shards(records, n_workers)
+
+    publisher = FilingPublisher(n_workers, endpoint)
+    ctx = multiprocessing.get_context("spawn")
+    workers = [
+        ctx.Process(target=worker_main, args=(shard, shard_slugs, endpoint, worker_rate), name=f"shard-{shard}", daemon=True)
+        for shard, shard_slugs in enumerate(shards)
+    ]
+    for worker in workers:
+        worker.start()
+    print(f"Started {n_workers} workers: " + ", ".join(f"{len(s)} markets" for s in shards))
+    print(f"SEC requests per second: {sentinel_rate} for the sentinel, {worker_rate} per worker")
+
+    sentinel = EdgarSentinel(poll_interval=max(FEED_POLL_INTERVAL, 1.0 / sentinel_rate))
+    sentinel.add_listener(publisher.publish)
+    sentinel.run()
+    print("Sentinel is running...")
+    try:
+        metrics.serve()  # the workers serve on the following ports, one per shard
+    except OSError as e:
+        logger.warning(f"Metrics endpoint not started: {e}")
+    return sentinel, publisher, workers
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the sentinel with markets sharded across worker processes.")
+    parser.add_argument("markets", nargs="*", help="Market URLs or slugs, default: every open market releasing soon")
+    # each process needs at least one of SEC's requests per second
+    parser.add_argument("--workers", type=int, default=min(os.cpu_count() or 2, DEFAULT_RATE - 1))
+    parser.add_argument("--days", type=int, default=1, help="Arm markets releasing within this many days")
+    parser.add_argument("--endpoint", default=FILING_ENDPOINT, help="ZeroMQ endpoint between sentinel and workers")
+
+    args = parser.parse_args()
+    slugs = [polymarket_api.Utils.extract_slug_from_url(m) for m in args.markets]
+    run_sharded(args.workers, slugs or None, args.days, args.endpoint)
@@ -0,0 +1 @@
+# Local stand-ins for the external services, used to run the real code paths offline.
@@ -0,0 +1,136 @@
+import argparse
+import asyncio
+import json
+import threading
+from datetime import datetime
+
+from websockets.asyncio.server import serve
+
+# Stand-in for the CLOB market channel (wss://ws-subscriptions-clob.polymarket.com/ws/market).
+# Replays recorded events to every client that subscribes, filtered to its assets_ids.
+# Sources: JSONL recorded by MarketDataService(record_path=...) or polymarket_liquidity_<slug>.jsonl
+# snapshots, which are replayed as "book" events.
+
+
+def load_events(path):
+    """Returns [(offset_seconds, event_dict)] sorted by time, offsets relative to the first event."""
+    timed = []
+    with open(path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+            if "message" in record:  # MarketDataService recording
+                t = datetime.fromisoformat(record["received_at"]).timestamp()
+                try:
+                    events = json.loads(record["message"])
+                except json.JSONDecodeError:
+                    continue
+                for event in events if isinstance(events, list) else [events]:
+                    timed.append((t, event))
+            elif "bids" in record and "asks" in record:  # liquidity logger snapshot
+                t = int(record["timestamp"]) / 1000.0 if record.get("timestamp") else \
+                    datetime.fromisoformat(record["local_timestamp"]).timestamp()
+                timed.append((t, {
+                    "event_type": "book",
+                    "asset_id": record.get("asset_id") or record.get("token_id"),
+                    "market": record.get("market"),
+                    "bids": record["bids"],
+                    "asks": record["asks"],
+                    "timestamp": str(int(t * 1000)),
+                }))
+
+    timed.sort(key=lambda e: e[0])
+    if not timed:
+        return []
+    t0 = timed[0][0]
+    return [(t - t0, event) for t, event in timed]
+
+
+def filter_event(event, assets):
+    if event.get("event_type") == "price_change" and "price_changes" in event:
+        changes = [c for c in event["price_changes"] if c.get("asset_id") in assets]
+        return {**event, "price_changes": changes} if changes else None
+    return event if event.get("asset_id") in assets else None
+
+
+class ClobWsReplayServer:
+    """Replays events at speed x their recorded pace, speed=None sends them back to back."""
+
+    def __init__(self, events, host="127.0.0.1", port=0, speed: float | None = 1.0):
+        self.events = events
+        self.host = host
+        self.port = port
+        self.speed = speed
+        self.loop = None
+        self.thread = None
+        self._ready = threading.Event()
+        self._stop = None
+
+    @property
+    def url(self):
+        return f"ws://{self.host}:{self.port}/ws/market"
+
+    async def _handler(self, websocket):
+        assets = set()
+        sender = None
+        async for message in websocket:
+            try:
+                request = json.loads(message)
+            except json.JSONDecodeError:
+                continue  # PING and the like
+            assets.update(request.get("assets_ids", []))
+            if sender is None:
+                sender = asyncio.create_task(self._replay(websocket, assets))
+        if sender is not None:
+            sender.cancel()
+
+    async def _replay(self, websocket, assets):
+        start = self.loop.time()
+        for offset, event in self.events:
+            if self.speed:
+                delay = offset / self.speed - (self.loop.time() - start)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            event = filter_event(event, assets)
+            if event is not None:
+                await websocket.send(json.dumps([event]))
+
+    async def _main(self):
+        self._stop = asyncio.Event()
+        async with serve(self._handler, self.host, self.port) as server:
+            self.port = server.sockets[0].getsockname()[1]
+            self._ready.set()
+            await self._stop.wait()
+
+    def start(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_until_complete, args=(self._main(),), daemon=True)
+        self.thread.start()
+        self._ready.wait(5)
+        return self
+
+    def stop(self):
+        if self.loop is not None and self._stop is not None:
+            self.loop.call_soon_threadsafe(self._stop.set)
+            self.thread.join(5)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay recorded CLOB market channel events over a local WebSocket.")
+    parser.add_argument("file", help="MarketDataService recording or polymarket_liquidity_<slug>.jsonl")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed multiplier, 0 = no delays")
+
+    args = parser.parse_args()
+    server = ClobWsReplayServer(load_events(args.file), port=args.port, speed=args.speed or None).start()
+    print(f"Replaying {len(server.events)} events on {server.url}")
+    try:
+        server.thread.join()
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,130 @@
+import hashlib
+import html
+import json
+import re
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+
+from standins.http_server import StandinServer, json_response, not_found
+
+# Stand-in for www.sec.gov / data.sec.gov: the current-filings Atom feed (with ETag / 304),
+# company_tickers.json and the archives of every released filing (index.json, the HTML directory
+# listing and the documents). Filings appear in the feed when release() is called.
+
+FEED_SIZE = 40
+ARCHIVE_PATH = re.compile(r"^/Archives/edgar/data/(\d+)/(\d+)/?([^/]*)$")
+
+
+@dataclass
+class Filing:
+    cik: str
+    accession: str  # without dashes, 18 digits
+    form: str = "8-K"
+    company: str = ""
+    documents: dict = field(default_factory=dict)  # {file name: html}
+    updated: str = None  # feed <updated>, America/New_York ISO time
+    released_at: float = None  # wall clock of release()
+
+    @property
+    def accession_dashed(self) -> str:
+        a = self.accession
+        return f"{a[:10]}-{a[10:12]}-{a[12:]}"
+
+
+def parse_sentinel_log(path) -> list:
+    """[(title, href, updated, cik)] of every feed entry logged by EdgarSentinel, oldest first."""
+    entries = []
+    with open(path, "r", errors="ignore") as f:
+        for line in f:
+            start = line.find('["')
+            if start < 0:
+                continue
+            try:
+                data = json.loads(line[start:])
+            except json.JSONDecodeError:
+                continue
+            if isinstance(data, list) and len(data) >= 4:
+                entries.append(tuple(data[:4]))
+    return entries
+
+
+class EdgarStandin(StandinServer):
+    def __init__(self, companies: dict | None = None, **kwargs):
+        """companies: {cik: (ticker, name)} served as company_tickers.json."""
+        super().__init__(**kwargs)
+        self.companies = dict(companies or {})
+        self.filings: dict = {}  # {(cik, accession): Filing}
+        self.feed: list = []  # newest first, (title, href, updated)
+        self.lock = threading.Lock()
+
+    def release(self, filing: Filing) -> Filing:
+        now = datetime.now(timezone.utc)
+        filing.released_at = now.timestamp()
+        filing.updated = filing.updated or now.astimezone(ZoneInfo("America/New_York")).isoformat(timespec="seconds")
+        title = f"{filing.form} - {filing.company} ({int(filing.cik):010d}) (Filer)"
+        href = f"{self.url}/Archives/edgar/data/{filing.cik}/{filing.accession}/{filing.accession_dashed}-index.htm"
+        with self.lock:
+            self.filings[(filing.cik, filing.accession)] = filing
+            self.feed.insert(0, (title, href, filing.updated))
+            del self.feed[FEED_SIZE:]
+        return filing
+
+    def add_feed_entry(self, title, href, updated):
+        """A feed entry without archives, e.g. replayed from a sentinel log as background traffic."""
+        with self.lock:
+            self.feed.insert(0, (title, href, updated))
+            del self.feed[FEED_SIZE:]
+
+    def _feed(self, request):
+        with self.lock:
+            entries = list(self.feed)
+        body = "".join(
+            f'<entry><title>{html.escape(title)}</title><link rel="alternate" type="text/html" href="{href}"/>'
+            f"<summary>filing</summary><updated>{updated}</updated></entry>\n"
+            for title, href, updated in entries
+        )
+        body = f'<?xml version="1.0" encoding="ISO-8859-1" ?>\n<feed xmlns="http://www.w3.org/2005/Atom">\n{body}</feed>'.encode()
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        if request.headers.get("If-None-Match") == etag:
+            return 304, {"ETag": etag}, b""
+        return 200, {"Content-Type": "application/atom+xml", "ETag": etag}, body
+
+    def _tickers(self):
+        return json_response({
+            str(i): {"cik_str": int(cik), "ticker": ticker, "title": name}
+            for i, (cik, (ticker, name)) in enumerate(self.companies.items())
+        })
+
+    def _archive(self, cik, accession, name):
+        filing = self.filings.get((cik, accession))
+        if filing is None:
+            return not_found()
+        if name == "index.json":
+            items = [
+                {"last-modified": filing.updated, "name": doc, "type": "text.gif", "size": str(len(body.encode()))}
+                for doc, body in filing.documents.items()
+            ]
+            items.append({"last-modified": filing.updated, "name": f"{filing.accession_dashed}-index.htm", "type": "text.gif", "size": ""})
+            return json_response({"directory": {"item": items, "name": f"/Archives/edgar/data/{cik}/{accession}", "parent-dir": f"/Archives/edgar/data/{cik}"}})
+        if name == "" or name.endswith("-index.htm"):
+            links = "".join(
+                f'<tr><td><a href="/Archives/edgar/data/{cik}/{accession}/{doc}">{doc}</a></td></tr>'
+                for doc in filing.documents
+            )
+            body = f"<html><body><div>Directory Listing</div><table>{links}</table>\n</body></html>"
+            return 200, {"Content-Type": "text/html"}, body.encode()
+        if name in filing.documents:
+            return 200, {"Content-Type": "text/html"}, filing.documents[name].encode()
+        return not_found()
+
+    def handle(self, request):
+        if request.path == "/cgi-bin/browse-edgar":
+            return self._feed(request)
+        if request.path == "/files/company_tickers.json":
+            return self._tickers()
+        match = ARCHIVE_PATH.match(request.path)
+        if match:
+            return self._archive(*match.groups())
+        return not_found()
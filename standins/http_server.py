@@ -0,0 +1,94 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Base of the HTTP stand-ins: a threading server on 127.0.0.1 that answers every request through
+# handle(method, path, query, headers, body) -> (status, headers, body), after `latency` seconds
+# to stand in for the network round trip.
+
+
+class Request:
+    def __init__(self, method, path, query, headers, body):
+        self.method = method
+        self.path = path
+        self.query = query  # {name: [values]}
+        self.headers = headers
+        self.body = body
+
+    def param(self, name, default=None):
+        values = self.query.get(name)
+        return values[0] if values else default
+
+    def json(self):
+        return json.loads(self.body or b"null")
+
+
+def json_response(data, status: int = 200):
+    return status, {"Content-Type": "application/json"}, json.dumps(data).encode()
+
+
+def not_found():
+    return 404, {"Content-Type": "text/plain"}, b"not found"
+
+
+class StandinServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.requests = 0
+        self.server: ThreadingHTTPServer = None
+        self.thread: threading.Thread = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def handle(self, request: Request):
+        raise NotImplementedError
+
+    def _handler_class(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like the real APIs
+
+            def _serve(self):
+                parsed = urlparse(self.path)
+                length = int(self.headers.get("Content-Length") or 0)
+                request = Request(self.command, parsed.path, parse_qs(parsed.query), self.headers, self.rfile.read(length))
+                standin.requests += 1
+                if standin.latency:
+                    time.sleep(standin.latency)
+                try:
+                    status, headers, body = standin.handle(request)
+                except Exception as e:
+                    status, headers, body = 500, {"Content-Type": "text/plain"}, str(e).encode()
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_GET = do_POST = do_DELETE = _serve
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self.server = ThreadingHTTPServer((self.host, self.port), self._handler_class())
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, name=type(self).__name__, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
@@ -0,0 +1,52 @@
+import itertools
+import json
+import os
+import time
+from types import SimpleNamespace
+
+# Stand-in for genai.Client with the parts the oracles use: files.upload/delete and
+# models.generate_content(_stream). Answers are picked by finding a known market description in
+# the prompt; the latencies stand in for upload and inference time.
+
+
+class _Files:
+    def __init__(self, upload_latency):
+        self.upload_latency = upload_latency
+        self.counter = itertools.count()
+        self.uploaded = {}
+
+    def upload(self, file):
+        time.sleep(self.upload_latency)
+        name = f"files/{next(self.counter)}"
+        self.uploaded[name] = os.path.getsize(file)
+        return SimpleNamespace(name=name)
+
+    def delete(self, name):
+        self.uploaded.pop(name, None)
+
+
+class _Models:
+    def __init__(self, answers, latency, default):
+        self.answers = answers
+        self.latency = latency
+        self.default = default
+
+    def _answer(self, contents) -> str:
+        prompt = " ".join(c for c in contents if isinstance(c, str))
+        resolution = next((r for description, r in self.answers.items() if description and description in prompt), self.default)
+        return json.dumps({"resolution": resolution.lower(), "reasoning": "replay stand-in"})
+
+    def generate_content(self, model, contents):
+        time.sleep(self.latency)
+        return SimpleNamespace(text=self._answer(contents))
+
+    def generate_content_stream(self, model, contents):
+        time.sleep(self.latency)
+        yield SimpleNamespace(text=self._answer(contents))
+
+
+class FakeModelClient:
+    def __init__(self, answers: dict | None = None, latency: float = 2.0, upload_latency: float = 0.1, default: str = "not enough informations"):
+        """answers: {market description: "Yes" | "No"}"""
+        self.files = _Files(upload_latency)
+        self.models = _Models(answers or {}, latency, default)
@@ -0,0 +1,104 @@
+import json
+import threading
+import time
+
+from standins.http_server import StandinServer, json_response, not_found
+
+# Stand-ins for the Gamma markets API and the CLOB REST endpoints the bot reads (book, books,
+# price, prices, prices-history), plus Telegram's sendMessage. Data is whatever the harness
+# passes in, e.g. markets rebuilt from backtest cases and books from liquidity logs.
+
+
+def gamma_market(slug, description, token_ids: dict, end_date: str, closed: bool = False, outcome_prices=("0.5", "0.5")) -> dict:
+    """A /markets entry in Gamma's format (JSON-encoded list fields)."""
+    return {
+        "slug": slug,
+        "description": description,
+        "outcomes": json.dumps(list(token_ids)),
+        "outcomePrices": json.dumps(list(outcome_prices)),
+        "clobTokenIds": json.dumps(list(token_ids.values())),
+        "closed": closed,
+        "createdAt": "2025-01-01T00:00:00Z",
+        "endDate": end_date,
+    }
+
+
+def clob_book(token_id, bids, asks) -> dict:
+    """/book response; bids and asks as [(price, size)], sorted the way the CLOB sends them."""
+    return {
+        "market": "",
+        "asset_id": token_id,
+        "timestamp": str(int(time.time() * 1000)),
+        "hash": "",
+        "bids": [{"price": str(p), "size": str(s)} for p, s in sorted(bids)],
+        "asks": [{"price": str(p), "size": str(s)} for p, s in sorted(asks, reverse=True)],
+    }
+
+
+class GammaStandin(StandinServer):
+    def __init__(self, markets: list, **kwargs):
+        super().__init__(**kwargs)
+        self.markets = {m["slug"]: m for m in markets}
+
+    def handle(self, request):
+        if request.path.startswith("/markets/slug/"):
+            market = self.markets.get(request.path[len("/markets/slug/"):])
+            return json_response(market) if market else not_found()
+        if request.path == "/markets":
+            slugs = request.query.get("slug")
+            if slugs:
+                return json_response([self.markets[s] for s in slugs if s in self.markets])
+            closed = request.param("closed", "false") == "true"
+            markets = [m for m in self.markets.values() if m["closed"] == closed]
+            offset = int(request.param("offset", 0))
+            limit = int(request.param("limit", 500))
+            return json_response(markets[offset:offset + limit])
+        return not_found()
+
+
+class ClobRestStandin(StandinServer):
+    def __init__(self, books: dict, **kwargs):
+        """books: {token_id: clob_book(...)}"""
+        super().__init__(**kwargs)
+        self.books = dict(books)
+
+    def _best_ask(self, token_id):
+        book = self.books.get(token_id)
+        if not book or not book["asks"]:
+            return None
+        return min(float(level["price"]) for level in book["asks"])
+
+    def handle(self, request):
+        if request.path == "/book":
+            book = self.books.get(request.param("token_id"))
+            return json_response(book) if book else json_response({"error": "No orderbook exists"}, 404)
+        if request.path == "/books" and request.method == "POST":
+            return json_response([self.books[r["token_id"]] for r in request.json() if r["token_id"] in self.books])
+        if request.path == "/price":
+            price = self._best_ask(request.param("token_id"))
+            return json_response({"price": str(price)}) if price is not None else json_response({"error": "No orderbook exists"}, 404)
+        if request.path == "/prices" and request.method == "POST":
+            prices = {}
+            for r in request.json():
+                price = self._best_ask(r["token_id"])
+                if price is not None:
+                    prices[r["token_id"]] = {r.get("side", "SELL"): str(price)}
+            return json_response(prices)
+        if request.path == "/prices-history":
+            return json_response({"history": []})
+        return not_found()
+
+
+class TelegramStandin(StandinServer):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.messages = []
+        self.lock = threading.Lock()
+
+    def handle(self, request):
+        if request.path.endswith("/sendMessage"):
+            with self.lock:
+                self.messages.append((time.time(), request.json().get("text", "")))
+                message_id = len(self.messages)
+            return json_response({"ok": True, "result": {"message_id": message_id}})
+        return json_response({"ok": True, "result": True})
@@ -0,0 +1,208 @@
+import argparse
+import bisect
+import heapq
+import json
+import os
+from dataclasses import dataclass
+
+from order_book import ArrayOrderBook, levels_to_arrays
+from stats.book_store import BookStoreReader, snapshot_time, store_path_for_slug
+
+# Replays order book snapshots recorded by stats/liquidity_save.py (one per side every ~10 s)
+# and fills simulated orders against the ask ladder that was live at the order time.
+
+MAX_STALENESS = 30  # seconds; an older snapshot does not count as the live book
+
+
+@dataclass
+class FillResult:
+    requested: float
+    filled: float
+    vwap: float | None
+    best_ask: float | None
+    slippage: float | None  # vwap - best_ask
+    cost: float
+    book_time: float | None
+
+
+def fill_from_book(book: ArrayOrderBook, size, limit_price=None, book_time=None) -> FillResult:
+    """Buys up to size shares against the book's asks, never above limit_price."""
+    filled, cost, _ = book.cost_to_buy(size, limit_price)
+    best_ask = book.best_ask
+    vwap = cost / filled if filled > 0 else None
+    slippage = vwap - best_ask if vwap is not None else None
+    return FillResult(size, filled, vwap, best_ask, slippage, cost, book_time)
+
+
+class OrderBookStore:
+    """
+    Time-indexed order book snapshots, keyed by outcome label ("Yes"/"No"). Each snapshot is
+    kept as compact (level index, size) arrays and expanded into an ArrayOrderBook on demand.
+    """
+
+    def __init__(self):
+        self.times: dict[str, list[float]] = {}
+        self.books: dict[str, list[tuple]] = {}  # (bid_idx, bid_sizes, ask_idx, ask_sizes)
+
+    def add_snapshot(self, label, ts, bids, asks):
+        times = self.times.setdefault(label, [])
+        books = self.books.setdefault(label, [])
+        i = bisect.bisect_right(times, ts)
+        times.insert(i, ts)
+        books.insert(i, (*levels_to_arrays(bids), *levels_to_arrays(asks)))
+
+    def add_arrays(self, label, ts, bid_idx, bid_sizes, ask_idx, ask_sizes):
+        times = self.times.setdefault(label, [])
+        books = self.books.setdefault(label, [])
+        i = bisect.bisect_right(times, ts)
+        times.insert(i, ts)
+        books.insert(i, (bid_idx, bid_sizes, ask_idx, ask_sizes))
+
+    @classmethod
+    def load_jsonl(cls, path):
+        store = cls()
+        with open(path, "r") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    data = json.loads(line)
+                    store.add_snapshot(
+                        data["outcome_side"],
+                        snapshot_time(data),
+                        data.get("bids", []),
+                        data.get("asks", []),
+                    )
+                except (json.JSONDecodeError, KeyError, ValueError):
+                    continue
+        return store
+
+    @classmethod
+    def load_book_store(cls, path):
+        store = cls()
+        reader = BookStoreReader(path)
+        for label in reader.labels():
+            for ts, *arrays in reader.snapshots(label):
+                store.add_arrays(label, ts, *arrays)
+        return store
+
+    @classmethod
+    def load_for_slug(cls, directory, slug):
+        """Loads the slug's .books store if there is one, else its JSONL log."""
+        store_path = store_path_for_slug(directory, slug)
+        if os.path.isdir(store_path):
+            return cls.load_book_store(store_path)
+        path = os.path.join(directory, f"polymarket_liquidity_{slug}.jsonl")
+        if not os.path.exists(path):
+            return None
+        return cls.load_jsonl(path)
+
+    def book_at(self, label, t, max_staleness=None):
+        """
+        Returns (snapshot_time, ArrayOrderBook) of the last snapshot at or before t, or None,
+        also when that snapshot is more than max_staleness seconds old.
+        """
+        times = self.times.get(label)
+        if not times:
+            return None
+        i = bisect.bisect_right(times, t) - 1
+        if i < 0 or (max_staleness is not None and t - times[i] > max_staleness):
+            return None
+        return times[i], ArrayOrderBook.from_arrays(*self.books[label][i])
+
+    def simulate_buy(self, label, t, size, limit_price=None, max_staleness=None) -> FillResult:
+        snapshot = self.book_at(label, t, max_staleness)
+        if snapshot is None:
+            return FillResult(size, 0.0, None, None, None, 0.0, None)
+        book_time, book = snapshot
+        return fill_from_book(book, size, limit_price, book_time)
+
+    def events(self, start=None):
+        """
+        Yields (time, label, level arrays) snapshot events in time order across all labels,
+        from the last snapshot at or before start of each label on.
+        """
+        streams = []
+        for label, times in self.times.items():
+            first = max(0, bisect.bisect_right(times, start) - 1) if start is not None else 0
+            streams.append([(times[i], label, self.books[label][i]) for i in range(first, len(times))])
+        yield from heapq.merge(*streams, key=lambda e: e[0])
+
+
+@dataclass
+class SimulatedOrder:
+    time: float
+    label: str
+    size: float
+    limit_price: float | None = None
+
+
+class ReplayEngine:
+    """
+    Event-driven replay: snapshot events reset the live book of their side, order events fill
+    against it and consume depth, so orders landing between two snapshots see each other.
+    An order whose side has no snapshot within max_staleness seconds gets an empty FillResult
+    with book_time None, an order that met a live book without asks one with filled 0.
+    """
+
+    def __init__(self, store: OrderBookStore, max_staleness: float | None = MAX_STALENESS):
+        self.store = store
+        self.max_staleness = max_staleness
+
+    def run(self, orders: list[SimulatedOrder]) -> list[FillResult]:
+        pending = sorted(range(len(orders)), key=lambda i: orders[i].time)
+        results: list[FillResult | None] = [None] * len(orders)
+        live: dict[str, tuple[float, ArrayOrderBook]] = {}
+        if not pending:
+            return results
+
+        k = 0
+        for t, label, arrays in self.store.events(start=orders[pending[0]].time):
+            while k < len(pending) and orders[pending[k]].time < t:
+                i = pending[k]
+                results[i] = self._fill(live, orders[i], self.max_staleness)
+                k += 1
+            book = live[label][1] if label in live else ArrayOrderBook()
+            book.set_arrays(*arrays)
+            live[label] = (t, book)
+
+        while k < len(pending):
+            i = pending[k]
+            results[i] = self._fill(live, orders[i], self.max_staleness)
+            k += 1
+
+        return results
+
+    @staticmethod
+    def _fill(live, order: SimulatedOrder, max_staleness=None) -> FillResult:
+        if order.label not in live:
+            return FillResult(order.size, 0.0, None, None, None, 0.0, None)
+        book_time, book = live[order.label]
+        if max_staleness is not None and order.time - book_time > max_staleness:
+            return FillResult(order.size, 0.0, None, None, None, 0.0, None)
+        fill = fill_from_book(book, order.size, order.limit_price, book_time)
+
+        # consume the depth we took
+        remaining = fill.filled
+        while remaining > 1e-12 and book.best_ask is not None:
+            level_size = book.ask_sizes[book.best_ask_idx]
+            take = min(level_size, remaining)
+            book.apply_delta("SELL", book.best_ask, level_size - take)
+            remaining -= take
+        return fill
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Simulate a market buy against recorded Polymarket order books."
+    )
+    parser.add_argument("file", help="polymarket_liquidity_<slug>.jsonl file")
+    parser.add_argument("--side", default="Yes", help="Outcome label to buy (Yes/No)")
+    parser.add_argument("--time", type=float, required=True, help="Order time (unix seconds)")
+    parser.add_argument("--size", type=float, default=10.0, help="Shares to buy")
+    parser.add_argument("--limit", type=float, default=None, help="Worst acceptable price")
+
+    args = parser.parse_args()
+    store = OrderBookStore.load_jsonl(args.file)
+    print(store.simulate_buy(args.side, args.time, args.size, args.limit))
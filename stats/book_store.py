@@ -0,0 +1,321 @@
+import argparse
+import atexit
+import json
+import os
+import struct
+import time
+import weakref
+import zlib
+from datetime import datetime
+
+import numpy as np
+
+from order_book import N_LEVELS, ArrayOrderBook, levels_to_arrays
+
+# Compact order book log, an opt-in alternative to polymarket_liquidity_<slug>.jsonl.
+# A store is a directory with one stream per outcome label:
+#   <label>.bin  zlib-compressed segments of encoded snapshots
+#   <label>.idx  one INDEX_DTYPE entry per segment (first/last timestamp, byte offset, length)
+# Every segment starts with a keyframe (the full book) and repeats one every keyframe_interval
+# snapshots; the snapshots in between only hold the levels that changed (size 0 = removed).
+# Timestamps strictly increase within a stream (the reader relies on it); a segment is written
+# once it is full or max_segment_age seconds old, so a kill loses at most that much.
+
+INDEX_DTYPE = np.dtype([("first_ts", "<f8"), ("last_ts", "<f8"), ("offset", "<i8"), ("length", "<i8"), ("count", "<i8")])
+HEADER = struct.Struct("<dBHH")  # ts, kind, bid levels, ask levels
+KEYFRAME, DELTA = 0, 1
+
+DEFAULT_KEYFRAME_INTERVAL = 60  # 10 minutes of 10 s snapshots
+DEFAULT_SEGMENT_SNAPSHOTS = 360  # 1 hour
+DEFAULT_MAX_SEGMENT_AGE = 300.0  # seconds an open segment is kept in memory
+
+# every open writer, flushed once at exit without keeping closed ones alive
+_open_writers: "weakref.WeakSet[BookStoreWriter]" = weakref.WeakSet()
+
+
+def _close_open_writers():
+    for writer in list(_open_writers):
+        writer.close()
+
+
+atexit.register(_close_open_writers)
+
+
+def snapshot_time(record) -> float:
+    """Exchange timestamp of a /book snapshot in unix seconds, falls back to local_timestamp."""
+    ts = record.get("timestamp")
+    if ts:
+        return int(ts) / 1000.0
+    return datetime.fromisoformat(record["local_timestamp"]).timestamp()
+
+
+def store_path_for_slug(directory, slug) -> str:
+    return os.path.join(directory, f"polymarket_liquidity_{slug}.books")
+
+
+def _encode(ts, kind, bid_idx, bid_sizes, ask_idx, ask_sizes) -> bytes:
+    return b"".join((
+        HEADER.pack(ts, kind, len(bid_idx), len(ask_idx)),
+        np.asarray(bid_idx, dtype="<u2").tobytes(),
+        np.asarray(bid_sizes, dtype="<f8").tobytes(),
+        np.asarray(ask_idx, dtype="<u2").tobytes(),
+        np.asarray(ask_sizes, dtype="<f8").tobytes(),
+    ))
+
+
+def _decode(buf: bytes):
+    """Yields (ts, kind, bid_idx, bid_sizes, ask_idx, ask_sizes) for every snapshot in a segment."""
+    pos = 0
+    while pos < len(buf):
+        ts, kind, n_bid, n_ask = HEADER.unpack_from(buf, pos)
+        pos += HEADER.size
+        bid_idx = np.frombuffer(buf, "<u2", n_bid, pos)
+        pos += 2 * n_bid
+        bid_sizes = np.frombuffer(buf, "<f8", n_bid, pos)
+        pos += 8 * n_bid
+        ask_idx = np.frombuffer(buf, "<u2", n_ask, pos)
+        pos += 2 * n_ask
+        ask_sizes = np.frombuffer(buf, "<f8", n_ask, pos)
+        pos += 8 * n_ask
+        yield ts, kind, bid_idx, bid_sizes, ask_idx, ask_sizes
+
+
+class _Stream:
+    """Writer state of one label."""
+
+    def __init__(self):
+        self.bids = np.zeros(N_LEVELS)
+        self.asks = np.zeros(N_LEVELS)
+        self.buffer = bytearray()
+        self.count = 0  # snapshots in the open segment
+        self.first_ts = None
+        self.last_ts = None  # of the stream, kept across segments
+        self.opened_at = None  # monotonic time of the open segment's first snapshot
+
+
+class BookStoreWriter:
+    """
+    Appends snapshots per label; a segment is compressed and written once it is full, older than
+    max_segment_age or on flush(). Snapshots not newer than the label's last one are dropped.
+    """
+
+    def __init__(
+        self,
+        path,
+        keyframe_interval: int = DEFAULT_KEYFRAME_INTERVAL,
+        segment_snapshots: int = DEFAULT_SEGMENT_SNAPSHOTS,
+        max_segment_age: float | None = DEFAULT_MAX_SEGMENT_AGE,
+    ):
+        self.path = path
+        self.keyframe_interval = keyframe_interval
+        self.segment_snapshots = segment_snapshots
+        self.max_segment_age = max_segment_age
+        self.streams: dict = {}
+        self.rejected = 0  # snapshots dropped for a non-increasing timestamp
+        os.makedirs(path, exist_ok=True)
+        _open_writers.add(self)
+
+    def add(self, label, ts, bids, asks):
+        """bids/asks as CLOB string-priced levels."""
+        bid_idx, bid_sizes = levels_to_arrays(bids)
+        ask_idx, ask_sizes = levels_to_arrays(asks)
+        new_bids = np.zeros(N_LEVELS)
+        new_asks = np.zeros(N_LEVELS)
+        new_bids[bid_idx] = bid_sizes
+        new_asks[ask_idx] = ask_sizes
+        self.add_arrays(label, ts, new_bids, new_asks)
+
+    def add_arrays(self, label, ts, bids: np.ndarray, asks: np.ndarray):
+        """bids/asks as dense N_LEVELS size arrays (ArrayOrderBook.bid_sizes/ask_sizes)."""
+        stream = self.streams.setdefault(label, _Stream())
+        if stream.last_ts is not None and ts <= stream.last_ts:
+            self.rejected += 1
+            return
+
+        if stream.count % self.keyframe_interval == 0:
+            b, a = np.flatnonzero(bids), np.flatnonzero(asks)
+            record = _encode(ts, KEYFRAME, b, bids[b], a, asks[a])
+        else:
+            b, a = np.flatnonzero(bids != stream.bids), np.flatnonzero(asks != stream.asks)
+            record = _encode(ts, DELTA, b, bids[b], a, asks[a])
+
+        stream.bids = bids.copy()
+        stream.asks = asks.copy()
+        stream.buffer += record
+        stream.count += 1
+        if stream.first_ts is None:
+            stream.first_ts = ts
+            stream.opened_at = time.monotonic()
+        stream.last_ts = ts
+
+        too_old = self.max_segment_age is not None and time.monotonic() - stream.opened_at >= self.max_segment_age
+        if stream.count >= self.segment_snapshots or too_old:
+            self._write_segment(label, stream)
+
+    def _write_segment(self, label, stream: _Stream):
+        if stream.count == 0:
+            return
+        blob = zlib.compress(bytes(stream.buffer), 6)
+        with open(os.path.join(self.path, f"{label}.bin"), "ab") as f:
+            offset = f.tell()
+            f.write(blob)
+        entry = np.array([(stream.first_ts, stream.last_ts, offset, len(blob), stream.count)], dtype=INDEX_DTYPE)
+        with open(os.path.join(self.path, f"{label}.idx"), "ab") as f:
+            f.write(entry.tobytes())
+
+        # the next segment starts with a keyframe, so segments decode on their own
+        stream.buffer = bytearray()
+        stream.count = 0
+        stream.first_ts = None
+
+    def flush(self):
+        for label, stream in self.streams.items():
+            self._write_segment(label, stream)
+
+    def close(self):
+        self.flush()
+        _open_writers.discard(self)
+
+    def __del__(self):
+        # a writer dropped without close() still writes its open segments
+        if any(stream.count for stream in self.streams.values()):
+            self.flush()
+
+
+class BookStoreReader:
+    """Rebuilds the book of a label at any time from the segment index, keyframes and deltas."""
+
+    def __init__(self, path):
+        self.path = path
+        self._segment_cache = (None, None, None)  # (label, segment number, decoded snapshots)
+
+    def labels(self) -> list:
+        return sorted(name[:-4] for name in os.listdir(self.path) if name.endswith(".idx"))
+
+    def index(self, label) -> np.ndarray:
+        return np.fromfile(os.path.join(self.path, f"{label}.idx"), dtype=INDEX_DTYPE)
+
+    def _segment(self, label, i, entry):
+        cached_label, cached_i, snapshots = self._segment_cache
+        if cached_label == label and cached_i == i:
+            return snapshots
+        with open(os.path.join(self.path, f"{label}.bin"), "rb") as f:
+            f.seek(int(entry["offset"]))
+            buf = zlib.decompress(f.read(int(entry["length"])))
+        snapshots = list(_decode(buf))
+        self._segment_cache = (label, i, snapshots)
+        return snapshots
+
+    def book_at(self, label, t):
+        """(snapshot_time, ArrayOrderBook) of the last snapshot at or before t, or None."""
+        index = self.index(label)
+        i = int(np.searchsorted(index["first_ts"], t, side="right")) - 1
+        if i < 0:
+            return None
+
+        book = ArrayOrderBook()
+        book_time = None
+        for ts, kind, bid_idx, bid_sizes, ask_idx, ask_sizes in self._segment(label, i, index[i]):
+            if ts > t:
+                break
+            if kind == KEYFRAME:
+                book.bid_sizes[:] = 0.0
+                book.ask_sizes[:] = 0.0
+            book.bid_sizes[bid_idx] = bid_sizes
+            book.ask_sizes[ask_idx] = ask_sizes
+            book_time = ts
+        book._recompute()
+        return book_time, book
+
+    def snapshots(self, label):
+        """Yields (ts, bid_idx, bid_sizes, ask_idx, ask_sizes) of every snapshot, the full book each time."""
+        bids = np.zeros(N_LEVELS)
+        asks = np.zeros(N_LEVELS)
+        for i, entry in enumerate(self.index(label)):
+            for ts, kind, bid_idx, bid_sizes, ask_idx, ask_sizes in self._segment(label, i, entry):
+                if kind == KEYFRAME:
+                    bids[:] = 0.0
+                    asks[:] = 0.0
+                bids[bid_idx] = bid_sizes
+                asks[ask_idx] = ask_sizes
+                b, a = np.flatnonzero(bids), np.flatnonzero(asks)
+                yield ts, b, bids[b], a, asks[a]
+
+
+def convert_jsonl(jsonl_path, store_path, keyframe_interval=DEFAULT_KEYFRAME_INTERVAL, segment_snapshots=DEFAULT_SEGMENT_SNAPSHOTS) -> int:
+    """Converts a polymarket_liquidity_<slug>.jsonl log into a new book store, returns the snapshot count."""
+    if os.path.isdir(store_path) and os.listdir(store_path):
+        raise FileExistsError(f"{store_path} already holds a book store")
+    rows = []
+    with open(jsonl_path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                data = json.loads(line)
+                rows.append((data["outcome_side"], snapshot_time(data), data.get("bids", []), data.get("asks", [])))
+            except (json.JSONDecodeError, KeyError, ValueError):
+                continue
+
+    # segments are cut by count only, a conversion has no wall-clock age to bound
+    writer = BookStoreWriter(store_path, keyframe_interval, segment_snapshots, max_segment_age=None)
+    for label, ts, bids, asks in sorted(rows, key=lambda r: r[1]):
+        writer.add(label, ts, bids, asks)
+    writer.close()
+    return len(rows) - writer.rejected
+
+
+def dir_size(path) -> int:
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+def benchmark(jsonl_path, store_path, queries=200, seed=0):
+    """Disk size and time of random book_at lookups, JSONL (load + query) vs the book store."""
+    from stats.book_replay import OrderBookStore
+
+    n = convert_jsonl(jsonl_path, store_path)
+
+    t0 = time.perf_counter()
+    jsonl_store = OrderBookStore.load_jsonl(jsonl_path)
+    jsonl_load = time.perf_counter() - t0
+
+    rng = np.random.default_rng(seed)
+    labels = list(jsonl_store.times)
+    lookups = []
+    for _ in range(queries):
+        label = labels[rng.integers(len(labels))]
+        times = jsonl_store.times[label]
+        lookups.append((label, rng.uniform(times[0], times[-1])))
+
+    t0 = time.perf_counter()
+    for label, t in lookups:
+        jsonl_store.book_at(label, t)
+    jsonl_query = time.perf_counter() - t0
+
+    reader = BookStoreReader(store_path)
+    t0 = time.perf_counter()
+    for label, t in lookups:
+        reader.book_at(label, t)
+    store_query = time.perf_counter() - t0
+
+    jsonl_size = os.path.getsize(jsonl_path)
+    store_size = dir_size(store_path)
+    print(f"Snapshots: {n}")
+    print(f"Disk: JSONL {jsonl_size / 1e6:.2f} MB, book store {store_size / 1e6:.2f} MB ({jsonl_size / max(store_size, 1):.1f}x smaller)")
+    print(f"JSONL: load {jsonl_load:.3f}s + {queries} lookups {jsonl_query:.3f}s")
+    print(f"Book store: {queries} lookups {store_query:.3f}s (no load step)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert or benchmark delta-compressed order book stores.")
+    parser.add_argument("jsonl", help="polymarket_liquidity_<slug>.jsonl file")
+    parser.add_argument("store", help="Output .books directory")
+    parser.add_argument("--bench", action="store_true", help="Compare disk use and lookup time against the JSONL")
+    parser.add_argument("--queries", type=int, default=200)
+
+    args = parser.parse_args()
+    if args.bench:
+        benchmark(args.jsonl, args.store, args.queries)
+    else:
+        print(f"Converted {convert_jsonl(args.jsonl, args.store)} snapshots into {args.store}")
@@ -0,0 +1,216 @@
+import argparse
+import csv
+import json
+import os
+import warnings
+
+import numpy as np
+
+from case_store import CaseStore, is_case_store
+from order_book import N_LEVELS, PRICES
+from stats.book_replay import MAX_STALENESS, OrderBookStore
+
+# Order book behaviour around the SEC release of each backtest case: the recorded books of the
+# winning outcome are sampled on a grid of offsets from sec_time_stamp, and per-market curves
+# (spread, cumulative ask depth at every price level) are aggregated into percentile curves.
+
+WINDOW_BEFORE = 300  # seconds
+WINDOW_AFTER = 600
+GRID_STEP = 10  # the liquidity logger's snapshot cadence
+REPRICE_PRICE = 0.95  # winning outcome counts as repriced once its best ask reaches this
+# cumulative ask USDC at every cent, the CLOB's usual tick; levels of finer-tick markets are
+# included in the next cent's total
+DEPTH_PRICES = np.round(np.arange(0.01, 1.0, 0.01), 2)
+REPORT_PRICES = (0.5, 0.8, 0.9, 0.95, 0.99)  # depth columns of the printed table
+PERCENTILES = (10, 50, 90)
+
+
+def load_cases(path) -> list:
+    if is_case_store(path):
+        return list(CaseStore(path).rows())
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def book_matrix(store: OrderBookStore, label, times: np.ndarray, max_staleness=MAX_STALENESS):
+    """
+    (bids, asks) as (len(times), N_LEVELS) size matrices of the last snapshot at or before each
+    time, rows without a snapshot in the last max_staleness seconds are NaN.
+    """
+    bids = np.full((len(times), N_LEVELS), np.nan)
+    asks = np.full((len(times), N_LEVELS), np.nan)
+    snapshot_times = np.asarray(store.times.get(label, []))
+    if len(snapshot_times) == 0:
+        return bids, asks
+
+    idx = np.searchsorted(snapshot_times, times, side="right") - 1
+    ok = idx >= 0
+    ok[ok] = times[ok] - snapshot_times[idx[ok]] <= max_staleness
+
+    for row in np.flatnonzero(ok):
+        bid_idx, bid_sizes, ask_idx, ask_sizes = store.books[label][idx[row]]
+        bids[row] = 0.0
+        asks[row] = 0.0
+        bids[row, bid_idx] = bid_sizes
+        asks[row, ask_idx] = ask_sizes
+    return bids, asks
+
+
+def best_prices(bids: np.ndarray, asks: np.ndarray):
+    """Best bid/ask per row of the size matrices, NaN for missing rows or empty sides."""
+    has_bid = np.nan_to_num(bids) > 0
+    has_ask = np.nan_to_num(asks) > 0
+    best_bid = np.where(has_bid.any(axis=1), PRICES[N_LEVELS - 1 - np.argmax(has_bid[:, ::-1], axis=1)], np.nan)
+    best_ask = np.where(has_ask.any(axis=1), PRICES[np.argmax(has_ask, axis=1)], np.nan)
+    return best_bid, best_ask
+
+
+def market_profile(store: OrderBookStore, label, sec_time_stamp, offsets, reprice_price=REPRICE_PRICE):
+    """Curves and event stats of one market's winning outcome around its release."""
+    bids, asks = book_matrix(store, label, sec_time_stamp + offsets)
+    best_bid, best_ask = best_prices(bids, asks)
+
+    # USDC offered at or below each depth price, per grid point
+    ask_usdc = np.cumsum(np.nan_to_num(asks) * PRICES, axis=1)
+    depth_cols = [min(N_LEVELS - 1, int(round(p * 1000))) for p in DEPTH_PRICES]
+    depth = np.where(np.isnan(asks[:, :1]), np.nan, ask_usdc[:, depth_cols])
+
+    after = offsets >= 0
+    at_release = np.flatnonzero(after & ~np.isnan(asks[:, 0]))
+    capacity_cost = capacity_profit = np.nan
+    if len(at_release):
+        # everything offered below the reprice price in the first book after the filing
+        row = at_release[0]
+        cheap = PRICES < reprice_price
+        capacity_cost = float(asks[row, cheap] @ PRICES[cheap])
+        capacity_profit = float(asks[row, cheap] @ (1.0 - PRICES[cheap]))
+
+    # a book present with no asks left was swept, which counts as repriced
+    swept = ~np.isnan(asks[:, 0]) & np.isnan(best_ask)
+    with np.errstate(invalid="ignore"):
+        repriced = np.flatnonzero(after & ((best_ask >= reprice_price) | swept))
+    # a book that reprices before the first post-filing snapshot shows up as 0
+    seconds_to_reprice = float(offsets[repriced[0]]) if len(repriced) else np.nan
+
+    return {
+        "spread": best_ask - best_bid,
+        "best_ask": best_ask,
+        "depth": depth,
+        "seconds_to_reprice": seconds_to_reprice,
+        "capacity_cost": capacity_cost,
+        "capacity_profit": capacity_profit,
+    }
+
+
+def percentile_curve(matrix: np.ndarray):
+    """(len(PERCENTILES), *matrix.shape[1:]) percentiles across markets, ignoring missing grid points."""
+    with np.errstate(all="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN columns, e.g. after a sweep
+        if matrix.size == 0:
+            return np.full((len(PERCENTILES),) + matrix.shape[1:], np.nan)
+        return np.nanpercentile(matrix, PERCENTILES, axis=0)
+
+
+def analyze(cases, books_dir, reprice_price=REPRICE_PRICE, before=WINDOW_BEFORE, after=WINDOW_AFTER, step=GRID_STEP):
+    offsets = np.arange(-before, after + step, step, dtype=np.float64)
+    profiles = []
+    for case in cases:
+        slug, sec_time_stamp = case.get("slug"), case.get("sec_time_stamp")
+        if not slug or sec_time_stamp is None or case.get("target") not in ("Yes", "No"):
+            continue
+        store = OrderBookStore.load_for_slug(books_dir, slug)
+        if store is None:
+            continue
+        profile = market_profile(store, case["target"], float(sec_time_stamp), offsets, reprice_price)
+        if np.all(np.isnan(profile["spread"])):
+            continue  # no books recorded around the release
+        profile["slug"] = slug
+        profiles.append(profile)
+    return offsets, profiles
+
+
+def summarize(offsets, profiles):
+    spreads = np.array([p["spread"] for p in profiles]).reshape(len(profiles), len(offsets))
+    asks = np.array([p["best_ask"] for p in profiles]).reshape(len(profiles), len(offsets))
+    depth = np.array([p["depth"] for p in profiles]).reshape(len(profiles), len(offsets), len(DEPTH_PRICES))
+    return {
+        "spread": percentile_curve(spreads),
+        "best_ask": percentile_curve(asks),
+        "depth": percentile_curve(depth),  # (percentile, offset, depth price)
+    }
+
+
+def print_report(offsets, profiles, reprice_price=REPRICE_PRICE):
+    if not profiles:
+        print("No markets with recorded books around their release.")
+        return
+
+    def pct(values):
+        values = np.array(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return "n/a"
+        p = np.percentile(values, PERCENTILES)
+        return " / ".join(f"{v:.1f}" for v in p) + f" (n={len(values)})"
+
+    print(f"Markets: {len(profiles)}")
+    print(f"Seconds until best ask >= {reprice_price} (p{'/p'.join(map(str, PERCENTILES))}): {pct([p['seconds_to_reprice'] for p in profiles])}")
+    print(f"Capacity cost USDC below {reprice_price}:  {pct([p['capacity_cost'] for p in profiles])}")
+    print(f"Capacity profit USDC:              {pct([p['capacity_profit'] for p in profiles])}")
+
+    curves = summarize(offsets, profiles)
+    report_cols = [int(np.argmin(np.abs(DEPTH_PRICES - p))) for p in REPORT_PRICES]
+    print(f"\n{'OFFSET':>7} | {'SPREAD p50':>10} | {'ASK p50':>7} | " + " | ".join(f"$<={p:<5} p50" for p in REPORT_PRICES))
+    for i in range(0, len(offsets), max(1, len(offsets) // 16)):
+        depth = " | ".join(f"{curves['depth'][1][i][k]:>11.0f}" for k in report_cols)
+        print(f"{offsets[i]:>+7.0f} | {curves['spread'][1][i]:>10.3f} | {curves['best_ask'][1][i]:>7.3f} | {depth}")
+
+
+def write_curves_csv(offsets, profiles, path):
+    curves = summarize(offsets, profiles)
+    fields = ["offset_sec"]
+    for name in ("spread", "best_ask"):
+        fields += [f"{name}_p{p}" for p in PERCENTILES]
+    for price in DEPTH_PRICES:
+        fields += [f"ask_usdc_le_{price:.2f}_p{p}" for p in PERCENTILES]
+
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(fields)
+        for i, offset in enumerate(offsets):
+            row = [offset]
+            for name in ("spread", "best_ask"):
+                row += [curves[name][j][i] for j in range(len(PERCENTILES))]
+            for k in range(len(DEPTH_PRICES)):
+                row += [curves["depth"][j][i][k] for j in range(len(PERCENTILES))]
+            writer.writerow([None if isinstance(v, float) and np.isnan(v) else round(float(v), 6) for v in row])
+
+
+def write_markets_csv(profiles, path):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["slug", "seconds_to_reprice", "capacity_cost", "capacity_profit"])
+        for p in profiles:
+            writer.writerow([p["slug"]] + [None if np.isnan(p[k]) else round(p[k], 4) for k in ("seconds_to_reprice", "capacity_cost", "capacity_profit")])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Order book behaviour around SEC release times.")
+    parser.add_argument("cases", help="Backtest case JSON file or .cases directory")
+    parser.add_argument("books", help="Folder with polymarket_liquidity_<slug>.jsonl logs or .books stores")
+    parser.add_argument("--reprice-price", type=float, default=REPRICE_PRICE)
+    parser.add_argument("--before", type=int, default=WINDOW_BEFORE, help="Seconds before release")
+    parser.add_argument("--after", type=int, default=WINDOW_AFTER, help="Seconds after release")
+    parser.add_argument("--step", type=int, default=GRID_STEP, help="Grid step in seconds")
+    parser.add_argument("--curves", default=None, help="Write percentile curves to this CSV")
+    parser.add_argument("--markets", default=None, help="Write per-market stats to this CSV")
+
+    args = parser.parse_args()
+    offsets, profiles = analyze(
+        load_cases(args.cases), args.books, args.reprice_price, args.before, args.after, args.step
+    )
+    print_report(offsets, profiles, args.reprice_price)
+    if args.curves and profiles:
+        write_curves_csv(offsets, profiles, args.curves)
+    if args.markets:
+        write_markets_csv(profiles, args.markets)
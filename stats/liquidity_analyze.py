@@ -1,10 +1,23 @@
 import argparse
+import csv
+import itertools
 import json
 import os
-from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timezone
+
+import numpy as np
+
+from order_book import ArrayOrderBook
+from stats.book_store import snapshot_time
 
 # --- CONFIGURATION ---
 DEFAULT_INPUT_FILE = "polymarket_liquidity.jsonl"
+DEFAULT_OUTPUT_FILE = "liquidity_aggregates.csv"
+CHUNK_LINES = 5000
+
+SIDE_CODES = {"YES": 0, "NO": 1}
+SIDE_NAMES = {0: "Yes", 1: "No"}
 
 
 def parse_order_book(bids, asks):
@@ -12,29 +25,24 @@ def parse_order_book(bids, asks):
     Parses raw bid/ask lists into usable float data and calculates stats.
     Returns: best_bid, best_ask, bid_shares, ask_shares, bid_usdc, ask_usdc
     """
-    parsed_bids = [(float(x["price"]), float(x["size"])) for x in bids]
-    parsed_asks = [(float(x["price"]), float(x["size"])) for x in asks]
+    book = ArrayOrderBook.from_levels(bids, asks)
 
-    # 1. Best Price
-    best_bid = max([b[0] for b in parsed_bids]) if parsed_bids else 0.0
-    best_ask = min([a[0] for a in parsed_asks]) if parsed_asks else 0.0
-
-    # 2. Share Volume
-    bid_shares = sum([b[1] for b in parsed_bids])
-    ask_shares = sum([a[1] for a in parsed_asks])
-
-    # 3. USDC Liquidity (Price * Size)
-    bid_usdc = sum([b[0] * b[1] for b in parsed_bids])
-    ask_usdc = sum([a[0] * a[1] for a in parsed_asks])
+    best_bid = book.best_bid if book.best_bid is not None else 0.0
+    best_ask = book.best_ask if book.best_ask is not None else 0.0
+    bid_shares, ask_shares = book.bid_shares, book.ask_shares
+    bid_usdc, ask_usdc = book.bid_usdc, book.ask_usdc
 
     return best_bid, best_ask, bid_shares, ask_shares, bid_usdc, ask_usdc
 
 
 def print_table(title, records):
-    """Helper function to print a formatted table for a list of records."""
-    if not records:
+    """Helper function to print a formatted table for a list or stream of records."""
+    records = iter(records)
+    first = next(records, None)
+    if first is None:
         print(f"\n--- {title} (No Data Found) ---")
         return
+    records = itertools.chain([first], records)
 
     print(f"\n{'=' * 25} {title} {'=' * 25}")
     header = (
@@ -81,45 +89,200 @@ def print_table(title, records):
     print(f"Total Rows: {count}")
 
 
-def main(files=None):
-    paths = files or [DEFAULT_INPUT_FILE]
-
-    yes_records = []
-    no_records = []
-
+def iter_records(paths, side=None):
+    """Streams records from JSONL files, optionally only one outcome side ("YES"/"NO")."""
     for path in paths:
-        if not os.path.exists(path):
-            print(f"Warning: File '{path}' not found. Skipping.")
-            continue
-
-        print(f"Reading stats from: {path}...")
-
         with open(path, "r") as f:
             for line in f:
                 line = line.strip()
                 if not line:
                     continue
-
                 try:
                     data = json.loads(line)
-                    side = data.get("outcome_side", "UNKNOWN").upper()
-
-                    if side == "YES":
-                        yes_records.append(data)
-                    elif side == "NO":
-                        no_records.append(data)
-                    else:
-                        # You can add a list for 'unknown' if you have old data
-                        pass
                 except json.JSONDecodeError:
                     continue
+                if side is None or data.get("outcome_side", "UNKNOWN").upper() == side:
+                    yield data
+
+
+def iter_chunks(path, chunk_lines=CHUNK_LINES):
+    """Yields lists of at most chunk_lines non-empty lines."""
+    chunk = []
+    with open(path, "r") as f:
+        for line in f:
+            if line.strip():
+                chunk.append(line)
+                if len(chunk) >= chunk_lines:
+                    yield chunk
+                    chunk = []
+    if chunk:
+        yield chunk
+
+
+def parse_chunk(lines):
+    """
+    Book statistics of a chunk of JSONL lines, computed over all their levels at once.
+    Returns a dict of equal-length arrays: ts, side (0 = Yes, 1 = No), best_bid, best_ask,
+    bid_shares, ask_shares, bid_usdc, ask_usdc. Missing best prices are NaN.
+    """
+    ts, sides = [], []
+    level_rows = ([], [])  # row of every bid / ask level
+    level_prices = ([], [])
+    level_sizes = ([], [])
+    slug = None
+
+    for line in lines:
+        try:
+            data = json.loads(line)
+            side = SIDE_CODES[data.get("outcome_side", "").upper()]
+            t = snapshot_time(data)
+        except (json.JSONDecodeError, KeyError, ValueError):
+            continue
+        row = len(ts)
+        ts.append(t)
+        sides.append(side)
+        slug = slug or data.get("slug")
+        for k, key in enumerate(("bids", "asks")):
+            for level in data.get(key, []):
+                level_rows[k].append(row)
+                level_prices[k].append(level["price"])
+                level_sizes[k].append(level["size"])
+
+    n = len(ts)
+    out = {"ts": np.array(ts, dtype=np.float64), "side": np.array(sides, dtype=np.int8)}
+    for k, name in enumerate(("bid", "ask")):
+        rows = np.array(level_rows[k], dtype=np.int64)
+        prices = np.array(level_prices[k], dtype=np.float64)
+        sizes = np.array(level_sizes[k], dtype=np.float64)
 
-    if not yes_records and not no_records:
+        best = np.full(n, -np.inf if name == "bid" else np.inf)
+        (np.maximum if name == "bid" else np.minimum).at(best, rows, prices)
+        best[np.isinf(best)] = np.nan
+        out[f"best_{name}"] = best
+        out[f"{name}_shares"] = np.bincount(rows, weights=sizes, minlength=n)
+        out[f"{name}_usdc"] = np.bincount(rows, weights=prices * sizes, minlength=n)
+    return slug, out
+
+
+def aggregate_file(path, bucket_seconds=60, chunk_lines=CHUNK_LINES):
+    """
+    Per-bucket, per-side aggregates of one JSONL file, streamed chunk by chunk so memory stays
+    bounded by the chunk size plus one accumulator row per (side, bucket).
+    """
+    acc = {}  # {(side, bucket): [n, spread_n, spread_sum, spread_max, bid_usdc, ask_usdc, bid_shares, ask_shares, last_ts, last_bid, last_ask]}
+    slug = None
+
+    for lines in iter_chunks(path, chunk_lines):
+        chunk_slug, c = parse_chunk(lines)
+        slug = slug or chunk_slug
+        if len(c["ts"]) == 0:
+            continue
+
+        buckets = np.floor(c["ts"] / bucket_seconds).astype(np.int64) * bucket_seconds
+        keys, inverse = np.unique(buckets * 2 + c["side"], return_inverse=True)
+        spread = c["best_ask"] - c["best_bid"]
+        valid = ~np.isnan(spread)
+
+        n = np.bincount(inverse, minlength=len(keys))
+        spread_n = np.bincount(inverse, weights=valid, minlength=len(keys))
+        spread_sum = np.bincount(inverse, weights=np.where(valid, spread, 0.0), minlength=len(keys))
+        spread_max = np.full(len(keys), -np.inf)
+        np.maximum.at(spread_max, inverse[valid], spread[valid])
+        sums = {
+            name: np.bincount(inverse, weights=c[name], minlength=len(keys))
+            for name in ("bid_usdc", "ask_usdc", "bid_shares", "ask_shares")
+        }
+        # last snapshot per key: sort by (key, ts) and take the end of each group
+        order = np.lexsort((c["ts"], inverse))
+        last = order[np.r_[np.flatnonzero(np.diff(inverse[order])), len(order) - 1]]
+
+        for j, key in enumerate(keys):
+            side, bucket = int(key % 2), int(key // 2)
+            row = acc.get((side, bucket))
+            i = last[j]
+            if row is None:
+                acc[(side, bucket)] = [
+                    n[j], spread_n[j], spread_sum[j], spread_max[j],
+                    sums["bid_usdc"][j], sums["ask_usdc"][j], sums["bid_shares"][j], sums["ask_shares"][j],
+                    c["ts"][i], c["best_bid"][i], c["best_ask"][i],
+                ]
+                continue
+            row[0] += n[j]
+            row[1] += spread_n[j]
+            row[2] += spread_sum[j]
+            row[3] = max(row[3], spread_max[j])
+            for k, name in enumerate(("bid_usdc", "ask_usdc", "bid_shares", "ask_shares")):
+                row[4 + k] += sums[name][j]
+            if c["ts"][i] >= row[8]:
+                row[8:11] = [c["ts"][i], c["best_bid"][i], c["best_ask"][i]]
+
+    slug = slug or os.path.basename(path)
+    rows = []
+    for (side, bucket), r in sorted(acc.items(), key=lambda item: (item[0][1], item[0][0])):
+        count, spread_n = r[0], r[1]
+        rows.append({
+            "slug": slug,
+            "side": SIDE_NAMES[side],
+            "bucket": datetime.fromtimestamp(bucket, tz=timezone.utc).isoformat(),
+            "snapshots": int(count),
+            "spread_mean": r[2] / spread_n if spread_n else None,
+            "spread_max": r[3] if spread_n else None,
+            "bid_usdc_mean": r[4] / count,
+            "ask_usdc_mean": r[5] / count,
+            "bid_shares_mean": r[6] / count,
+            "ask_shares_mean": r[7] / count,
+            "last_best_bid": None if np.isnan(r[9]) else r[9],
+            "last_best_ask": None if np.isnan(r[10]) else r[10],
+        })
+    return rows
+
+
+AGGREGATE_FIELDS = [
+    "slug", "side", "bucket", "snapshots", "spread_mean", "spread_max",
+    "bid_usdc_mean", "ask_usdc_mean", "bid_shares_mean", "ask_shares_mean",
+    "last_best_bid", "last_best_ask",
+]
+
+
+def aggregate_files(paths, output_path, bucket_seconds=60, workers=None, chunk_lines=CHUNK_LINES):
+    """Aggregates files in parallel (one process per file) and streams the rows to a CSV."""
+    total = 0
+    with open(output_path, "w", newline="") as f, ProcessPoolExecutor(max_workers=workers) as ex:
+        writer = csv.DictWriter(f, fieldnames=AGGREGATE_FIELDS)
+        writer.writeheader()
+        futures = {ex.submit(aggregate_file, path, bucket_seconds, chunk_lines): path for path in paths}
+        for fut in as_completed(futures):
+            try:
+                rows = fut.result()
+            except Exception as e:
+                print(f"Warning: failed to analyze '{futures[fut]}': {e}")
+                continue
+            for row in rows:
+                writer.writerow({k: (round(v, 6) if isinstance(v, float) else v) for k, v in row.items()})
+            total += len(rows)
+            print(f"{futures[fut]}: {len(rows)} buckets")
+    print(f"Wrote {total} rows to {output_path}")
+
+
+def main(files=None, table=False, output=DEFAULT_OUTPUT_FILE, bucket_seconds=60, workers=None):
+    paths = []
+    for path in files or [DEFAULT_INPUT_FILE]:
+        if not os.path.exists(path):
+            print(f"Warning: File '{path}' not found. Skipping.")
+            continue
+        paths.append(path)
+
+    if not paths:
         print("No data found in provided files.")
         return
 
-    print_table("YES TOKEN LIQUIDITY", yes_records)
-    print_table("NO TOKEN LIQUIDITY", no_records)
+    if table:
+        # one streaming pass per side instead of holding every record in memory
+        print_table("YES TOKEN LIQUIDITY", iter_records(paths, "YES"))
+        print_table("NO TOKEN LIQUIDITY", iter_records(paths, "NO"))
+        return
+
+    aggregate_files(paths, output, bucket_seconds, workers)
 
 
 if __name__ == "__main__":
@@ -131,6 +294,10 @@ if __name__ == "__main__":
         nargs="*",
         help="One or more JSONL files to analyze. Defaults to polymarket_liquidity.jsonl",
     )
+    parser.add_argument("--table", action="store_true", help="Print the per-snapshot tables instead of aggregating")
+    parser.add_argument("-o", "--output", default=DEFAULT_OUTPUT_FILE, help="Aggregate CSV path")
+    parser.add_argument("--bucket", type=int, default=60, help="Aggregation bucket in seconds")
+    parser.add_argument("--workers", type=int, default=None, help="Processes (default: CPU count)")
 
     args = parser.parse_args()
-    main(args.files if args.files else None)
+    main(args.files if args.files else None, args.table, args.output, args.bucket, args.workers)
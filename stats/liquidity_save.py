@@ -1,18 +1,21 @@
 from pathlib import Path
+import os
 import requests
 import json
 import time
 from datetime import datetime
 
-from polymarket_api import DataFeed
+from market_registry import default_registry
+from stats.book_store import BookStoreWriter, snapshot_time, store_path_for_slug
 
 DEFAULT_INTERVAL_SECONDS = 10
-__all__ = ["run_liquidity_logger"]
+CLOB_URL = os.getenv("CLOB_API_URL", "https://clob.polymarket.com")
+__all__ = ["run_liquidity_logger", "log_order_books", "save_book", "build_targets_for_slug"]
 
 
 def fetch_order_book(token_id):
     """Fetches the order book for a specific token from Polymarket CLOB."""
-    url = "https://clob.polymarket.com/book"
+    url = f"{CLOB_URL}/book"
     params = {"token_id": token_id}
 
     try:
@@ -32,20 +35,56 @@ def save_to_jsonl(data, filename: Path):
 
 
 def build_targets_for_slug(slug):
-    outcome_addresses = DataFeed.get_slug_outcome_addresses(slug)
+    outcome_addresses = default_registry().get(slug).token_ids
     targets = []
     for label, token_id in outcome_addresses.items():
         targets.append({"label": label, "id": token_id})
     return targets
 
 
+def save_book(book_data, output_path: Path, writer: BookStoreWriter | None = None):
+    """Appends one /book snapshot to the JSONL log, or to the delta-compressed store if writer is given."""
+    if writer is None:
+        save_to_jsonl(book_data, output_path)
+    else:
+        book_data.setdefault("local_timestamp", datetime.now().isoformat())
+        writer.add(book_data["outcome_side"], snapshot_time(book_data), book_data.get("bids", []), book_data.get("asks", []))
+
+
+def log_order_books(slug, targets, output_path: Path, verbose=True, writer: BookStoreWriter | None = None):
+    """Fetches and saves one order book snapshot per target."""
+    for target in targets:
+        label = target["label"]
+        token_id = target["id"]
+
+        book_data = fetch_order_book(token_id)
+
+        if book_data:
+            book_data["outcome_side"] = label
+            book_data["token_id"] = token_id
+            book_data["slug"] = slug
+
+            save_book(book_data, output_path, writer)
+            if verbose:
+                print(f"   > {label}: Saved.")
+        elif verbose:
+            print(f"   > {label}: Failed.")
+
+
 def run_liquidity_logger(
     slug: str,
     interval_seconds: int = DEFAULT_INTERVAL_SECONDS,
     output_file: Path | None = None,
+    book_format: str = "jsonl",
 ):
+    """book_format "store" writes a delta-compressed polymarket_liquidity_<slug>.books store instead of JSONL."""
     targets = build_targets_for_slug(slug)
-    output_path = output_file or Path(f"polymarket_liquidity_{slug}.jsonl")
+    writer = None
+    if book_format == "store":
+        output_path = output_file or Path(store_path_for_slug(".", slug))
+        writer = BookStoreWriter(output_path)
+    else:
+        output_path = output_file or Path(f"polymarket_liquidity_{slug}.jsonl")
 
     print("Starting Liquidity Logger...")
     print(f"Market slug: {slug}")
@@ -53,25 +92,15 @@ def run_liquidity_logger(
     print(f"Saving to: {output_path}")
     print("Press Ctrl+C to stop.\n")
 
-    while True:
-        timestamp_str = datetime.now().strftime("%H:%M:%S")
-        print(f"[{timestamp_str}] Cycle starting...")
-
-        for target in targets:
-            label = target["label"]
-            token_id = target["id"]
-
-            book_data = fetch_order_book(token_id)
-
-            if book_data:
-                book_data["outcome_side"] = label
-                book_data["token_id"] = token_id
-                book_data["slug"] = slug
+    try:
+        while True:
+            timestamp_str = datetime.now().strftime("%H:%M:%S")
+            print(f"[{timestamp_str}] Cycle starting...")
 
-                save_to_jsonl(book_data, output_path)
-                print(f"   > {label}: Saved.")
-            else:
-                print(f"   > {label}: Failed.")
+            log_order_books(slug, targets, output_path, writer=writer)
 
-        print(f"   Waiting {interval_seconds}s...")
-        time.sleep(interval_seconds)
+            print(f"   Waiting {interval_seconds}s...")
+            time.sleep(interval_seconds)
+    finally:
+        if writer is not None:
+            writer.close()  # the open segment of each side
@@ -1,31 +1,173 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+
 import requests
 
+logger = logging.getLogger(__name__)
+
+MAX_MESSAGE_CHARS = 4096  # Telegram's limit per message
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")
+
 
 class TelegramBot:
     def __init__(self, token, chat_id):
         self.token = token
         self.chat_id = chat_id
-        self.api_url = f"https://api.telegram.org/bot{self.token}"
+        self.api_url = f"{TELEGRAM_API_URL}/bot{self.token}"
+        self.session = requests.Session()
 
     def send_message(self, text):
         url = f"{self.api_url}/sendMessage"
         payload = {"chat_id": self.chat_id, "text": text}
-        response = requests.post(url, json=payload)
+        response = self.session.post(url, json=payload, timeout=10)
         return response.json()
 
     def edit_message(self, message_id, new_text):
         url = f"{self.api_url}/editMessageText"
         payload = {"chat_id": self.chat_id, "message_id": message_id, "text": new_text}
-        response = requests.post(url, json=payload)
+        response = self.session.post(url, json=payload, timeout=10)
         return response.json()
 
     def delete_message(self, message_id):
         url = f"{self.api_url}/deleteMessage"
         payload = {"chat_id": self.chat_id, "message_id": message_id}
-        response = requests.post(url, json=payload)
+        response = self.session.post(url, json=payload, timeout=10)
         return response.json()
 
 
+class NotificationDispatcher:
+    """
+    Sends notifications from a background thread so trading threads never wait on Telegram.
+    notify() only enqueues (and counts a drop when the bounded queue is full); the sender
+    coalesces everything that arrives within coalesce_window into one message, keeps at least
+    min_interval between messages, honours 429 retry_after and backs off on network errors.
+    Dropped notifications are reported as a count in the next message. A trace passed to
+    notify() is finished once its message was sent (or dropped).
+    """
+
+    def __init__(
+        self,
+        bot: TelegramBot,
+        max_queue: int = 200,
+        coalesce_window: float = 1.0,
+        min_interval: float = 1.0,
+        max_retries: int = 5,
+    ):
+        self.bot = bot
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.coalesce_window = coalesce_window
+        self.min_interval = min_interval
+        self.max_retries = max_retries
+
+        self.dropped = 0
+        self.sent = 0
+        self.lock = threading.Lock()
+        self.last_send = 0.0
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="telegram-notify", daemon=True)
+        self.thread.start()
+        atexit.register(self.close, 5.0)
+
+    def notify(self, text: str, trace=None) -> bool:
+        """Enqueues text, never blocks; False if it was dropped."""
+        try:
+            self.queue.put_nowait((text, trace))
+            return True
+        except queue.Full:
+            with self.lock:
+                self.dropped += 1
+            if trace is not None:
+                trace.finish("notification_dropped")
+            return False
+
+    def _collect(self) -> list:
+        """Blocks for the first notification, then gathers what arrives within the window."""
+        try:
+            first = self.queue.get(timeout=0.5)
+        except queue.Empty:
+            return []
+        batch = [first]
+        deadline = time.monotonic() + self.coalesce_window
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _format(self, batch: list) -> list:
+        """Coalesced message texts, split at the Telegram size limit."""
+        with self.lock:
+            dropped, self.dropped = self.dropped, 0
+        parts = [text for text, _ in batch]
+        if dropped:
+            parts.append(f"({dropped} notifications dropped, queue full)")
+        header = f"[{len(batch)} alerts]" if len(batch) > 1 else ""
+
+        messages = []
+        current = header
+        for part in parts:
+            part = part[: MAX_MESSAGE_CHARS - len(header) - 2]
+            if current and len(current) + len(part) + 2 > MAX_MESSAGE_CHARS:
+                messages.append(current)
+                current = ""
+            current = f"{current}\n\n{part}" if current.strip() else current + part
+        if current:
+            messages.append(current)
+        return messages
+
+    def _send(self, text):
+        delay = 1.0
+        for _ in range(self.max_retries):
+            wait = self.min_interval - (time.monotonic() - self.last_send)
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                resp = self.bot.send_message(text)
+            except (requests.RequestException, ValueError) as e:
+                logger.warning(f"Telegram send failed: {e}, retrying in {delay:.0f}s")
+                time.sleep(delay)
+                delay = min(delay * 2, 60.0)
+                continue
+            finally:
+                self.last_send = time.monotonic()
+
+            if resp.get("ok", True):
+                self.sent += 1
+                return True
+            if resp.get("error_code") == 429:
+                retry_after = resp.get("parameters", {}).get("retry_after", delay)
+                logger.warning(f"Telegram rate limit, retrying in {retry_after}s")
+                time.sleep(retry_after)
+                continue
+            logger.warning(f"Telegram rejected message: {resp.get('description')}")
+            return False
+        logger.warning("Telegram message dropped after retries")
+        return False
+
+    def _run(self):
+        while self.running or not self.queue.empty():
+            batch = self._collect()
+            if not batch:
+                continue
+            sent = all([self._send(text) for text in self._format(batch)])
+            for _, trace in batch:
+                if trace is not None:
+                    trace.finish("notified" if sent else "notification_failed")
+
+    def close(self, timeout: float = 10.0):
+        """Stops after sending what is queued, waiting at most timeout seconds."""
+        self.running = False
+        self.thread.join(timeout)
+
+
 # Usage
 if __name__ == "__main__":
     TOKEN = None
@@ -0,0 +1,167 @@
+import argparse
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+
+import numpy as np
+
+# One trace per filing that triggers a market: created when the sentinel first sees the feed
+# entry and carried through dispatch, the oracle stages, the order post and the notification.
+# Every mark holds a monotonic and a wall timestamp; offsets within one process use the
+# monotonic clock, marks made in another process (sharded workers) fall back to wall time.
+# Finished traces are appended to TRACE_LOG as JSON lines, `python tracing.py` summarizes them.
+
+TRACE_LOG = os.getenv("TRACE_LOG", "logs/traces.jsonl")
+SEC_STAGE = "sec_to_detected"  # wall time from the feed entry's <updated> to detection
+HISTOGRAM_EDGES = (0.0, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, np.inf)
+
+
+class Trace:
+    def __init__(self, trace_id: str | None = None, tracer=None, **attrs):
+        self.trace_id = trace_id or uuid.uuid4().hex[:16]
+        self.tracer = tracer
+        self.attrs = attrs  # cik, slug, sec_url, sec_updated, resolution, ...
+        self.marks = []  # [{"stage", "mono", "wall", "pid"}]
+        self.finished = False
+        self.lock = threading.Lock()
+
+    def mark(self, stage: str, **attrs):
+        with self.lock:
+            self.marks.append({"stage": stage, "mono": time.monotonic(), "wall": time.time(), "pid": os.getpid()})
+            self.attrs.update(attrs)
+
+    def set(self, **attrs):
+        with self.lock:
+            self.attrs.update(attrs)
+
+    def offsets(self) -> dict:
+        """{stage: seconds since the first mark}, first occurrence of each stage."""
+        with self.lock:
+            marks = list(self.marks)
+        if not marks:
+            return {}
+        first = marks[0]
+        result = {}
+        for m in marks:
+            if m["stage"] in result:
+                continue
+            same_clock = m["pid"] == first["pid"]
+            result[m["stage"]] = m["mono"] - first["mono"] if same_clock else m["wall"] - first["wall"]
+        return result
+
+    def sec_lag(self) -> float | None:
+        """Seconds from the SEC feed's updated/acceptance time to detection, wall clock."""
+        updated = self.attrs.get("sec_updated")
+        if not updated or not self.marks:
+            return None
+        try:
+            return self.marks[0]["wall"] - datetime.fromisoformat(updated).timestamp()
+        except ValueError:
+            return None
+
+    def as_dict(self) -> dict:
+        with self.lock:
+            return {"trace_id": self.trace_id, **self.attrs, "marks": list(self.marks)}
+
+    @classmethod
+    def from_dict(cls, data: dict, tracer=None):
+        data = dict(data)
+        marks = data.pop("marks", [])
+        trace = cls(data.pop("trace_id"), tracer, **data)
+        trace.marks = list(marks)
+        return trace
+
+    def finish(self, stage: str | None = None):
+        """Marks the last stage and exports the trace once."""
+        if stage is not None:
+            self.mark(stage)
+        with self.lock:
+            if self.finished:
+                return
+            self.finished = True
+        if self.tracer is not None:
+            self.tracer.export(self)
+
+    def __str__(self) -> str:
+        stages = ", ".join(f"{stage} +{t:.3f}s" for stage, t in self.offsets().items())
+        return f"{self.trace_id} {self.attrs.get('slug', self.attrs.get('cik', ''))}: {stages}"
+
+
+class Tracer:
+    """Creates traces and appends finished ones to a JSON lines file."""
+
+    def __init__(self, path=TRACE_LOG):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def start(self, stage: str = "detected", **attrs) -> Trace:
+        trace = Trace(tracer=self, **attrs)
+        trace.mark(stage)
+        return trace
+
+    def export(self, trace: Trace):
+        line = json.dumps(trace.as_dict(), default=str)
+        with self.lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a") as f:
+                f.write(line + "\n")
+
+
+_default_tracer: Tracer = None
+_default_tracer_lock = threading.Lock()
+
+
+def default_tracer() -> Tracer:
+    global _default_tracer
+    with _default_tracer_lock:
+        if _default_tracer is None:
+            _default_tracer = Tracer()
+        return _default_tracer
+
+
+def load_traces(path) -> list:
+    traces = []
+    with open(path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                try:
+                    traces.append(Trace.from_dict(json.loads(line)))
+                except (json.JSONDecodeError, KeyError):
+                    continue
+    return traces
+
+
+def stage_latencies(traces) -> dict:
+    """{stage: [seconds since detection per trace]} in first-seen stage order, SEC lag first."""
+    latencies = {SEC_STAGE: []}
+    for trace in traces:
+        lag = trace.sec_lag()
+        if lag is not None:
+            latencies[SEC_STAGE].append(lag)
+        for stage, t in trace.offsets().items():
+            latencies.setdefault(stage, []).append(t)
+    return {stage: values for stage, values in latencies.items() if values}
+
+
+def print_summary(traces, width: int = 40):
+    print(f"Traces: {len(traces)}")
+    for stage, values in stage_latencies(traces).items():
+        values = np.array(values)
+        p50, p90, p99 = np.percentile(values, [50, 90, 99])
+        print(f"\n{stage} (n={len(values)}): p50 {p50:.3f}s, p90 {p90:.3f}s, p99 {p99:.3f}s, max {values.max():.3f}s")
+        counts, _ = np.histogram(values, bins=HISTOGRAM_EDGES)
+        scale = width / max(counts.max(), 1)
+        for lo, hi, count in zip(HISTOGRAM_EDGES[:-1], HISTOGRAM_EDGES[1:], counts):
+            if count:
+                print(f"  {lo:>7g}s - {hi:<7g}s {'#' * max(1, int(count * scale)):<{width}} {count}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-stage latency histograms of trigger traces.")
+    parser.add_argument("path", nargs="?", default=TRACE_LOG, help="Trace JSON lines file")
+    args = parser.parse_args()
+    print_summary(load_traces(args.path))